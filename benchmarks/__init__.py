@@ -0,0 +1,9 @@
+"""
+Benchmarks for the caption editor. Run each one as a module from the repository root, for example 'python -m benchmarks.bench_pipeline'.
+"""
+
+import sys
+from pathlib import Path
+
+# The benchmarks measure the source tree rather than any installed copy of the package
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
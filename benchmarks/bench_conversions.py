@@ -0,0 +1,152 @@
+"""
+Measures the memory and time it takes to load a large conversions dictionary and build the matcher for it, from each source the editor can load it from:
+the conversions JSON file, the compiled conversions cache, and a conversions store built with 'edit-captions build-conversions-store'.
+
+Every load runs in a new Python process, so that its peak memory is measured on its own. Memory is the growth of the process's peak resident memory
+over what it used before loading, in MB, and every time is the best of the repeats, in seconds.
+
+Usage: python -m benchmarks.bench_conversions [-k <rules> ...] [-r <repeats>] [-o <results file>]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from captioneditor.conversions import compile_conversions
+from captioneditor.conversions_store import build_conversions_store
+
+from .bench_pipeline import environment
+from .bench_startup import SOURCE_DIRECTORY
+from .corpus import generate_conversions
+
+CHILD = """
+import json, resource, sys, time
+from captioneditor.conversions import load_conversions
+from captioneditor.matching import ConversionMatcher
+import flashtext2
+
+def peak():
+    # ru_maxrss is kept across exec on Linux, so it can start out at the benchmark process's own peak. VmHWM only covers this interpreter.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+before = peak()
+start = time.perf_counter()
+conversions = load_conversions({path!r}, use_cache={use_cache!r})
+loaded = time.perf_counter()
+load_peak = peak()
+ConversionMatcher(conversions)
+built = time.perf_counter()
+print(json.dumps({{
+    "load": loaded - start,
+    "matcher": built - loaded,
+    "load_memory": (load_peak - before) / 2**20,
+    "total_memory": (peak() - before) / 2**20,
+}}))
+"""
+
+
+def measure(path: Path, use_cache: bool, cache_dir: str) -> dict:
+    """
+    Loads the conversions in a new interpreter and returns the load and matcher times and the memory they took.
+    """
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(SOURCE_DIRECTORY),
+        CAPTIONEDITOR_CACHE_DIR=cache_dir,
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD.format(path=str(path), use_cache=use_cache)],
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def best(path: Path, use_cache: bool, cache_dir: str, repeats: int) -> dict:
+    runs = [measure(path, use_cache, cache_dir) for _ in range(repeats)]
+    return {key: min(run[key] for run in runs) for key in runs[0]}
+
+
+def run(rule_counts: list[int], repeats: int = 3) -> dict:
+    """
+    Generates a conversions file of each size and measures loading it from JSON, from the compiled conversions cache, and from a conversions store.
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rules in rule_counts:
+            conversions_file = Path(directory) / f"conversions-{rules}.json"
+            conversions_file.write_text(json.dumps(generate_conversions(rules)))
+            store = build_conversions_store(conversions_file)
+            compile_conversions(conversions_file, directory)
+
+            results.append(
+                {
+                    "rules": rules,
+                    "sizes": {
+                        "json": conversions_file.stat().st_size,
+                        "store": store.stat().st_size,
+                    },
+                    "json": best(conversions_file, False, directory, repeats),
+                    "cache": best(conversions_file, True, directory, repeats),
+                    "store": best(store, True, directory, repeats),
+                }
+            )
+
+    return {
+        "environment": environment(),
+        "parameters": {"rules": rule_counts, "repeats": repeats},
+        "results": results,
+    }
+
+
+def print_table(report: dict) -> None:
+    print(
+        f"{'rules':>8} {'source':<6} {'load':>7} {'matcher':>8} {'load MB':>8} {'total MB':>9}"
+    )
+    for result in report["results"]:
+        for source in ("json", "cache", "store"):
+            measured = result[source]
+            print(
+                f"{result['rules']:>8} {source:<6} {measured['load']:>7.3f} {measured['matcher']:>8.3f} "
+                f"{measured['load_memory']:>8.1f} {measured['total_memory']:>9.1f}"
+            )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_conversions")
+    parser.add_argument(
+        "-k", type=int, nargs="+", default=[500000], help="numbers of conversion rules"
+    )
+    parser.add_argument("-r", type=int, default=3, help="number of repeats")
+    parser.add_argument(
+        "-o", help="file to write the JSON results to, instead of standard output"
+    )
+    args = parser.parse_args(args)
+
+    report = run(args.k, args.r)
+
+    if args.o:
+        Path(args.o).write_text(json.dumps(report, indent=2))
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Measures the memory the edited captions take between editing and writing, held as a cue table, and as the pycaption caption set they were held as before,
+along with the peak memory of a whole edit_captions run.
+
+The edited captions are measured with tracemalloc, in bytes per cue and in MB per 100,000 cues. Every edit_captions run is in a new Python process, so that its
+peak resident memory is measured on its own, as the growth over what the process used before the edit, in MB.
+
+Usage: python -m benchmarks.bench_memory [-n <cues> ...] [-k <rules>] [-t <types>] [-o <results file>]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from captioneditor import Editor
+
+from .bench_pipeline import environment
+from .bench_startup import SOURCE_DIRECTORY
+from .corpus import CAPTIONS_TYPES, write_corpus
+
+CHILD = """
+import json
+from captioneditor import Editor
+
+def peak():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+editor = Editor({captions_file!r}, {conversions_file!r}, dest_directory={directory!r}, dest_file_extensions=[".vtt", ".srt"])
+before = peak()
+editor.edit_captions()
+print(json.dumps((peak() - before) / 2**20))
+"""
+
+
+def traced_size(build) -> tuple[object, int]:
+    """
+    Returns what build returns, along with the memory it still holds once built, in bytes.
+    """
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        built = build()
+        return built, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def edit_peak(captions_file: Path, conversions_file: Path, directory: str) -> float:
+    """
+    Runs edit_captions in a new interpreter and returns the growth of its peak resident memory, in MB. Only available on Linux.
+    """
+
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            CHILD.format(
+                captions_file=str(captions_file),
+                conversions_file=str(conversions_file),
+                directory=directory,
+            ),
+        ],
+        env=dict(os.environ, PYTHONPATH=str(SOURCE_DIRECTORY)),
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def run(cue_counts: list[int], rules: int, captions_types: list[str]) -> dict:
+    """
+    Generates a corpus for every cue count and measures the edited captions of every captions type as a cue table and as a caption set.
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for cues in cue_counts:
+            captions_files, conversions_file = write_corpus(
+                Path(directory), cues, 20, rules, tuple(captions_types)
+            )
+            for captions_file in captions_files:
+                editor = Editor(captions_file, conversions_file)
+                contents = editor._read_captions_contents()
+
+                # The first edit imports the reader and fills the caption cache, which are not part of the edited captions
+                editor._edit_cues(contents, captions_file.suffix)
+                new_cues, table_size = traced_size(
+                    lambda: editor._edit_cues(contents, captions_file.suffix)
+                )
+                _, caption_set_size = traced_size(new_cues.to_caption_set)
+
+                result = {
+                    "type": captions_file.suffix,
+                    "cues": cues,
+                    "cue_table": table_size,
+                    "caption_set": caption_set_size,
+                    "edit_peak": None,
+                }
+                if sys.platform.startswith("linux"):
+                    result["edit_peak"] = edit_peak(
+                        captions_file, conversions_file, directory
+                    )
+                results.append(result)
+
+    return {
+        "environment": environment(),
+        "parameters": {"cues": cue_counts, "rules": rules, "types": captions_types},
+        "results": results,
+    }
+
+
+def print_table(report: dict) -> None:
+    print(
+        f"{'type':>6} {'cues':>8} {'table B/cue':>12} {'set B/cue':>10} {'table MB/100k':>14} {'set MB/100k':>12} {'edit peak MB':>13}"
+    )
+    for result in report["results"]:
+        per_100k = 100000 / result["cues"] / 2**20
+        edit_peak = result["edit_peak"]
+        print(
+            f"{result['type']:>6} {result['cues']:>8} {result['cue_table'] / result['cues']:>12.1f} {result['caption_set'] / result['cues']:>10.1f} "
+            f"{result['cue_table'] * per_100k:>14.1f} {result['caption_set'] * per_100k:>12.1f} "
+            f"{'-' if edit_peak is None else f'{edit_peak:.1f}':>13}"
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_memory")
+    parser.add_argument(
+        "-n", type=int, nargs="+", default=[100000], help="numbers of cues"
+    )
+    parser.add_argument("-k", type=int, default=100, help="number of conversion rules")
+    parser.add_argument(
+        "-t",
+        nargs="+",
+        default=list(CAPTIONS_TYPES),
+        choices=CAPTIONS_TYPES,
+        help="captions types to measure",
+    )
+    parser.add_argument(
+        "-o", help="file to write the JSON results to, instead of standard output"
+    )
+    args = parser.parse_args(args)
+
+    report = run(args.n, args.k, args.t)
+
+    if args.o:
+        Path(args.o).write_text(json.dumps(report, indent=2))
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
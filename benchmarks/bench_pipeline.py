@@ -0,0 +1,226 @@
+"""
+Times each stage of Editor.edit_captions on a synthetic corpus and writes the results as JSON.
+
+The stages are reading and parsing the captions file, applying the offset and cutoff, keyword processing,
+bridging the parsed captions into the cue table that is written, and rendering and writing every filetype at the same time, as edit_captions does.
+They run one after another, and the whole of edit_captions is timed as well. Each writer is also timed rendering on its own, apart from the stages,
+since the writers overlap when edit_captions renders them. Every time is the best of the repeats, in seconds.
+
+Usage: python -m benchmarks.bench_pipeline [-n <cues> ...] [-d <cues per minute>] [-k <rules> ...] [-t <types>] [-r <repeats>] [-o <results file>]
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+from contextlib import contextmanager
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from captioneditor import Editor, timestamps
+from captioneditor.cues import CueTable, render_cues
+from captioneditor.matching import CaptionCache
+from captioneditor.stats import EditStats
+
+from .corpus import CAPTIONS_TYPES, write_corpus
+
+DEST_TYPES = [".vtt", ".srt", ".dfxp"]
+
+
+@contextmanager
+def timer(stages: dict[str, float], stage: str):
+    start = time.perf_counter()
+    yield
+    stages[stage] = time.perf_counter() - start
+
+
+def time_stages(
+    editor: Editor, captions_file: Path
+) -> tuple[dict[str, float], dict[str, float]]:
+    """
+    Runs the steps of Editor.edit_captions one at a time on the captions file and returns how long each took, along with how long each writer takes on its own.
+    Bridging reuses the text from keyword processing, through a caption cache holding every caption, so that it is not counted twice.
+    """
+
+    stages: dict[str, float] = {}
+    editor.update_captions_path(captions_file)
+
+    with timer(stages, "read"):
+        cues = editor._read_captions_cues()
+
+    with timer(stages, "offset"):
+        starts, ends, keep = cues.offset_and_cut(
+            editor.timing_offset,
+            editor._effective_cutoff(),
+            editor._window_start,
+        )
+    kept = [index for index, kept in enumerate(keep) if kept]
+    texts = [cues.text(index) for index in kept]
+
+    editor.caption_cache.clear()
+    editor._previous_caption_keys = []
+    with timer(stages, "keywords"):
+        for text in texts:
+            editor._process_caption_contents(text)
+
+    caption_cache = editor.caption_cache
+    editor.caption_cache = CaptionCache(len(texts))
+    editor._previous_caption_keys = []
+    for text in texts:
+        editor._process_caption_contents(text)
+
+    editor._previous_caption_keys = []
+    with timer(stages, "bridge"):
+        new_cues = CueTable()
+        for index in kept:
+            editor._edit_caption(cues, index, starts[index], ends[index], new_cues)
+    editor.caption_cache = caption_cache
+
+    with timer(stages, "write"):
+        editor._write_cues(new_cues, EditStats())
+
+    with timer(stages, "edit_captions"):
+        editor.edit_captions()
+
+    renders: dict[str, float] = {}
+    for extension in editor._dest_filetypes:
+        with timer(renders, extension):
+            render_cues(editor.WRITERS[extension], new_cues)
+
+    return stages, renders
+
+
+def best_stages(
+    editor: Editor, captions_file: Path, repeats: int
+) -> tuple[dict[str, float], dict[str, float]]:
+    best: tuple[dict[str, float], dict[str, float]] = ({}, {})
+    for _ in range(repeats):
+        for best_times, times in zip(best, time_stages(editor, captions_file)):
+            for stage, elapsed in times.items():
+                best_times[stage] = min(best_times.get(stage, elapsed), elapsed)
+    return best
+
+
+def environment() -> dict:
+    try:
+        pycaption_version = version("pycaption")
+    except PackageNotFoundError:
+        pycaption_version = None
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pycaption": pycaption_version,
+        "numpy": timestamps.load_numpy() is not None,
+    }
+
+
+def run(
+    cue_counts: list[int],
+    rule_counts: list[int],
+    captions_types: list[str],
+    cues_per_minute: float = 20,
+    repeats: int = 3,
+    directory: Path | None = None,
+) -> dict:
+    """
+    Generates a corpus for every combination of cue count and rule count and returns the stage times for every captions type.
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_directory:
+        directory = Path(directory or temp_directory)
+        for cues in cue_counts:
+            for rules in rule_counts:
+                captions_files, conversions_file = write_corpus(
+                    directory, cues, cues_per_minute, rules, tuple(captions_types)
+                )
+
+                start = time.perf_counter()
+                editor = Editor(
+                    conversions_file=conversions_file,
+                    dest_file_extensions=DEST_TYPES,
+                    dest_directory=directory,
+                    use_conversions_cache=False,
+                )
+                init = time.perf_counter() - start
+
+                for captions_file in captions_files:
+                    stages, renders = best_stages(editor, captions_file, repeats)
+                    results.append(
+                        {
+                            "captions_type": captions_file.suffix,
+                            "cues": cues,
+                            "rules": rules,
+                            "bytes": captions_file.stat().st_size,
+                            "init": init,
+                            "stages": stages,
+                            "renders": renders,
+                            "captions_per_second": cues / stages["edit_captions"],
+                        }
+                    )
+
+    return {
+        "environment": environment(),
+        "parameters": {
+            "cues_per_minute": cues_per_minute,
+            "repeats": repeats,
+            "dest_types": DEST_TYPES,
+        },
+        "results": results,
+    }
+
+
+def print_table(report: dict) -> None:
+    stages = list(report["results"][0]["stages"]) if report["results"] else []
+    renders = list(report["results"][0]["renders"]) if report["results"] else []
+    print(
+        f"{'type':>6} {'cues':>7} {'rules':>6} "
+        + " ".join(f"{stage:>13}" for stage in stages)
+        + f" {'captions/s':>11}  "
+        + " ".join(f"{'render ' + extension:>13}" for extension in renders)
+    )
+    for result in report["results"]:
+        print(
+            f"{result['captions_type']:>6} {result['cues']:>7} {result['rules']:>6} "
+            + " ".join(f"{result['stages'][stage]:>13.4f}" for stage in stages)
+            + f" {result['captions_per_second']:>11.0f}  "
+            + " ".join(
+                f"{result['renders'][extension]:>13.4f}" for extension in renders
+            )
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_pipeline")
+    parser.add_argument(
+        "-n", type=int, nargs="+", default=[1000, 5000], help="numbers of cues"
+    )
+    parser.add_argument("-d", type=float, default=20, help="cues per minute")
+    parser.add_argument(
+        "-k", type=int, nargs="+", default=[100], help="numbers of conversion rules"
+    )
+    parser.add_argument(
+        "-t", nargs="+", default=list(CAPTIONS_TYPES), help="captions types"
+    )
+    parser.add_argument("-r", type=int, default=3, help="number of repeats")
+    parser.add_argument(
+        "-o", help="file to write the JSON results to, instead of standard output"
+    )
+    parser.add_argument(
+        "-corpus", help="directory to keep the generated corpus in", default=None
+    )
+    args = parser.parse_args(args)
+
+    report = run(args.n, args.k, args.t, args.d, args.r, args.corpus)
+
+    if args.o:
+        Path(args.o).write_text(json.dumps(report, indent=2))
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
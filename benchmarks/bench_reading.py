@@ -0,0 +1,194 @@
+"""
+Times edit_captions on WebVTT and SRT captions read straight from a memory map of the file, and read as text and parsed with pycaption as they were before,
+along with the peak memory of each.
+
+Jobs are a full edit with conversion rules, an offset-only edit, and a cutoff-only edit keeping the first tenth of the captions, with the captions file read
+whole and, for sorted captions, only up to the cutoff. Every job runs in a new Python process, so that its peak resident memory is measured on its own,
+as the growth over what the process used before the edit, in MB. Times are the best of the repeats, in seconds.
+
+Usage: python -m benchmarks.bench_reading [-n <cues> ...] [-k <rules>] [-t <types>] [-r <repeats>] [-o <results file>]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from .bench_pipeline import environment
+from .bench_startup import SOURCE_DIRECTORY
+from .corpus import write_corpus
+
+READING_TYPES = (".vtt", ".srt")
+READERS = ("mapped", "pycaption")
+
+CHILD = """
+import json
+import time
+from captioneditor import Editor
+from captioneditor import editor as editor_module
+from captioneditor.mapped import UnsupportedCaptions
+
+def peak():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+def read_with_pycaption(*args):
+    raise UnsupportedCaptions
+
+if {reader!r} == "pycaption":
+    editor_module.read_mapped_cues = read_with_pycaption
+
+editor = Editor({captions_file!r}, {conversions_file!r}, dest_directory={directory!r}, dest_file_extensions=[".vtt", ".srt"], assume_sorted={assume_sorted!r})
+before = peak()
+times = []
+for _ in range({repeats}):
+    start = time.perf_counter()
+    editor.edit_captions()
+    times.append(time.perf_counter() - start)
+after = peak()
+print(json.dumps({{"time": min(times), "peak": None if before is None else (after - before) / 2**20}}))
+"""
+
+
+def write_jobs(directory: Path, cues: int, rules_file: Path) -> dict[str, tuple]:
+    """
+    Writes the conversions file of every job and returns the (conversions file, assume sorted) of each job by name.
+    Corpus captions are 20 per minute, so the cutoff keeps the first tenth of them.
+    """
+
+    offset_file = directory / "offset.json"
+    offset_file.write_text(json.dumps({"offset": 2000, "conversions": []}))
+    cutoff_file = directory / "cutoff.json"
+    cutoff_file.write_text(json.dumps({"cutoff": cues * 3 // 10, "conversions": []}))
+
+    return {
+        "conversions": (rules_file, True),
+        "offset": (offset_file, True),
+        "cutoff": (cutoff_file, False),
+        "cutoff sorted": (cutoff_file, True),
+    }
+
+
+def run_job(
+    captions_file: Path,
+    conversions_file: Path,
+    assume_sorted: bool,
+    reader: str,
+    repeats: int,
+    directory: str,
+) -> dict:
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            CHILD.format(
+                captions_file=str(captions_file),
+                conversions_file=str(conversions_file),
+                directory=directory,
+                assume_sorted=assume_sorted,
+                reader=reader,
+                repeats=repeats,
+            ),
+        ],
+        env=dict(os.environ, PYTHONPATH=str(SOURCE_DIRECTORY)),
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def run(
+    cue_counts: list[int], rules: int, captions_types: list[str], repeats: int
+) -> dict:
+    """
+    Generates a corpus for every cue count and times every job on every captions type with both readers.
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for cues in cue_counts:
+            captions_files, rules_file = write_corpus(
+                Path(directory), cues, 20, rules, tuple(captions_types)
+            )
+            jobs = write_jobs(Path(directory), cues, rules_file)
+            for captions_file in captions_files:
+                for job, (conversions_file, assume_sorted) in jobs.items():
+                    result = {"type": captions_file.suffix, "cues": cues, "job": job}
+                    for reader in READERS:
+                        result[reader] = run_job(
+                            captions_file,
+                            conversions_file,
+                            assume_sorted,
+                            reader,
+                            repeats,
+                            directory,
+                        )
+                    results.append(result)
+
+    return {
+        "environment": environment(),
+        "parameters": {
+            "cues": cue_counts,
+            "rules": rules,
+            "types": captions_types,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def print_table(report: dict) -> None:
+    print(
+        f"{'type':>6} {'cues':>8} {'job':>14} {'mapped s':>9} {'pycaption s':>12} {'mapped MB':>10} {'pycaption MB':>13}"
+    )
+    for result in report["results"]:
+        peaks = [result[reader]["peak"] for reader in READERS]
+        print(
+            f"{result['type']:>6} {result['cues']:>8} {result['job']:>14} "
+            f"{result['mapped']['time']:>9.3f} {result['pycaption']['time']:>12.3f} "
+            + " ".join(
+                f"{'-' if peak is None else f'{peak:.1f}':>{width}}"
+                for peak, width in zip(peaks, (10, 13))
+            )
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_reading")
+    parser.add_argument(
+        "-n", type=int, nargs="+", default=[100000], help="numbers of cues"
+    )
+    parser.add_argument("-k", type=int, default=100, help="number of conversion rules")
+    parser.add_argument(
+        "-t",
+        nargs="+",
+        default=list(READING_TYPES),
+        choices=READING_TYPES,
+        help="captions types to measure",
+    )
+    parser.add_argument("-r", type=int, default=3, help="number of repeats")
+    parser.add_argument(
+        "-o", help="file to write the JSON results to, instead of standard output"
+    )
+    args = parser.parse_args(args)
+
+    report = run(args.n, args.k, args.t, args.r)
+
+    if args.o:
+        Path(args.o).write_text(json.dumps(report, indent=2))
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
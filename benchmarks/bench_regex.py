@@ -0,0 +1,141 @@
+"""
+Measures the cost of regex conversions against the number of regex rules, on the text of a synthetic corpus.
+
+Every rule count is timed with the combined pattern the editor uses, which applies every rule in a single pass over each caption, and with one re.sub pass per rule,
+the way a separate regex script applies them. The time to compile the combined pattern is measured cold and from the compiled-pattern cache.
+Every time is the best of the repeats, in seconds.
+
+Usage: python -m benchmarks.bench_regex [-n <cues>] [-k <rules> ...] [-r <repeats>] [-o <results file>]
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from captioneditor.patterns import RegexConversions, compile_regex_conversions
+
+from .bench_pipeline import environment
+from .corpus import generate_cues
+
+# Rules of the kinds regex conversions are used for, followed by rules with a unique literal prefix, as most of a large set of rules matches rarely
+COMMON_RULES = (
+    (r"\bMr\.?(?=\s)", "Mister", False),
+    (r"\bDr\.?(?=\s)", "Doctor", False),
+    (r"(\d+)\s*km\b", r"\1 kilometres", False),
+    (r"\b(\d{1,2}):(\d\d) ?([ap])m\b", r"\1.\2 \3.m.", False),
+    (r"\b(\d{4})-(\d\d)-(\d\d)\b", r"\3/\2/\1", True),
+    (r"\bgonna\b", "going to", False),
+    (r"\bwanna\b", "want to", False),
+    (r"\b(alright)+\b", "all right", False),
+)
+
+
+def generate_rules(count: int) -> tuple[tuple[str, str, bool], ...]:
+    rules = list(COMMON_RULES[:count])
+    for index in range(len(rules), count):
+        rules.append((rf"\bterm{index}-\d+\b", f"TERM {index}", index % 2 == 0))
+    return tuple(rules)
+
+
+def time_combined(rules, texts: list[str]) -> float:
+    conversions = RegexConversions(rules)
+    start = time.perf_counter()
+    for text in texts:
+        conversions.replace(text)
+    return time.perf_counter() - start
+
+
+def time_separate(rules, texts: list[str]) -> float:
+    patterns = [
+        (re.compile(pattern, 0 if case_sensitive else re.IGNORECASE), replacement)
+        for pattern, replacement, case_sensitive in rules
+    ]
+    start = time.perf_counter()
+    for text in texts:
+        for pattern, replacement in patterns:
+            text = pattern.sub(replacement, text)
+    return time.perf_counter() - start
+
+
+def time_compile(rules) -> tuple[float, float]:
+    compile_regex_conversions.cache_clear()
+    re.purge()
+    start = time.perf_counter()
+    compile_regex_conversions(rules)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compile_regex_conversions(rules)
+    return cold, time.perf_counter() - start
+
+
+def run(
+    cues: int = 10000, rule_counts: list[int] = [1, 10, 100, 1000], repeats: int = 3
+) -> dict:
+    """
+    Times the combined pattern and one pass per rule over the text of every cue, for every rule count.
+    """
+
+    texts = [text for _, _, text in generate_cues(cues)]
+    results = []
+    for count in rule_counts:
+        rules = generate_rules(count)
+        compile_times = [time_compile(rules) for _ in range(repeats)]
+        results.append(
+            {
+                "rules": count,
+                "combined": min(time_combined(rules, texts) for _ in range(repeats)),
+                "separate": min(time_separate(rules, texts) for _ in range(repeats)),
+                "compile": min(cold for cold, _ in compile_times),
+                "compile_cached": min(cached for _, cached in compile_times),
+            }
+        )
+
+    return {
+        "environment": environment(),
+        "parameters": {"cues": cues, "rules": rule_counts, "repeats": repeats},
+        "results": results,
+    }
+
+
+def print_table(report: dict) -> None:
+    cues = report["parameters"]["cues"]
+    print(
+        f"{'rules':>6} {'combined':>9} {'separate':>9} {'us/cue':>7} {'compile':>8} {'cached':>8}"
+    )
+    for result in report["results"]:
+        print(
+            f"{result['rules']:>6} {result['combined']:>9.3f} {result['separate']:>9.3f} "
+            f"{result['combined'] / cues * 1e6:>7.1f} {result['compile']:>8.4f} {result['compile_cached']:>8.6f}"
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_regex")
+    parser.add_argument("-n", type=int, default=10000, help="number of cues")
+    parser.add_argument(
+        "-k",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100, 1000],
+        help="numbers of regex rules",
+    )
+    parser.add_argument("-r", type=int, default=3, help="number of repeats")
+    parser.add_argument(
+        "-o", help="file to write the JSON results to, instead of standard output"
+    )
+    args = parser.parse_args(args)
+
+    report = run(args.n, args.k, args.r)
+
+    if args.o:
+        Path(args.o).write_text(json.dumps(report, indent=2))
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
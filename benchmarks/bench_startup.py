@@ -0,0 +1,218 @@
+"""
+Times how long a short edit-captions job takes from a fresh interpreter, and which of the heavy dependencies it imports, against the same job on a baseline commit.
+
+Every job runs in a new Python process, the way the command line runs it. Each job is run with the package as it is and with the package as it was at the baseline
+commit, by default the first commit of the repository, which imported pycaption, flashtext2, and webvtt up front for every job. The baseline had no streaming, so
+a streamed job is compared with the baseline running the same offset without it. A job the baseline cannot run in this environment is reported with its error
+instead of a time. Importing the editor is timed on its own as well. Every time is the best of the repeats, in seconds.
+
+Usage: python -m benchmarks.bench_startup [-n <cues>] [-k <rules>] [-r <repeats>] [-b <baseline commit>] [-o <results file>]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+from .bench_pipeline import environment
+from .corpus import write_corpus
+
+SOURCE_DIRECTORY = Path(__file__).resolve().parents[1] / "src"
+
+# The dependencies whose import dominates startup
+HEAVY_MODULES = ("pycaption", "bs4", "lxml", "flashtext2", "numpy")
+
+CHILD = """
+import json, sys
+{job}
+print(json.dumps([name for name in {modules!r} if name in sys.modules]))
+"""
+
+IMPORT_JOB = "import captioneditor.editor"
+
+MAIN_JOB = "from captioneditor.editor import main\nmain({args!r})"
+
+
+def jobs(captions_file: Path, conversions_file: Path) -> dict[str, tuple]:
+    """
+    Returns the edit-captions arguments of each job and of the same job on the baseline, keyed by a short description.
+    An empty list of arguments only imports the editor.
+    """
+
+    captions = str(captions_file)
+    offset = [captions, "-o", "1000"]
+    conversions = [captions, "-c", str(conversions_file)]
+    return {
+        "import only": ([], []),
+        "offset only, streamed .vtt": (offset + ["-s"], offset),
+        "offset only .vtt": (offset, offset),
+        "conversions .vtt": (conversions, conversions),
+        "conversions .vtt to .dfxp": (
+            conversions + ["-dt", ".dfxp"],
+            conversions + ["-dt", ".dfxp"],
+        ),
+    }
+
+
+def baseline_commit() -> str:
+    """
+    Returns the first commit of the repository.
+    """
+
+    return subprocess.run(
+        ["git", "rev-list", "--max-parents=0", "HEAD"],
+        cwd=SOURCE_DIRECTORY.parent,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.split()[-1]
+
+
+def extract_source(commit: str, directory: Path) -> Path:
+    """
+    Writes the package source at the commit into the directory and returns the directory to import it from.
+    """
+
+    archive = subprocess.run(
+        ["git", "archive", commit, "src"],
+        cwd=SOURCE_DIRECTORY.parent,
+        capture_output=True,
+        check=True,
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(directory)
+    return directory / "src"
+
+
+def time_job(args: list[str], source_directory: Path) -> tuple[float, list[str]]:
+    """
+    Runs the job in a new interpreter, importing the package from the source directory, and returns its wall time and the heavy modules it imported.
+    Raises a RuntimeError with the last line of the job's error output if it fails.
+    """
+
+    job = MAIN_JOB.format(args=args) if args else IMPORT_JOB
+    code = CHILD.format(job=job, modules=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=str(source_directory))
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode:
+        raise RuntimeError((completed.stderr.strip().splitlines() or ["failed"])[-1])
+    return elapsed, json.loads(completed.stdout.splitlines()[-1])
+
+
+def best_time(args: list[str], source_directory: Path, repeats: int) -> dict:
+    times = []
+    try:
+        # The first run compiles the conversions cache, so that every timed run loads it the same way
+        time_job(args, source_directory)
+        for _ in range(repeats):
+            elapsed, modules = time_job(args, source_directory)
+            times.append(elapsed)
+    except RuntimeError as exc:
+        return {"error": str(exc)}
+    return {"seconds": min(times), "modules": modules}
+
+
+def _time_command(command: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, check=True)
+    return time.perf_counter() - start
+
+
+def run(
+    cues: int = 100, rules: int = 100, repeats: int = 5, baseline: str | None = None
+) -> dict:
+    """
+    Times every job with the package as it is and as it was at the baseline commit, along with an empty interpreter for reference.
+    """
+
+    baseline = baseline or baseline_commit()
+    with tempfile.TemporaryDirectory() as directory:
+        captions_files, conversions_file = write_corpus(
+            directory, cues, rules=rules, captions_types=(".vtt",)
+        )
+        baseline_source = extract_source(baseline, Path(directory) / "baseline")
+
+        interpreter = min(
+            _time_command([sys.executable, "-c", "pass"]) for _ in range(repeats)
+        )
+        results = []
+        for job, (args, baseline_args) in jobs(
+            captions_files[0], conversions_file
+        ).items():
+            results.append(
+                {
+                    "job": job,
+                    "args": args,
+                    "current": best_time(args, SOURCE_DIRECTORY, repeats),
+                    "baseline": best_time(baseline_args, baseline_source, repeats),
+                }
+            )
+
+    return {
+        "environment": environment(),
+        "parameters": {
+            "cues": cues,
+            "rules": rules,
+            "repeats": repeats,
+            "baseline": baseline,
+        },
+        "interpreter": interpreter,
+        "results": results,
+    }
+
+
+def _cell(timing: dict) -> str:
+    return f"{timing['seconds']:>8.3f}" if "seconds" in timing else f"{'failed':>8}"
+
+
+def print_table(report: dict) -> None:
+    print(f"Empty interpreter: {report['interpreter']:.3f}s")
+    print(f"Baseline: {report['parameters']['baseline']}")
+    print(f"{'job':<28} {'current':>8} {'baseline':>8}  imported now / at the baseline")
+    for result in report["results"]:
+        current, baseline = result["current"], result["baseline"]
+        print(
+            f"{result['job']:<28} {_cell(current)} {_cell(baseline)}  "
+            + (", ".join(current.get("modules", [])) or "-")
+            + " / "
+            + (", ".join(baseline.get("modules", [])) or baseline.get("error", "-"))
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_startup")
+    parser.add_argument("-n", type=int, default=100, help="number of cues")
+    parser.add_argument("-k", type=int, default=100, help="number of conversion rules")
+    parser.add_argument("-r", type=int, default=5, help="number of repeats")
+    parser.add_argument(
+        "-b", help="commit to compare with, by default the first commit"
+    )
+    parser.add_argument(
+        "-o", help="file to write the JSON results to, instead of standard output"
+    )
+    args = parser.parse_args(args)
+
+    report = run(args.n, args.k, args.r, args.b)
+
+    if args.o:
+        Path(args.o).write_text(json.dumps(report, indent=2))
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Compares the original per-timestamp offset code in Editor.edit_captions with the integer-millisecond timestamp engine.
+
+Every offset is applied to the same random timestamps by both, which must give the same result. Every time is the best of the repeats, in seconds.
+
+Usage: python -m benchmarks.bench_timestamps [-n <timestamps>] [-r <repeats>] [-o <results file>]
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from pathlib import Path
+
+from captioneditor import timestamps
+from captioneditor.timestamps import (
+    _join_timestamp,
+    format_timestamp,
+    offset_and_cut_one,
+    parse_timestamp,
+)
+
+from .bench_pipeline import environment
+
+TIMESTAMP_PATTERN = re.compile(r"((\d{2,}):)?(\d\d):(\d\d).(\d\d\d)")
+
+
+def legacy_offset_time(time, timing_offset):
+    """
+    The offset_time closure from edit_captions before timestamps were held as integer milliseconds.
+    """
+
+    time_info = TIMESTAMP_PATTERN.search(time).groups()
+    hours = int(time_info[1]) if time_info[1] else 0
+    minutes = int(time_info[2])
+    seconds = int(time_info[3])
+    milliseconds = int(time_info[4]) + timing_offset
+
+    while milliseconds >= 1000:
+        seconds += 1
+        milliseconds -= 1000
+
+    while milliseconds < 0:
+        milliseconds += 1000
+        seconds -= 1
+
+    while seconds >= 60:
+        minutes += 1
+        seconds -= 60
+
+    while seconds < 0:
+        seconds += 60
+        minutes -= 1
+
+    while minutes >= 60:
+        hours += 1
+        minutes -= 60
+
+    while minutes < 0:
+        minutes += 60
+        hours -= 1
+
+    if min(hours, minutes, seconds, milliseconds) < 0:
+        return (None, 0)
+
+    new_time = f"{str(hours).zfill(2)}:{str(minutes).zfill(2)}:{str(seconds).zfill(2)}.{str(milliseconds).zfill(3)}"
+    return (
+        new_time,
+        hours * 3600 + minutes * 60 + seconds + milliseconds / 1000,
+    )
+
+
+def legacy(starts, ends, offset, cutoff):
+    output = []
+    for start, end in zip(starts, ends):
+        new_start, seconds_after_start = legacy_offset_time(start, offset)
+        new_end, _ = legacy_offset_time(end, offset)
+        if not new_start:
+            continue
+        if cutoff >= 0 and seconds_after_start > cutoff:
+            continue
+        output.append((new_start, new_end))
+    return output
+
+
+def format_timestamps(values: list[int], separator: str = ".") -> list[str]:
+    """
+    Converts a list of non-negative integer milliseconds to timestamps in one batched operation. See format_timestamp.
+    """
+
+    numpy = timestamps.load_numpy()
+    if numpy is None:
+        return [format_timestamp(value, separator) for value in values]
+
+    seconds, milliseconds = numpy.divmod(numpy.asarray(values, dtype=numpy.int64), 1000)
+    minutes, seconds = numpy.divmod(seconds, 60)
+    hours, minutes = numpy.divmod(minutes, 60)
+    return [
+        _join_timestamp(*fields, separator)
+        for fields in zip(
+            hours.tolist(), minutes.tolist(), seconds.tolist(), milliseconds.tolist()
+        )
+    ]
+
+
+def offset_and_cut(
+    starts: list[int],
+    ends: list[int],
+    offset: int,
+    cutoff: int | float,
+) -> tuple[list[int], list[int], list[bool]]:
+    """
+    Applies the offset and cutoff to lists of start and end milliseconds in one batched operation, following the same rules as offset_and_cut_one.
+    Returns the new starts, the new ends, and whether each cue should be included.
+    """
+
+    numpy = timestamps.load_numpy()
+    if numpy is not None:
+        start_array = numpy.asarray(starts, dtype=numpy.int64) + offset
+        end_array = numpy.asarray(ends, dtype=numpy.int64) + offset
+        keep = start_array >= 0
+        if cutoff >= 0:
+            keep &= start_array <= cutoff * 1000
+        return start_array.tolist(), end_array.tolist(), keep.tolist()
+
+    new_times = [
+        offset_and_cut_one(start, end, offset, cutoff)
+        for start, end in zip(starts, ends)
+    ]
+    return (
+        [start + offset for start in starts],
+        [end + offset for end in ends],
+        [times is not None for times in new_times],
+    )
+
+
+def integer_milliseconds(starts, ends, offset, cutoff):
+    new_starts, new_ends, keep = offset_and_cut(
+        [parse_timestamp(start) for start in starts],
+        [parse_timestamp(end) for end in ends],
+        offset,
+        cutoff,
+    )
+    kept_starts = [start for start, kept in zip(new_starts, keep) if kept]
+    kept_ends = [end for end, kept in zip(new_ends, keep) if kept]
+    return list(zip(format_timestamps(kept_starts), format_timestamps(kept_ends)))
+
+
+def best_time(function, repeats, *args):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(cues: int = 20000, repeats: int = 3) -> dict:
+    """
+    Times the legacy and integer-millisecond offsets of the same random timestamps, for several offsets.
+    """
+
+    random.seed(0)
+    starts_ms = sorted(random.randrange(0, 36_000_000) for _ in range(cues))
+    starts = [format_timestamp(start) for start in starts_ms]
+    ends = [format_timestamp(start + 2500) for start in starts_ms]
+
+    results = []
+    for offset in (10, 1000, 60_000, 3_600_000, -3_600_000):
+        assert legacy(starts, ends, offset, -1) == integer_milliseconds(
+            starts, ends, offset, -1
+        )
+        results.append(
+            {
+                "offset": offset,
+                "legacy": best_time(legacy, repeats, starts, ends, offset, -1),
+                "integer_milliseconds": best_time(
+                    integer_milliseconds, repeats, starts, ends, offset, -1
+                ),
+            }
+        )
+
+    return {
+        "environment": environment(),
+        "parameters": {"cues": cues, "repeats": repeats},
+        "results": results,
+    }
+
+
+def print_table(report: dict) -> None:
+    print(
+        f"{report['parameters']['cues']} cues, numpy {'enabled' if report['environment']['numpy'] else 'disabled'}"
+    )
+    print(
+        f"{'offset (ms)':>12} {'legacy (s)':>12} {'integer ms (s)':>15} {'speedup':>8}"
+    )
+    for result in report["results"]:
+        legacy_time, new_time = result["legacy"], result["integer_milliseconds"]
+        print(
+            f"{result['offset']:>12} {legacy_time:>12.4f} {new_time:>15.4f} {legacy_time / new_time:>7.1f}x"
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_timestamps")
+    parser.add_argument("-n", type=int, default=20000, help="number of cues")
+    parser.add_argument("-r", type=int, default=3, help="number of repeats")
+    parser.add_argument(
+        "-o", help="file to write the JSON results to, instead of standard output"
+    )
+    args = parser.parse_args(args)
+
+    report = run(args.n, args.r)
+
+    if args.o:
+        Path(args.o).write_text(json.dumps(report, indent=2))
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
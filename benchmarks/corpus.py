@@ -0,0 +1,202 @@
+"""
+Generates synthetic captions files and conversions files for benchmarking.
+
+Captions are built from a fixed vocabulary, with stock lines such as '[MUSIC]' and speaker tags repeated the way they are in broadcast captions,
+so that conversions match a realistic share of captions. Every generator is seeded, so the same arguments always give the same files.
+
+Usage: python -m benchmarks.corpus <directory> [-n <cues>] [-d <cues per minute>] [-k <rules>] [-t <types>]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from captioneditor.streaming import HEADERS, format_cue
+from captioneditor.timestamps import format_timestamp
+
+CAPTIONS_TYPES = (".vtt", ".srt", ".dfxp", ".ttml")
+
+WORDS = (
+    "the a and to of in that it is was for on you with he as I his they be at one have this from "
+    "or had by not word but what some we can out other were all there when up use your how said an "
+    "each she which do their time if will way about many then them write would like so these her long "
+    "make thing see him two has look more day could go come did number sound no most people my over "
+    "know water than call first who may down side been now find any new work part take get place made "
+    "live where after back little only round man year came show every good me give our under name very "
+    "through just form sentence great think say help low line differ turn cause much mean before move "
+    "right boy old too same tell does set three want air well also play small end put home read hand "
+    "port large spell add even land here must big high such follow act why ask men change went light "
+    "kind off need house picture try us again animal point mother world near build self earth father "
+    "alright okay gonna wanna Marcela Kristian everyone everybody boxing fitness club workout punch"
+).split()
+
+STOCK_LINES = (
+    "[MUSIC]",
+    "[APPLAUSE]",
+    "[LAUGHTER]",
+    "[INDISTINCT CHATTER]",
+    "Thank you.",
+    "Alright, everyone.",
+    "Let's go!",
+)
+
+SPEAKERS = ("HOST:", "GUEST:", "NARRATOR:", ">>")
+
+DFXP_HEADER = """<?xml version="1.0" encoding="utf-8"?>
+<tt xml:lang="en" xmlns="http://www.w3.org/ns/ttml" xmlns:tts="http://www.w3.org/ns/ttml#styling">
+ <head>
+  <styling>
+   <style tts:color="white" tts:fontFamily="monospace" tts:fontSize="1c" xml:id="default"/>
+  </styling>
+  <layout>
+   <region tts:displayAlign="after" tts:textAlign="start" xml:id="bottom"/>
+  </layout>
+ </head>
+ <body>
+  <div region="bottom" xml:lang="en-US">
+"""
+
+DFXP_FOOTER = """  </div>
+ </body>
+</tt>
+"""
+
+
+def generate_cues(
+    count: int, cues_per_minute: float = 20, seed: int = 0
+) -> list[tuple[int, int, str]]:
+    """
+    Generates count (start, end, text) cues, with times in milliseconds, sorted by start time at roughly the given density.
+    About one cue in eight is a stock line and one in five starts with a speaker tag. Some cues have two lines.
+    """
+
+    rng = random.Random(seed)
+    spacing = 60_000 / cues_per_minute
+    cues = []
+    start = 0
+    for _ in range(count):
+        start += max(1, int(rng.uniform(0.8, 1.2) * spacing))
+        end = start + max(1, int(rng.uniform(0.5, 0.8) * spacing))
+
+        if rng.random() < 0.125:
+            text = rng.choice(STOCK_LINES)
+        else:
+            lines = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8)))
+                for _ in range(rng.choice((1, 1, 2)))
+            ]
+            lines[0] = lines[0][0].upper() + lines[0][1:] + rng.choice(".,?!")
+            if rng.random() < 0.2:
+                lines[0] = f"{rng.choice(SPEAKERS)} {lines[0]}"
+            text = "\n".join(lines)
+
+        cues.append((start, end, text))
+
+    return cues
+
+
+def format_captions(cues: list[tuple[int, int, str]], captions_type: str) -> str:
+    """
+    Formats cues as the contents of a captions file of the given type.
+    """
+
+    if captions_type in (".dfxp", ".ttml"):
+        paragraphs = [
+            f'   <p begin="{format_timestamp(start)}" end="{format_timestamp(end)}" region="bottom" style="default">\n'
+            f"    {'<br/>'.join(escape(line) for line in text.splitlines())}\n"
+            "   </p>\n"
+            for start, end, text in cues
+        ]
+        return DFXP_HEADER + "".join(paragraphs) + DFXP_FOOTER
+
+    return HEADERS[captions_type] + "".join(
+        format_cue(index, start, end, text, captions_type)
+        for index, (start, end, text) in enumerate(cues)
+    )
+
+
+def generate_conversions(rules: int, seed: int = 0) -> dict:
+    """
+    Generates the contents of a conversions file with the given number of rules. Most rules are plain replacements, split between
+    case-sensitive and case-insensitive, with some keyed to the previous caption and some direct conversions of stock lines.
+    Keys are drawn from the corpus vocabulary, so a share of them match, followed by unique keys that never match, as most of a large dictionary does not.
+    """
+
+    rng = random.Random(seed)
+    keys = list(dict.fromkeys(WORDS + [word.capitalize() for word in WORDS]))
+    rng.shuffle(keys)
+
+    conversions = []
+    for index in range(rules):
+        key = keys[index] if index < len(keys) else f"term{index}"
+        conversion = {"key": key, "replacement": key.upper()}
+
+        kind = rng.random()
+        if kind < 0.1:
+            conversion["previous"] = rng.choice(WORDS)
+        elif kind < 0.15 and index < len(STOCK_LINES):
+            conversion = {
+                "key": STOCK_LINES[index],
+                "replacement": STOCK_LINES[index].lower(),
+                "directConversion": True,
+            }
+        elif kind < 0.55:
+            conversion["caseSensitive"] = True
+
+        conversions.append(conversion)
+
+    return {"conversions": conversions}
+
+
+def write_corpus(
+    directory: Path | str,
+    cues: int = 1000,
+    cues_per_minute: float = 20,
+    rules: int = 100,
+    captions_types: tuple[str, ...] = CAPTIONS_TYPES,
+    seed: int = 0,
+) -> tuple[list[Path], Path]:
+    """
+    Writes one captions file of each type, holding the same cues, and a conversions file to the directory.
+    Returns the paths of the captions files and of the conversions file.
+    """
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    generated_cues = generate_cues(cues, cues_per_minute, seed)
+    captions_files = []
+    for captions_type in captions_types:
+        path = directory / f"corpus-{cues}{captions_type}"
+        path.write_text(format_captions(generated_cues, captions_type), encoding="utf8")
+        captions_files.append(path)
+
+    conversions_file = directory / f"conversions-{rules}.json"
+    conversions_file.write_text(json.dumps(generate_conversions(rules, seed)))
+
+    return captions_files, conversions_file
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.corpus")
+    parser.add_argument("directory", help="directory to write the corpus to")
+    parser.add_argument("-n", type=int, default=1000, help="number of cues")
+    parser.add_argument("-d", type=float, default=20, help="cues per minute")
+    parser.add_argument("-k", type=int, default=100, help="number of conversion rules")
+    parser.add_argument(
+        "-t", nargs="*", default=list(CAPTIONS_TYPES), help="captions types"
+    )
+    parser.add_argument("-seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(args)
+
+    captions_files, conversions_file = write_corpus(
+        args.directory, args.n, args.d, args.k, tuple(args.t), args.seed
+    )
+    for path in captions_files + [conversions_file]:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
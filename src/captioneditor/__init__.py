@@ -1 +1,10 @@
-from .editor import Editor
+# Editor is imported on first use, so that modules that do not need pycaption, such as the serve client, start quickly
+def __getattr__(name):
+    if name == "Editor":
+        from .editor import Editor
+
+        return Editor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["Editor"]
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .batch import BatchResult, BatchSummary, collect_captions_files
+from .cues import CueTable, render_cues
+from .editor import Editor
+from .formats import writer_groups
+
+# Editor kept by each worker thread or process of a batch's executor, along with the options it was created with
+_worker_state = threading.local()
+
+
+async def _run(executor: Executor | None, function: Callable, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+def _write_file(path: Path, contents: str) -> None:
+    with open(path, "w", encoding="utf8") as new_file:
+        new_file.write(contents)
+
+
+def _render(editor: Editor, cues: CueTable, extension: str) -> str:
+    return render_cues(editor._writer(extension), cues)
+
+
+async def edit_captions_text_async(
+    editor: Editor,
+    contents: str | bytes,
+    captions_type: str = ".vtt",
+    executor: Executor | None = None,
+) -> dict[str, str]:
+    """
+    Converts captions contents like Editor.edit_captions_text, parsing and editing in the executor and rendering every destination filetype concurrently.
+    The executor defaults to the event loop's default executor and must run its work in threads of this process.
+    """
+
+    if captions_type not in editor.READERS:
+        raise ValueError("Unsupported captions type")
+
+    groups = writer_groups(editor._dest_filetypes)
+    new_cues = await _run(executor, editor._edit_cues, contents, captions_type)
+    if new_cues is None:
+        return {}
+
+    # Filetypes rendered by the same writer, such as .ttml and .dfxp, are rendered once
+    rendered = await asyncio.gather(
+        *(
+            _run(executor, _render, editor, new_cues, extensions[0])
+            for extensions in groups
+        )
+    )
+    return {
+        extension: contents
+        for extensions, contents in zip(groups, rendered)
+        for extension in extensions
+    }
+
+
+async def edit_captions_async(
+    editor: Editor, executor: Executor | None = None
+) -> dict[str, str]:
+    """
+    Edits the editor's captions file like Editor.edit_captions, with the file reads, parsing, editing, and writes run in the executor.
+    Returns the rendered captions keyed by each destination file extension, which is empty if there were no captions to write.
+    """
+
+    if not editor._captions_file_path.is_file():
+        raise FileNotFoundError("Captions file not found")
+
+    # The destination is fixed when the edit starts, so that it is not affected by later changes to the editor
+    captions_type = editor._captions_file_path.suffix
+    dest_paths = {
+        extension: editor._dest_file_path(extension)
+        for extension in editor._dest_filetypes
+    }
+
+    contents = await _run(executor, editor._read_captions_contents)
+    rendered = await edit_captions_text_async(editor, contents, captions_type, executor)
+    if not rendered:
+        print("Cannot convert an empty captions file")
+        return {}
+
+    await asyncio.gather(
+        *(
+            _run(executor, _write_file, dest_paths[extension], contents)
+            for extension, contents in rendered.items()
+        )
+    )
+    return rendered
+
+
+def _edit_file(captions_file: Path, editor_options: dict) -> BatchResult:
+    """
+    Edits a single captions file of an async batch with the worker's editor, creating the editor the first time the worker is used for these options.
+    Works in both thread and process executors, since every thread and process keeps its own editor.
+    """
+
+    try:
+        editor = getattr(_worker_state, "editor", None)
+        if editor is None or _worker_state.editor_options != editor_options:
+            editor = Editor(captions_file=captions_file, **editor_options)
+            _worker_state.editor = editor
+            _worker_state.editor_options = editor_options
+        else:
+            editor.update_captions_path(captions_file)
+            editor.update_dest_directory(editor_options.get("dest_directory", ""))
+            editor.update_dest_filename()
+
+        new_cues = editor._edit_cue_table(editor._read_captions_cues())
+        rendered = {}
+        captions = 0
+        if new_cues is not None:
+            for extensions in writer_groups(editor._dest_filetypes):
+                contents = _render(editor, new_cues, extensions[0])
+                for extension in extensions:
+                    rendered[extension] = contents
+                    _write_file(editor._dest_file_path(extension), contents)
+            captions = len(new_cues)
+    except Exception as exc:
+        return BatchResult(captions_file, error=f"{type(exc).__name__}: {exc}")
+
+    return BatchResult(captions_file, captions=captions, outputs=rendered)
+
+
+async def edit_captions_batch_async(
+    sources: Iterable[str | Path],
+    concurrency: int = 8,
+    executor: Executor | None = None,
+    **editor_options,
+) -> BatchSummary:
+    """
+    Edits every captions file found in the given files, directories, and glob patterns like edit_captions_batch, without blocking the event loop.
+    At most concurrency files are in flight at once. The executor can be a thread or process pool, and defaults to the event loop's default executor.
+    Each result holds the rendered captions of its file. Cancelling the batch stops any file that has not started yet.
+    """
+
+    if "captions_file" in editor_options or "dest_filename" in editor_options:
+        raise ValueError(
+            "A batch cannot be given a captions file or destination filename"
+        )
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+
+    captions_files = collect_captions_files(sources)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def edit_one(captions_file: Path) -> BatchResult:
+        async with semaphore:
+            return await _run(executor, _edit_file, captions_file, editor_options)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(edit_one(captions_file) for captions_file in captions_files)
+    )
+    return BatchSummary(results=list(results), elapsed=time.perf_counter() - start)
@@ -0,0 +1,220 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from .editor import Editor, SUPPORTED_FILE_TYPES
+from .stats import EditStats
+
+GLOB_CHARACTERS = ("*", "?", "[")
+
+# Editor kept by each worker process so that the conversions are only compiled once per worker
+_worker_editor: Editor | None = None
+
+
+@dataclass
+class BatchResult:
+    """
+    The outcome of editing a single captions file as part of a batch.
+    """
+
+    captions_file: Path
+    captions: int = 0
+    error: str = ""
+
+    # Caption cache lookups made while editing the file
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    stats: EditStats | None = None
+
+    # Rendered captions keyed by file extension, kept by batches that return their outputs
+    outputs: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.error
+
+
+@dataclass
+class BatchSummary:
+    """
+    The results of a batch run along with its throughput.
+    """
+
+    results: list[BatchResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def failures(self) -> list[BatchResult]:
+        return [result for result in self.results if not result.succeeded]
+
+    @property
+    def captions(self) -> int:
+        return sum(result.captions for result in self.results)
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(result.cache_hits for result in self.results)
+
+    @property
+    def cache_misses(self) -> int:
+        return sum(result.cache_misses for result in self.results)
+
+    @property
+    def output_cache_hits(self) -> int:
+        return sum(
+            result.stats is not None and result.stats.output_cache_hit
+            for result in self.results
+        )
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def captions_per_second(self) -> float:
+        return self.captions / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        converted = len(self.results) - len(self.failures)
+        return (
+            f"Converted {converted} of {len(self.results)} files ({self.captions} captions) in {self.elapsed:.2f}s: "
+            f"{self.files_per_second:.2f} files/s, {self.captions_per_second:.2f} captions/s"
+        )
+
+
+def collect_captions_files(sources: Iterable[str | Path]) -> list[Path]:
+    """
+    Expands a collection of captions files, directories, and glob patterns into a sorted list of unique captions files.
+    Directories contribute every file directly inside them with a supported extension.
+    """
+
+    captions_files = set()
+    for source in sources:
+        source_str = str(source)
+        if any(character in source_str for character in GLOB_CHARACTERS):
+            candidates = [
+                Path(match) for match in glob.glob(source_str, recursive=True)
+            ]
+        elif Path(source).is_dir():
+            candidates = list(Path(source).iterdir())
+        else:
+            # Explicitly named files are always kept so that a missing file is reported rather than silently skipped
+            captions_files.add(Path(source))
+            continue
+
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix in SUPPORTED_FILE_TYPES:
+                captions_files.add(candidate)
+
+    return sorted(captions_files)
+
+
+def _edit_one(
+    captions_file: Path, editor_options: dict, share_caption_cache: bool = True
+) -> BatchResult:
+    """
+    Edits a single captions file with the worker's editor, creating the editor the first time the worker is used.
+    Unless share_caption_cache is True, the editor's caption cache is cleared before the file is edited.
+    """
+
+    global _worker_editor
+
+    try:
+        if _worker_editor is None:
+            _worker_editor = Editor(captions_file=captions_file, **editor_options)
+        else:
+            _worker_editor.update_captions_path(captions_file)
+            _worker_editor.update_dest_directory(
+                editor_options.get("dest_directory", "")
+            )
+            _worker_editor.update_dest_filename()
+
+        cache = _worker_editor.caption_cache
+        if not share_caption_cache:
+            cache.clear()
+        hits, misses = cache.hits, cache.misses
+
+        stats = _worker_editor.edit_captions()
+    except Exception as exc:
+        return BatchResult(captions_file, error=f"{type(exc).__name__}: {exc}")
+
+    return BatchResult(
+        captions_file,
+        captions=stats.captions_written,
+        cache_hits=cache.hits - hits,
+        cache_misses=cache.misses - misses,
+        stats=stats,
+    )
+
+
+def _reset_worker() -> None:
+    """
+    Discards the worker's editor so that the next file compiles the conversions for the current batch.
+    """
+
+    global _worker_editor
+    _worker_editor = None
+
+
+def edit_captions_batch(
+    sources: Iterable[str | Path],
+    workers: int | None = None,
+    share_caption_cache: bool = True,
+    **editor_options,
+) -> BatchSummary:
+    """
+    Edits every captions file found in the given files, directories, and glob patterns.
+    Any other keyword arguments accepted by Editor, except captions_file and dest_filename, are used for every file.
+    The files are spread across a pool of worker processes, each of which compiles the conversions once and reuses them for every file it is given.
+    If share_caption_cache is True, each worker also keeps its cache of processed captions from one file to the next.
+    A file that fails to convert is recorded in the summary rather than stopping the rest of the batch.
+    """
+
+    if "captions_file" in editor_options or "dest_filename" in editor_options:
+        raise ValueError(
+            "A batch cannot be given a captions file or destination filename"
+        )
+
+    captions_files = collect_captions_files(sources)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    results: dict[Path, BatchResult] = {}
+
+    if workers <= 1 or len(captions_files) <= 1:
+        _reset_worker()
+        for captions_file in captions_files:
+            results[captions_file] = _edit_one(
+                captions_file, editor_options, share_caption_cache
+            )
+        _reset_worker()
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(captions_files)), initializer=_reset_worker
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _edit_one, captions_file, editor_options, share_caption_cache
+                ): captions_file
+                for captions_file in captions_files
+            }
+            for future in as_completed(futures):
+                captions_file = futures[future]
+                try:
+                    results[captions_file] = future.result()
+                except Exception as exc:
+                    results[captions_file] = BatchResult(
+                        captions_file, error=f"{type(exc).__name__}: {exc}"
+                    )
+
+    return BatchSummary(
+        results=[results[captions_file] for captions_file in captions_files],
+        elapsed=time.perf_counter() - start,
+    )
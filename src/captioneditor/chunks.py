@@ -0,0 +1,222 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .editor import Editor
+from .streaming import HEADERS, STREAMING_FILE_TYPES, format_cue, read_cues
+
+# Each worker gets several chunks, so that a worker given slow chunks does not hold up the others
+CHUNKS_PER_WORKER = 4
+
+# Editor kept by each worker process, unpickled once from the editor that split the file
+_worker_editor: Editor | None = None
+
+
+@dataclass
+class ChunkResult:
+    """
+    The cues of one chunk of a captions file after the offset, cutoff, and conversions were applied by a worker.
+    """
+
+    # The previous caption keys the worker assumed were carried into the chunk, found by processing the caption just before it
+    keys_in: list[str] = field(default_factory=list)
+
+    # The original text, new start and end milliseconds, new text, and keys matched, of every caption that was processed
+    cues: list[tuple[str, int, int, str, list[str]]] = field(default_factory=list)
+
+    # Whether sorted captions passed the end of the window inside the chunk, so that no later caption can be included
+    stopped: bool = False
+
+
+def _next_block(file) -> int | None:
+    """
+    Skips the rest of the block the file is positioned in, and any blank lines after it, and returns the offset of the next block, or None at the end of the file.
+    """
+
+    line = file.readline()
+    while line.strip():
+        line = file.readline()
+
+    while line and not line.strip():
+        offset = file.tell()
+        line = file.readline()
+        if line.strip():
+            return offset
+
+    return None
+
+
+def split_chunks(
+    captions_file: Path, count: int
+) -> list[tuple[int, int, tuple[int, int] | None]]:
+    """
+    Splits a WebVTT or SRT file into about count chunks of similar size that begin at cue blocks, in file order.
+    Returns the start and end byte offsets of each chunk, along with the offsets of the block just before it, which is None for the first chunk.
+    """
+
+    size = captions_file.stat().st_size
+    boundaries = [(0, None)]
+    with open(captions_file, "rb") as file:
+        for index in range(1, count):
+            # Move to the first block that starts after an even split point, keeping the block before it as the lookback
+            file.seek(max(index * size // count, boundaries[-1][0]))
+            file.readline()
+            lookback_start = _next_block(file)
+            if lookback_start is None:
+                break
+            file.seek(lookback_start)
+            start = _next_block(file)
+            if start is None:
+                break
+            boundaries.append((start, (lookback_start, start)))
+
+    ends = [start for start, _ in boundaries[1:]] + [size]
+    return [
+        (start, end, lookback)
+        for (start, lookback), end in zip(boundaries, ends)
+        if end > start
+    ]
+
+
+def _read_lines(captions_file: Path, start: int, end: int) -> list[str]:
+    with open(captions_file, "rb") as file:
+        file.seek(start)
+        return file.read(end - start).decode("utf8").splitlines(keepends=True)
+
+
+def _set_worker_editor(editor: Editor) -> None:
+    global _worker_editor
+    _worker_editor = editor
+
+
+def _edit_chunk(
+    captions_file: Path, start: int, end: int, lookback: tuple[int, int] | None
+) -> ChunkResult:
+    """
+    Applies the offset, cutoff, and conversions to the cues of one chunk with the worker's editor.
+    The keys carried into the chunk are found by processing the caption just before it on its own, which is right unless that caption depends on the one before it.
+    """
+
+    editor = _worker_editor
+    result = ChunkResult()
+
+    editor._previous_caption_keys = []
+    if lookback is not None:
+        for cue in read_cues(_read_lines(captions_file, *lookback)):
+            editor._edit_cue(*cue)
+        result.keys_in = editor._previous_caption_keys
+
+    for cue_start, cue_end, caption_text in read_cues(
+        _read_lines(captions_file, start, end)
+    ):
+        if editor._past_window(cue_start):
+            result.stopped = True
+            break
+
+        edited_cue = editor._edit_cue(cue_start, cue_end, caption_text)
+        if edited_cue:
+            result.cues.append(
+                (caption_text, *edited_cue, editor._previous_caption_keys)
+            )
+
+    return result
+
+
+def edit_captions_parallel(editor: Editor, workers: int | None = None) -> int:
+    """
+    Converts a WebVTT or SRT captions file to WebVTT or SRT like Editor.edit_captions_stream, with the file split into chunks that are edited on a pool of worker processes.
+    The chunks are merged in order and renumbered. A chunk whose first captions were processed with the wrong keys from the previous caption is processed again from
+    the point where the keys differ until they agree, so the files written are exactly the same as the ones edit_captions_stream writes. Returns the number of captions written.
+    """
+
+    captions_type = editor._captions_file_path.suffix
+    if captions_type not in STREAMING_FILE_TYPES or any(
+        extension not in STREAMING_FILE_TYPES for extension in editor._dest_filetypes
+    ):
+        raise ValueError("Streaming is only supported for .srt and .vtt captions")
+    if not editor._captions_file_path.is_file():
+        raise FileNotFoundError("Captions file not found")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return editor.edit_captions_stream()
+
+    captions_file = editor._captions_file_path
+    chunks = split_chunks(captions_file, workers * CHUNKS_PER_WORKER)
+
+    caption_count = 0
+    previous_caption_keys: list[str] = []
+    with ExitStack() as stack:
+        executor = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_set_worker_editor,
+                initargs=(editor,),
+            )
+        )
+        futures = [
+            executor.submit(_edit_chunk, captions_file, *chunk) for chunk in chunks
+        ]
+
+        outputs = []
+        for future in futures:
+            result = future.result()
+            assumed_keys = result.keys_in
+            for caption_text, start, end, new_text, keys in result.cues:
+                if assumed_keys != previous_caption_keys:
+                    # The worker processed this caption with the wrong keys from the previous caption, so it is processed again with the right ones
+                    assumed_keys = keys
+                    editor._previous_caption_keys = previous_caption_keys
+                    new_text = editor._process_caption_contents(caption_text)
+                    keys = editor._previous_caption_keys
+                else:
+                    assumed_keys = keys
+                previous_caption_keys = keys
+
+                # Cues without any text are dropped, as they are by the pycaption writers
+                if not new_text:
+                    continue
+
+                # Destinations are only opened once there is a caption to write, so an empty captions file produces no files
+                if not outputs:
+                    outputs = [
+                        (
+                            extension,
+                            stack.enter_context(
+                                open(
+                                    editor._dest_file_path(extension),
+                                    "w",
+                                    encoding="utf8",
+                                )
+                            ),
+                        )
+                        for extension in editor._dest_filetypes
+                    ]
+                    for extension, output in outputs:
+                        output.write(HEADERS[extension])
+
+                for extension, output in outputs:
+                    output.write(
+                        format_cue(
+                            caption_count,
+                            start,
+                            end,
+                            new_text,
+                            extension,
+                            captions_type,
+                        )
+                    )
+                caption_count += 1
+
+            if result.stopped:
+                executor.shutdown(cancel_futures=True)
+                break
+
+    editor._previous_caption_keys = []
+    if not caption_count:
+        print("Cannot convert an empty captions file")
+
+    return caption_count
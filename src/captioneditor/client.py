@@ -0,0 +1,152 @@
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+# Only the standard library is imported here, so that the client starts without loading pycaption or the conversions
+
+# The header holding the token of a server listening on a localhost port
+TOKEN_HEADER = "X-Captioneditor-Token"
+
+
+def socket_path() -> Path:
+    """
+    Returns the path of the Unix socket that 'edit-captions serve' listens on by default. This is $CAPTIONEDITOR_SOCKET if set,
+    otherwise 'captioneditor.sock' in $XDG_RUNTIME_DIR, or a per-user socket in the temporary directory.
+    """
+
+    if os.environ.get("CAPTIONEDITOR_SOCKET"):
+        return Path(os.environ["CAPTIONEDITOR_SOCKET"])
+
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / "captioneditor.sock"
+
+    user = os.getuid() if hasattr(os, "getuid") else os.getlogin()
+    return Path(tempfile.gettempdir()) / f"captioneditor-{user}.sock"
+
+
+def token_path(port: int) -> Path:
+    """
+    Returns the file holding the token that clients of a server listening on the localhost port must send, which is kept next to the default Unix socket.
+    Only the user running the server can read it.
+    """
+
+    path = socket_path()
+    return path.with_name(f"{path.stem}-{port}.token")
+
+
+class ServerUnavailable(OSError):
+    """
+    Raised when the server cannot be connected to, or its token cannot be read, before any request has been sent to it.
+    """
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    An HTTP connection over a Unix socket.
+    """
+
+    def __init__(self, path: Path | str, timeout: float | None = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = str(path)
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def server_connection(timeout: float | None = None) -> http.client.HTTPConnection:
+    """
+    Returns a connection to the server, on localhost port $CAPTIONEDITOR_PORT if set, or on the default Unix socket otherwise.
+    """
+
+    if os.environ.get("CAPTIONEDITOR_PORT"):
+        return http.client.HTTPConnection(
+            "127.0.0.1", int(os.environ["CAPTIONEDITOR_PORT"]), timeout=timeout
+        )
+
+    return UnixHTTPConnection(socket_path(), timeout=timeout)
+
+
+def request(
+    method: str,
+    path: str,
+    body: dict | None = None,
+    connection: http.client.HTTPConnection | None = None,
+) -> dict:
+    """
+    Sends a request to the server and returns its JSON response. Raises ServerUnavailable if the server cannot be reached, or its token cannot be read,
+    and OSError or http.client.HTTPException if the connection fails once the request may have been sent.
+    """
+
+    connection = connection or server_connection()
+    headers = {"Content-Type": "application/json"}
+    try:
+        if not isinstance(connection, UnixHTTPConnection):
+            # Anyone on the machine can connect to a localhost port, so the server only accepts requests that show they could read its token
+            headers[TOKEN_HEADER] = token_path(connection.port).read_text().strip()
+        connection.connect()
+    except OSError as exc:
+        connection.close()
+        raise ServerUnavailable(exc) from exc
+
+    try:
+        connection.request(
+            method,
+            path,
+            body=json.dumps(body) if body is not None else None,
+            headers=headers,
+        )
+        response = connection.getresponse()
+        return json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def submit_job(args: list[str], cwd: Path | str | None = None) -> dict:
+    """
+    Runs 'edit-captions' with the given arguments on the server, with relative paths resolved against cwd, the current directory by default.
+    Returns a dict with the job's 'output', 'errors', and 'exit_code'.
+    """
+
+    return request("POST", "/jobs", {"args": args, "cwd": str(cwd or os.getcwd())})
+
+
+def main(args=None) -> int:
+    """
+    Runs 'edit-captions' on the server with the same arguments, falling back to running it in this process if no server is running.
+    Once the job may have reached the server it is never run again here, since it could already have written its files.
+    """
+
+    if args is None:
+        args = sys.argv[1:]
+
+    try:
+        result = submit_job(args)
+    except ServerUnavailable:
+        from .editor import main as editor_main
+
+        editor_main(args)
+        return 0
+    except (OSError, http.client.HTTPException, ValueError) as exc:
+        sys.stderr.write(
+            f"Lost the connection to the server, so the job may or may not have run: {exc}\n"
+        )
+        return 1
+
+    if "error" in result:
+        # Refused by the server, such as when the token sent is not its own
+        sys.stderr.write(f"{result['error']}\n")
+        return 1
+
+    sys.stdout.write(result["output"])
+    sys.stderr.write(result["errors"])
+    return result["exit_code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
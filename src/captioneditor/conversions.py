@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .patterns import compile_regex_conversions
+
+# Bump whenever the layout of CompiledConversions changes so that old cache entries are ignored
+CACHE_VERSION = 2
+
+# Conversions files with these extensions are conversions stores, compiled ahead of time by 'edit-captions build-conversions-store', rather than JSON
+STORE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+# Long-running processes, such as 'edit-captions serve', set this so that conversions loaded with the cache are kept in memory and reused until their file changes
+keep_loaded_conversions = False
+
+# Conversions already loaded by this process, keyed by the resolved path of the conversions file, along with the file's size, modification time, and inode when it was loaded
+LOADED_CONVERSIONS_SIZE = 16
+_loaded_conversions: OrderedDict[
+    Path, tuple[tuple[int, int, int], "CompiledConversions"]
+] = OrderedDict()
+_loaded_conversions_lock = threading.Lock()
+
+
+@dataclass
+class CompiledConversions:
+    """
+    The validated contents of a conversions file, with each conversion sorted into the kind of matching it needs.
+    """
+
+    offset: int = 0
+    cutoff: int = -1
+
+    # (key, replacement) pairs matched with and without case sensitivity
+    case_sensitive: list[tuple[str, str]] = field(default_factory=list)
+    case_insensitive: list[tuple[str, str]] = field(default_factory=list)
+
+    # (key, replacement) pairs that only apply when their previous key was matched in the preceding caption
+    previous: dict[str, list[tuple[str, str]]] = field(default_factory=dict)
+
+    # Entire captions that are replaced when they match exactly
+    direct: dict[str, str] = field(default_factory=dict)
+
+    # (pattern, replacement, case sensitive) regular expressions, applied together in a single pass before any keys are matched
+    regex: list[tuple[str, str, bool]] = field(default_factory=list)
+
+
+def parse_conversions(conversions_data: dict) -> CompiledConversions:
+    """
+    Validates the contents of a conversions file and sorts its conversions. Raises a ValueError if the contents are invalid.
+    """
+
+    # Verify that the structure of the file matches what's expected
+    if len(conversions_data) > 3 or any(
+        key not in ("offset", "cutoff", "conversions")
+        for key in conversions_data.keys()
+    ):
+        raise ValueError("Invalid conversions.json contents")
+
+    compiled = CompiledConversions()
+
+    # Set the offset, cutoff, and the list of conversions
+    if "offset" in conversions_data:
+        if not isinstance(conversions_data["offset"], int):
+            raise ValueError("Offset must be integer")
+        compiled.offset = conversions_data["offset"]
+
+    if "cutoff" in conversions_data:
+        if not isinstance(conversions_data["cutoff"], int):
+            raise ValueError("Cutoff must be integer")
+        compiled.cutoff = conversions_data["cutoff"]
+
+    if not isinstance(conversions_data["conversions"], list):
+        raise ValueError("Conversions must be list")
+
+    for conversion in conversions_data["conversions"]:
+        if "key" not in conversion:
+            continue
+        if "replacement" not in conversion:
+            continue
+        key = conversion["key"]
+        replacement = conversion["replacement"]
+
+        # First check if the current conversion is dependent on a match occurring in the preceding caption.
+        # Every conversion keyed to the same previous value applies, rather than only the last one, as the format describes.
+        if "previous" in conversion and conversion["previous"]:
+            compiled.previous.setdefault(conversion["previous"], []).append(
+                (key, replacement)
+            )
+
+        # Captions meant to be converted directly, without any partial replacement
+        elif "directConversion" in conversion and conversion["directConversion"]:
+            compiled.direct[key] = replacement
+
+        elif "regex" in conversion and conversion["regex"]:
+            compiled.regex.append(
+                (key, replacement, bool(conversion.get("caseSensitive")))
+            )
+
+        elif "caseSensitive" in conversion and conversion["caseSensitive"]:
+            compiled.case_sensitive.append((key, replacement))
+        else:
+            compiled.case_insensitive.append((key, replacement))
+
+    # Invalid patterns are reported when the conversions are loaded rather than when the first caption is edited
+    if compiled.regex:
+        compile_regex_conversions(tuple(compiled.regex))
+
+    return compiled
+
+
+def is_conversions_store(conversions_file: Path | str) -> bool:
+    return Path(conversions_file).suffix in STORE_SUFFIXES
+
+
+def conversions_cache_dir() -> Path:
+    """
+    Returns the directory compiled conversions are cached in. This is $CAPTIONEDITOR_CACHE_DIR if set, otherwise 'captioneditor' in the user's cache directory.
+    """
+
+    if os.environ.get("CAPTIONEDITOR_CACHE_DIR"):
+        return Path(os.environ["CAPTIONEDITOR_CACHE_DIR"])
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "captioneditor"
+
+
+def conversions_cache_path(contents: bytes, cache_dir: Path | None = None) -> Path:
+    """
+    Returns the cache file path for conversions file contents, keyed by a hash of the contents.
+    """
+
+    digest = hashlib.sha256(contents).hexdigest()
+    return (cache_dir or conversions_cache_dir()) / (
+        f"conversions-v{CACHE_VERSION}-{digest}.pickle"
+    )
+
+
+def _write_cache(cache_path: Path, compiled: CompiledConversions) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first so that a concurrent reader never sees a partial cache entry.
+    # Only built-in types are pickled so that the cache does not depend on how the package was imported.
+    temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(temp_path, "wb") as cache_file:
+        pickle.dump(vars(compiled), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, cache_path)
+
+
+def load_conversions(
+    conversions_file: Path | str, use_cache: bool = True
+) -> CompiledConversions:
+    """
+    Loads and compiles a conversions file. If use_cache is True, the compiled conversions are loaded from the cache when
+    the cache holds an entry for the file's current contents, and otherwise are compiled and saved to the cache.
+    If keep_loaded_conversions is set, conversions loaded with use_cache are also kept in memory and returned again, without reading the file, until the file changes.
+    Conversions stores, such as conversions.sqlite, are already compiled, so they are loaded directly rather than through the cache.
+    """
+
+    load = _load_cached_conversions
+    if is_conversions_store(conversions_file):
+        from .conversions_store import load_conversions_store
+
+        load = load_conversions_store
+    elif not use_cache:
+        with open(conversions_file, "rb") as conversions_json:
+            return parse_conversions(json.loads(conversions_json.read()))
+
+    if not use_cache or not keep_loaded_conversions:
+        return load(conversions_file)
+
+    # Conversions this process has already loaded are reused as long as the file has not changed since
+    path = Path(conversions_file).resolve()
+    stat = path.stat()
+    stat_key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    with _loaded_conversions_lock:
+        loaded = _loaded_conversions.get(path)
+        if loaded and loaded[0] == stat_key:
+            _loaded_conversions.move_to_end(path)
+            return loaded[1]
+
+    compiled = load(path)
+
+    with _loaded_conversions_lock:
+        _loaded_conversions[path] = (stat_key, compiled)
+        _loaded_conversions.move_to_end(path)
+        if len(_loaded_conversions) > LOADED_CONVERSIONS_SIZE:
+            _loaded_conversions.popitem(last=False)
+
+    return compiled
+
+
+def _load_cached_conversions(conversions_file: Path | str) -> CompiledConversions:
+    with open(conversions_file, "rb") as conversions_json:
+        contents = conversions_json.read()
+
+    cache_path = conversions_cache_path(contents)
+    try:
+        with open(cache_path, "rb") as cache_file:
+            return CompiledConversions(**pickle.load(cache_file))
+    except (OSError, pickle.UnpicklingError, EOFError, TypeError):
+        # A missing or unreadable cache entry is rebuilt
+        pass
+
+    compiled = parse_conversions(json.loads(contents))
+    try:
+        _write_cache(cache_path, compiled)
+    except OSError:
+        # The cache is only an optimization, so a read-only cache directory is not an error
+        pass
+
+    return compiled
+
+
+def loaded_conversions_files() -> list[Path]:
+    """
+    Returns the resolved paths of the conversions files kept in memory, most recently used last.
+    """
+
+    with _loaded_conversions_lock:
+        return list(_loaded_conversions)
+
+
+def compile_conversions(
+    conversions_file: Path | str, cache_dir: Path | str | None = None
+) -> Path:
+    """
+    Compiles a conversions file and saves it to the cache, replacing any existing entry. Returns the path of the cache entry.
+    """
+
+    with open(conversions_file, "rb") as conversions_json:
+        contents = conversions_json.read()
+
+    compiled = parse_conversions(json.loads(contents))
+    cache_path = conversions_cache_path(
+        contents, Path(cache_dir) if cache_dir else None
+    )
+    _write_cache(cache_path, compiled)
+    return cache_path
+
+
+def main(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="edit-captions compile-conversions",
+        description="Prebuild the cache of compiled conversions used by edit-captions. The cache is kept in $CAPTIONEDITOR_CACHE_DIR or the user's cache directory.",
+    )
+    parser.add_argument(
+        "conversions_filenames",
+        nargs="+",
+        help="the conversions JSON files to compile",
+    )
+    args = parser.parse_args(args)
+
+    for conversions_filename in args.conversions_filenames:
+        cache_path = compile_conversions(conversions_filename)
+        print(f"Compiled {conversions_filename} to {cache_path}")
+
+    return args
@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import sqlite3
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+from .conversions import CompiledConversions, is_conversions_store, parse_conversions
+
+# Bump whenever the layout of the store changes. Stored as the database's user_version, so that a store written by another version is rejected.
+STORE_VERSION = 2
+
+# The kinds of conversion, in the order their rows are written and read back
+KINDS = (
+    "case_sensitive",
+    "case_insensitive",
+    "previous",
+    "direct",
+    "regex",
+    "case_sensitive_regex",
+)
+CASE_SENSITIVE, CASE_INSENSITIVE, PREVIOUS, DIRECT, REGEX, CASE_SENSITIVE_REGEX = range(
+    len(KINDS)
+)
+
+SCHEMA = """
+CREATE TABLE settings (name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE previous_keys (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE);
+CREATE TABLE conversions (
+    id INTEGER PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    replacement TEXT NOT NULL,
+    previous_id INTEGER REFERENCES previous_keys (id)
+);
+"""
+
+
+def _rows(compiled: CompiledConversions, previous_ids: dict[str, int]):
+    for key, replacement in compiled.case_sensitive:
+        yield CASE_SENSITIVE, key, replacement, None
+    for key, replacement in compiled.case_insensitive:
+        yield CASE_INSENSITIVE, key, replacement, None
+    for previous, previous_conversions in compiled.previous.items():
+        for key, replacement in previous_conversions:
+            yield PREVIOUS, key, replacement, previous_ids[previous]
+    for key, replacement in compiled.direct.items():
+        yield DIRECT, key, replacement, None
+    for pattern, replacement, case_sensitive in compiled.regex:
+        kind = CASE_SENSITIVE_REGEX if case_sensitive else REGEX
+        yield kind, pattern, replacement, None
+
+
+def _fetch(connection: sqlite3.Connection, kind: int) -> list[tuple[str, str]]:
+    return connection.execute(
+        "SELECT key, replacement FROM conversions WHERE kind = ? ORDER BY id", (kind,)
+    ).fetchall()
+
+
+def write_conversions_store(
+    compiled: CompiledConversions, store_path: Path | str
+) -> None:
+    """
+    Writes compiled conversions to a conversions store, an SQLite database holding one row per conversion and each previous key only once.
+    The store is written to a temporary file first and then replaces any existing store, so that an editor never loads a partial store.
+    """
+
+    store_path = Path(store_path)
+    temp_path = store_path.with_name(f"{store_path.name}.{os.getpid()}.tmp")
+    temp_path.unlink(missing_ok=True)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+            connection.executemany(
+                "INSERT INTO settings VALUES (?, ?)",
+                [("offset", compiled.offset), ("cutoff", compiled.cutoff)],
+            )
+
+            previous_ids = {
+                previous: previous_id
+                for previous_id, previous in enumerate(compiled.previous, 1)
+            }
+            connection.executemany(
+                "INSERT INTO previous_keys VALUES (?, ?)",
+                (
+                    (previous_id, previous)
+                    for previous, previous_id in previous_ids.items()
+                ),
+            )
+
+            # Rows are numbered in the order they are read back, so that every list and dict is rebuilt in the same order
+            connection.executemany(
+                "INSERT INTO conversions (kind, key, replacement, previous_id) VALUES (?, ?, ?, ?)",
+                _rows(compiled, previous_ids),
+            )
+    finally:
+        connection.close()
+
+    os.replace(temp_path, store_path)
+
+
+def load_conversions_store(store_path: Path | str) -> CompiledConversions:
+    """
+    Loads compiled conversions from a conversions store. The rows of each kind of conversion are read from the database straight into the compiled conversions,
+    without parsing JSON or building any intermediate dicts, and every conversion keyed to the same previous key shares the one string read for it.
+    Raises a ValueError if the file is not a conversions store written by this version.
+    """
+
+    # The store is opened read-only, so that loading it never creates or changes a file
+    try:
+        connection = sqlite3.connect(
+            f"{Path(store_path).resolve().as_uri()}?mode=ro", uri=True
+        )
+    except sqlite3.Error as exc:
+        raise ValueError(f"Cannot open conversions store: {exc}") from exc
+
+    try:
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != STORE_VERSION:
+            raise ValueError(
+                "Conversions store was built by a different version, build it again"
+            )
+
+        settings = dict(connection.execute("SELECT name, value FROM settings"))
+        compiled = CompiledConversions(
+            offset=settings.get("offset", 0), cutoff=settings.get("cutoff", -1)
+        )
+
+        # Rows come back from the database as (key, replacement) tuples, so each kind is fetched straight into its list or dict
+        compiled.case_sensitive = _fetch(connection, CASE_SENSITIVE)
+        compiled.case_insensitive = _fetch(connection, CASE_INSENSITIVE)
+        compiled.direct = dict(_fetch(connection, DIRECT))
+        compiled.regex = [
+            (pattern, replacement, kind == CASE_SENSITIVE_REGEX)
+            for pattern, replacement, kind in connection.execute(
+                "SELECT key, replacement, kind FROM conversions WHERE kind IN (?, ?) ORDER BY id",
+                (REGEX, CASE_SENSITIVE_REGEX),
+            )
+        ]
+
+        previous_keys = dict(connection.execute("SELECT id, key FROM previous_keys"))
+        for previous_id, rows in groupby(
+            connection.execute(
+                "SELECT previous_id, key, replacement FROM conversions WHERE kind = ? ORDER BY id",
+                (PREVIOUS,),
+            ),
+            key=itemgetter(0),
+        ):
+            compiled.previous.setdefault(previous_keys[previous_id], []).extend(
+                row[1:] for row in rows
+            )
+    except sqlite3.Error as exc:
+        raise ValueError(f"Invalid conversions store: {exc}") from exc
+    finally:
+        connection.close()
+
+    return compiled
+
+
+def build_conversions_store(
+    conversions_file: Path | str, store_path: Path | str | None = None
+) -> Path:
+    """
+    Compiles a conversions JSON file into a conversions store, next to the JSON file with a .sqlite extension unless a store path is given. Returns the path of the store.
+    """
+
+    with open(conversions_file, "rb") as conversions_json:
+        compiled = parse_conversions(json.loads(conversions_json.read()))
+
+    store_path = Path(store_path or Path(conversions_file).with_suffix(".sqlite"))
+    write_conversions_store(compiled, store_path)
+    return store_path
+
+
+def main(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="edit-captions build-conversions-store",
+        description="Compile a conversions JSON file into an SQLite conversions store, which edit-captions loads without parsing the JSON. Use the store as the conversions file with -c.",
+    )
+    parser.add_argument(
+        "conversions_filename", help="the conversions JSON file to compile"
+    )
+    parser.add_argument(
+        "store_filename",
+        nargs="?",
+        help="the store to write, which must end in .sqlite, .sqlite3, or .db. Default is the conversions file with a .sqlite extension.",
+    )
+    args = parser.parse_args(args)
+
+    if args.store_filename and not is_conversions_store(args.store_filename):
+        parser.error("the store must end in .sqlite, .sqlite3, or .db")
+
+    store_path = build_conversions_store(args.conversions_filename, args.store_filename)
+    print(f"Compiled {args.conversions_filename} to {store_path}")
+    return args
@@ -0,0 +1,233 @@
+from array import array
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from .timestamps import offset_and_cut_columns
+
+if TYPE_CHECKING:
+    from pycaption import Caption, CaptionNode, CaptionSet
+
+
+def _is_plain_text(nodes: list["CaptionNode"], text: str) -> bool:
+    """
+    Returns whether the nodes are exactly the text and line break nodes that a caption with the given text is built from, one text node for each line.
+    """
+
+    from pycaption import CaptionNode
+
+    lines = text.split("\n")
+    if len(nodes) != 2 * len(lines) - 1:
+        return False
+
+    for index, node in enumerate(nodes):
+        if index % 2:
+            if node.type_ != CaptionNode.BREAK or node.content is not None:
+                return False
+        elif (
+            node.type_ != CaptionNode.TEXT
+            or node.content != lines[index // 2]
+            or node.start is not None
+        ):
+            return False
+    return True
+
+
+class CueTable:
+    """
+    Captions held as columns instead of one object per caption: start and end times in milliseconds in arrays of 64-bit integers, and the text and identifier of
+    every caption in one UTF-8 buffer each, with an array of the offset each one ends at. Each caption takes a few dozen bytes, rather than the hundreds that a
+    pycaption Caption with its list of nodes takes.
+
+    Lines of text are separated by '\\n'. Captions whose nodes cannot be rebuilt from their text, such as ones with inline styling, also keep a copy of their nodes,
+    without positioning, in nodes.
+    """
+
+    __slots__ = (
+        "starts",
+        "ends",
+        "_text",
+        "_text_ends",
+        "_identifiers",
+        "_identifier_ends",
+        "nodes",
+    )
+
+    def __init__(self) -> None:
+        self.starts = array("q")
+        self.ends = array("q")
+        self._text = bytearray()
+        self._text_ends = array("q")
+        self._identifiers = bytearray()
+        self._identifier_ends = array("q")
+
+        # The nodes of the captions that keep them, keyed by row
+        self.nodes: dict[int, list["CaptionNode"]] = {}
+
+    @classmethod
+    def from_captions(cls, captions: Iterable["Caption"]) -> "CueTable":
+        """
+        Returns a table of pycaption captions, with their times truncated to whole milliseconds, matching the precision of the supported formats.
+        """
+
+        cues = cls()
+        for caption in captions:
+            cues.append_caption(caption)
+        return cues
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[tuple[int, int, str]]:
+        """
+        Iterates over the (start, end, text) of every caption, with times in milliseconds.
+        """
+
+        for index in range(len(self)):
+            yield self.starts[index], self.ends[index], self.text(index)
+
+    def append(
+        self,
+        start: int,
+        end: int,
+        text: str | bytes,
+        identifier: str = "",
+        nodes: list["CaptionNode"] | None = None,
+    ) -> None:
+        """
+        Adds a caption with times in milliseconds. Text already encoded as UTF-8 is added as it is. Nodes are only kept for captions whose nodes cannot be rebuilt from their text.
+        """
+
+        if nodes is not None:
+            self.nodes[len(self.starts)] = nodes
+        self.starts.append(start)
+        self.ends.append(end)
+        self._text += text.encode("utf8") if isinstance(text, str) else text
+        self._text_ends.append(len(self._text))
+        if identifier:
+            self._identifiers += identifier.encode("utf8")
+        self._identifier_ends.append(len(self._identifiers))
+
+    def append_caption(self, caption: "Caption") -> None:
+        """
+        Adds a pycaption caption, with its times truncated to whole milliseconds.
+        """
+
+        from pycaption import CaptionNode
+
+        text = "".join(caption.get_text_nodes())
+        nodes = None
+        if not _is_plain_text(caption.nodes, text):
+            # Positioning from the original format is not carried over, but inline styling is
+            nodes = [
+                CaptionNode(node.type_, content=node.content, start=node.start)
+                for node in caption.nodes
+            ]
+        self.append(caption.start // 1000, caption.end // 1000, text, nodes=nodes)
+
+    def append_edited(
+        self, cues: "CueTable", index: int, start: int, end: int, new_text: str
+    ) -> None:
+        """
+        Adds the caption at the index of another table with new times and text. Its identifier is kept, and so are its nodes unless the text was changed.
+        """
+
+        self.append(
+            start,
+            end,
+            new_text,
+            cues.identifier(index),
+            cues.nodes.get(index) if new_text == cues.text(index) else None,
+        )
+
+    def append_copy(self, cues: "CueTable", index: int, start: int, end: int) -> None:
+        """
+        Adds the caption at the index of another table with new times, copying its text, identifier, and nodes without decoding them.
+        """
+
+        text_start = cues._text_ends[index - 1] if index else 0
+        identifier_start = cues._identifier_ends[index - 1] if index else 0
+        self.append(
+            start,
+            end,
+            cues._text[text_start : cues._text_ends[index]],
+            nodes=cues.nodes.get(index),
+        )
+        self._identifiers += cues._identifiers[
+            identifier_start : cues._identifier_ends[index]
+        ]
+        self._identifier_ends[-1] = len(self._identifiers)
+
+    def text(self, index: int) -> str:
+        start = self._text_ends[index - 1] if index else 0
+        return self._text[start : self._text_ends[index]].decode("utf8")
+
+    def identifier(self, index: int) -> str:
+        start = self._identifier_ends[index - 1] if index else 0
+        return self._identifiers[start : self._identifier_ends[index]].decode("utf8")
+
+    def offset_and_cut(
+        self, offset: int, cutoff: int | float, window_start: int | float = 0
+    ) -> tuple[array, array, bytes]:
+        """
+        Applies the offset, cutoff, and window start to every caption at once, without changing the table. See offset_and_cut_columns.
+        """
+
+        return offset_and_cut_columns(
+            self.starts, self.ends, offset, cutoff, window_start
+        )
+
+    def to_caption_set(self) -> "CaptionSet":
+        """
+        Returns the captions as a pycaption caption set, for writers that only write caption sets. Captions without kept nodes get a text node for each line.
+        """
+
+        from pycaption import Caption, CaptionList, CaptionNode, CaptionSet
+        from pycaption.geometry import HorizontalAlignmentEnum
+
+        captions = CaptionList()
+        for index, (start, end, text) in enumerate(self):
+            nodes = self.nodes.get(index)
+            if nodes is None:
+                nodes = []
+                for line_number, line in enumerate(text.split("\n")):
+                    if line_number:
+                        nodes.append(CaptionNode.create_break())
+                    nodes.append(CaptionNode.create_text(line))
+            else:
+                nodes = [
+                    CaptionNode(node.type_, content=node.content, start=node.start)
+                    for node in nodes
+                ]
+            captions.append(Caption(start * 1000, end * 1000, nodes))
+
+        return CaptionSet(
+            {"en-US": captions},
+            visual_alignment_default=HorizontalAlignmentEnum.CENTER,
+        )
+
+    def nbytes(self) -> int:
+        """
+        Returns the number of bytes the columns hold, not counting kept nodes.
+        """
+
+        return sum(
+            column.itemsize * len(column) if isinstance(column, array) else len(column)
+            for column in (
+                self.starts,
+                self.ends,
+                self._text,
+                self._text_ends,
+                self._identifiers,
+                self._identifier_ends,
+            )
+        )
+
+
+def render_cues(writer, cues: CueTable) -> str:
+    """
+    Renders the captions with a writer, straight from the table if the writer can write tables, or from a caption set built for it otherwise.
+    """
+
+    write_cues = getattr(writer, "write_cues", None)
+    if write_cues is not None:
+        return write_cues(cues)
+    return writer.write(cues.to_caption_set())
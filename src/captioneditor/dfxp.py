@@ -0,0 +1,209 @@
+import re
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+from pycaption import (
+    Caption,
+    CaptionList,
+    CaptionNode,
+    CaptionReadNoCaptions,
+    CaptionSet,
+    DFXPReader,
+)
+from pycaption.base import DEFAULT_LANGUAGE_CODE
+from pycaption.geometry import HorizontalAlignmentEnum
+
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
+TIMING_PARAMETER = "{http://www.w3.org/ns/ttml#parameter}"
+STYLING = "{http://www.w3.org/ns/ttml#styling}"
+
+# The same leading whitespace and time expressions that DFXPReader accepts
+LEADING_WHITESPACE = re.compile("^(?:[\n\r]+[ \t\n\r]*)?(.+)")
+TIME_EXPRESSION = re.compile(
+    r"^(?:(?P<hours>\d+):(?P<minutes>\d{2}):(?P<seconds>\d{2})(?:\.(?P<sub_frames>\d+))?"
+    r"|(?P<time_count>\d+(?:\.\d+)?)(?P<metric>h|m|s|ms))$"
+)
+MICROSECONDS_PER_METRIC = {"h": 3600000000, "m": 60000000, "s": 1000000, "ms": 1000}
+
+# Attributes of the body, its divisions, and their paragraphs that are read, or that DFXPReader reads without ever failing on them
+BODY_ATTRIBUTES = {"begin", "end", "dur", "region", "style", XML_LANG, XML_ID}
+
+# Positioning that DFXPReader resolves for every caption and can fail to parse
+POSITIONING_ATTRIBUTES = {STYLING + "origin", STYLING + "extent", STYLING + "padding"}
+
+# Markup that an XML parser and DFXPReader's HTML parser read differently: prefixed element names, comments, CDATA sections, and document types,
+# closing break tags, and carriage returns, which XML folds into line feeds
+DIFFERENTLY_PARSED = re.compile(r"<[A-Za-z_][\w.-]*:|<!|</br\s*>|\r")
+
+# How much of the document is parsed before the captions found so far are collected, and their paragraphs dropped from the parser's tree
+FEED_SIZE = 1 << 16
+
+
+class UnsupportedDocument(Exception):
+    """
+    Raised for documents outside the subset of TTML that StreamingDFXPReader reads, which are read with DFXPReader instead.
+    """
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def _microseconds(time_expression: str | None) -> int:
+    """
+    Converts a clock time without frames, or an offset time in hours, minutes, seconds, or milliseconds, to microseconds exactly as DFXPReader does.
+    """
+
+    match = TIME_EXPRESSION.match(time_expression or "")
+    if not match:
+        raise UnsupportedDocument
+
+    if match["metric"]:
+        return int(
+            float(match["time_count"]) * MICROSECONDS_PER_METRIC[match["metric"]]
+        )
+
+    microseconds = (
+        int(match["hours"]) * 3600000000
+        + int(match["minutes"]) * 60000000
+        + int(match["seconds"]) * 1000000
+    )
+    if match["sub_frames"]:
+        microseconds += int(match["sub_frames"].ljust(3, "0")) * 1000
+    return microseconds
+
+
+def _text_node(text: str | None) -> CaptionNode | None:
+    match = LEADING_WHITESPACE.search(text) if text else None
+    return CaptionNode.create_text(match.group(1)) if match else None
+
+
+class StreamingDFXPReader(DFXPReader):
+    """
+    Reads DFXP and TTML captions with an XML pull parser, building each caption as its paragraph is parsed and discarding the paragraph afterwards, so that no tree
+    of the whole document is built. The document itself is still decoded and held in memory whole, as it is by DFXPReader, and fed to the parser in pieces.
+    Only reads the subset of TTML that captions are written in: paragraphs of text and line breaks, inside divisions of the body, timed with clock times or offset
+    times without frames or ticks. Any other document is read by DFXPReader itself.
+
+    The captions read have the same text, times, and languages as DFXPReader's, but not its styling: the styles of the head and the style attributes of paragraphs
+    are not read, so the captions have no styles. Edited captions do not keep styles, so the editor writes the same files with either reader.
+    """
+
+    def read(self, content) -> CaptionSet:
+        content = self._decode_content(content)
+        if DIFFERENTLY_PARSED.search(content):
+            return super().read(content)
+
+        try:
+            captions = self._read_captions(content)
+        except (UnsupportedDocument, ParseError):
+            return super().read(content)
+
+        caption_set = CaptionSet(
+            captions, visual_alignment_default=HorizontalAlignmentEnum.START
+        )
+        if caption_set.is_empty():
+            raise CaptionReadNoCaptions("empty caption file")
+
+        return caption_set
+
+    def _read_captions(self, content: str) -> dict[str, CaptionList]:
+        """
+        Parses the document and returns the captions of each division keyed by language. Like DFXPReader, a later division replaces an earlier one with the same language.
+        Raises UnsupportedDocument as soon as anything outside the supported subset is found.
+        """
+
+        parser = XMLPullParser(events=("start", "end"))
+        captions: dict[str, CaptionList] = {}
+        default_language = DEFAULT_LANGUAGE_CODE
+        # The names of the open elements, and the open elements of the body
+        path: list[str] = []
+        body_elements = []
+        division = CaptionList()
+        language = ""
+
+        for offset in range(0, len(content), FEED_SIZE):
+            parser.feed(content[offset : offset + FEED_SIZE])
+            for event, element in parser.read_events():
+                name = _local_name(element.tag)
+                if event == "end":
+                    path.pop()
+                    if path[:2] != ["tt", "body"]:
+                        continue
+
+                    body_elements.pop()
+                    if name == "p":
+                        caption = self._convert_paragraph(element)
+                        if caption is not None:
+                            division.append(caption)
+                        # The paragraph has been read, so it is dropped from the tree to keep memory use flat
+                        body_elements[-1].remove(element)
+                    elif name == "div":
+                        captions[language] = division
+                        body_elements[-1].remove(element)
+                    continue
+
+                path.append(name)
+                if POSITIONING_ATTRIBUTES.intersection(element.attrib):
+                    raise UnsupportedDocument
+
+                if len(path) == 1:
+                    if name != "tt" or any(
+                        key.startswith(TIMING_PARAMETER) for key in element.attrib
+                    ):
+                        raise UnsupportedDocument
+                    default_language = element.get(XML_LANG, default_language)
+                    continue
+
+                if path[:2] != ["tt", "body"]:
+                    # DFXPReader finds divisions and paragraphs anywhere in the document, not only in the body
+                    if name in ("div", "p", "span", "br"):
+                        raise UnsupportedDocument
+                    continue
+
+                # Only the body, divisions directly inside it, paragraphs directly inside those, and line breaks inside paragraphs are read
+                if (
+                    len(path) > 5
+                    or name != ("body", "div", "p", "br")[len(path) - 2]
+                    or any(
+                        key not in BODY_ATTRIBUTES and not key.startswith(STYLING)
+                        for key in element.attrib
+                    )
+                ):
+                    raise UnsupportedDocument
+                body_elements.append(element)
+                if name == "div":
+                    division = CaptionList()
+                    language = element.get(XML_LANG, default_language)
+
+        parser.close()
+        return captions
+
+    @staticmethod
+    def _convert_paragraph(paragraph) -> Caption | None:
+        # Paragraphs without any text are skipped before their times are read, as they are by DFXPReader
+        texts = [paragraph.text] + [line_break.tail for line_break in paragraph]
+        if not "".join(text for text in texts if text).strip():
+            return None
+
+        start = _microseconds(paragraph.get("begin"))
+        if paragraph.get("end"):
+            end = _microseconds(paragraph.get("end"))
+        elif paragraph.get("dur"):
+            end = start + _microseconds(paragraph.get("dur"))
+        else:
+            raise UnsupportedDocument
+
+        nodes = []
+        text_node = _text_node(paragraph.text)
+        if text_node:
+            nodes.append(text_node)
+        for line_break in paragraph:
+            if line_break.attrib or line_break.text:
+                raise UnsupportedDocument
+            nodes.append(CaptionNode.create_break())
+            text_node = _text_node(line_break.tail)
+            if text_node:
+                nodes.append(text_node)
+
+        return Caption(start, end, nodes) if nodes else None
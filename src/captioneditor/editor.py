@@ -1,51 +1,96 @@
-import webvtt
 import argparse
-from pathlib import Path
 import json
-import re
+import threading
+from pathlib import Path
 import sys
-from flashtext2 import KeywordProcessor
-from pycaption import (
-    WebVTTReader,
-    SRTReader,
-    DFXPReader,
-    WebVTTWriter,
-    SRTWriter,
-    DFXPWriter,
-    CaptionReadNoCaptions,
+from bisect import bisect_left, bisect_right
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
 )
+from contextlib import ExitStack
+from copy import copy
+from dataclasses import asdict
+from importlib import import_module
+from io import SEEK_END, TextIOWrapper
+from itertools import chain
+from time import perf_counter
+from typing import Iterable, Iterator, TextIO
+from .streaming import (
+    STREAMING_FILE_TYPES,
+    HEADERS,
+    read_cues,
+    format_cue,
+    scan_cues,
+    find_window,
+    load_cue_index,
+)
+from .cues import CueTable, render_cues
+from .conversions import CompiledConversions, is_conversions_store, load_conversions
+from .mapped import UnsupportedCaptions, read_mapped_cues
+from .formats import FORMATS, READER, WRITER, FormatRegistry, writer_groups
+from .matching import CaptionCache, ConversionMatcher, shared_matcher
+from .output_cache import OUTPUT_CACHE_SIZE, OutputCache, output_cache_key
+from .stats import EditStats, peak_memory
+from .timestamps import offset_and_cut_one
 
-SUPPORTED_FILE_TYPES = {".vtt", ".srt", ".ttml", ".dfxp"}
+SUPPORTED_FILE_TYPES = set(FORMATS)
 
+# Each thread's copies of the readers and writers, keyed by the id of the reader or writer they were copied from
+_thread_state = threading.local()
 
-class Editor:
-    READERS = {
-        ".vtt": WebVTTReader(),
-        ".srt": SRTReader(),
-        ".ttml": DFXPReader(),
-        ".dfxp": DFXPReader(),
-    }
 
-    WRITERS = {
-        ".vtt": WebVTTWriter(),
-        ".srt": SRTWriter(),
-        ".ttml": DFXPWriter(),
-        ".dfxp": DFXPWriter(),
-    }
+def _thread_copy(template):
+    """
+    Returns the current thread's copy of a pycaption reader or writer. Readers and writers keep state while they work, so threads cannot share them.
+    """
+
+    copies = _thread_state.__dict__.setdefault("copies", {})
+    if id(template) not in copies:
+        copies[id(template)] = copy(template)
+    return copies[id(template)]
+
+
+class _EditState(threading.local):
+    """
+    The state an editor keeps while it processes captions one after another, held separately for each thread so that edits in different threads never share it.
+    """
+
+    def __init__(self) -> None:
+        # Keys found in the previous caption so that they can be referenced when processing the following caption
+        self.previous_caption_keys: list[str] = []
+
+
+class Editor:
+    # Readers and writers are imported and created the first time a job needs them. They are shared by every editor, and each thread works with its own copy of them.
+    READERS = FormatRegistry(READER)
+    WRITERS = FormatRegistry(WRITER)
 
     def __init__(
         self,
-        captions_file: str | Path,
+        captions_file: str | Path | None = None,
         conversions_file: Path | str = "conversions.json",
         dest_filename: str = "",
         dest_file_extensions: list[str] = [".vtt"],
         dest_directory: Path | str = "",
         offset: int = 0,
         cutoff: float | int = -1,
+        window_start: float | int = 0,
+        window_end: float | int = -1,
+        assume_sorted: bool = False,
+        use_cue_index: bool = False,
+        use_conversions_cache: bool = True,
+        caption_cache_size: int = 1024,
+        use_output_cache: bool = False,
+        output_cache_size: int = OUTPUT_CACHE_SIZE,
     ) -> None:
         # Validate and store the captions file. Check that it exists and has a correct extension.
+        # The captions file can be omitted when captions are only edited in memory with edit_captions_text.
         self._captions_file_path: Path = Path()
-        self.update_captions_path(captions_file)
+        if captions_file is not None:
+            self.update_captions_path(captions_file)
 
         # Store the destination directory, verifying that it exists
         self._dest_directory: Path = Path()
@@ -70,14 +115,15 @@ class Editor:
         # Initialize everything that might be needed for caption conversions
         self.timing_offset = offset
         self._cutoff: int = -1
-        self._conversions: list = []
+        self._conversions: CompiledConversions = CompiledConversions()
+        self.use_conversions_cache = use_conversions_cache
+
+        # Keys matched in the previous caption are kept for each thread, so that the editor can be shared by threads editing different captions
+        self._edit_state = _EditState()
+        self._matcher = ConversionMatcher(self._conversions)
 
-        self._case_sensitive_processor = KeywordProcessor(case_sensitive=True)
-        self._case_insensitive_processor = KeywordProcessor()
-        self._previous_caption_keys_processor = KeywordProcessor(case_sensitive=True)
-        self._previous_caption_keys: list = []
-        self._previous_captions_processors: dict = {}
-        self._direct_conversions: dict = {}
+        # Processed captions are cached so that repeated captions, such as sound cues and speaker tags, are only processed once
+        self.caption_cache = CaptionCache(caption_cache_size)
 
         # If no offset value was provided or if it was zero, check for and process a conversions file
         # If an offset is provided, it is assumed that no conversions are desired and the captions only need to be offset
@@ -87,67 +133,87 @@ class Editor:
         if cutoff >= 0:
             self.update_cutoff(cutoff)
 
-    def _store_conversions(self) -> None:
+        # Store the time window and how the captions file may be read to skip captions outside of it
+        self._window_start: float | int = 0
+        self._window_end: float | int = -1
+        self.update_time_window(window_start, window_end)
+        self.assume_sorted = assume_sorted
+        self.use_cue_index = use_cue_index
+
+        # Whether edit_captions copies the outputs of an identical earlier edit from the output cache instead of editing the captions again
+        self.use_output_cache = use_output_cache
+        self.output_cache_size = output_cache_size
+
+    def __getstate__(self) -> dict:
+        # The matcher, caption cache, and thread state cannot be pickled, so an editor sent to another process rebuilds them from its compiled conversions
+        state = self.__dict__.copy()
+        del state["_matcher"], state["_edit_state"]
+        state["caption_cache"] = state["caption_cache"].maxsize
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.caption_cache = CaptionCache(state["caption_cache"])
+        self._edit_state = _EditState()
+        self._build_keyword_processors()
+
+    @property
+    def _previous_caption_keys(self) -> list[str]:
         """
-        Stores conversions file data from conversions file in the editor.
+        The keys matched in the last caption processed by the current thread, which conversions keyed to the previous caption are applied with.
+        Every edit starts from no keys in the thread it runs in, so one editor can edit captions in several threads at once.
         """
 
-        # Gather conversions data from file
-        with open(self.conversions_file_path) as conversions_json:
-            conversions_data = json.load(conversions_json)
+        return self._edit_state.previous_caption_keys
 
-        # Verify that the structure of the file matches what's expected
-        if len(conversions_data) > 3 or any(
-            key not in ("offset", "cutoff", "conversions")
-            for key in conversions_data.keys()
-        ):
-            raise ValueError("Invalid conversions.json contents")
+    @_previous_caption_keys.setter
+    def _previous_caption_keys(self, keys: list[str]) -> None:
+        self._edit_state.previous_caption_keys = keys
 
-        # Set the offset, cutoff, and the list of conversions
-        if "offset" in conversions_data:
-            if not isinstance(conversions_data["offset"], int):
-                raise ValueError("Offset must be integer")
-            else:
-                self.timing_offset = conversions_data["offset"]
-        else:
-            self.timing_offset = 0
+    def _reader(self, captions_type: str):
+        return _thread_copy(self.READERS[captions_type])
 
-        if "cutoff" in conversions_data:
-            if not isinstance(conversions_data["cutoff"], int):
-                raise ValueError("Cutoff must be integer")
-            else:
-                self._cutoff = conversions_data["cutoff"]
-        else:
-            self._cutoff = -1
+    def _writer(self, extension: str):
+        return _thread_copy(self.WRITERS[extension])
 
-        if not isinstance(conversions_data["conversions"], list):
-            raise ValueError("Conversions must be list")
+    def _store_conversions(self) -> None:
+        """
+        Stores conversions file data from conversions file in the editor, using the compiled conversions cache if enabled.
+        """
+
+        self._conversions = load_conversions(
+            self.conversions_file_path, use_cache=self.use_conversions_cache
+        )
 
-        self._conversions = conversions_data["conversions"]
+        # Set the offset and cutoff
+        self.timing_offset = self._conversions.offset
+        self._cutoff = self._conversions.cutoff
 
-    def _process_caption_contents(self, caption_text: str = "") -> str:
+    def _process_caption_contents(
+        self, caption_text: str = "", replacements: dict[str, int] | None = None
+    ) -> str:
         """
         Replaces any keywords in current caption and records any keys seen that would be relevant for the next caption.
+        If a replacements dict is given, the number of replacements made by each kind of conversion is added to it.
         """
 
-        # First, check for any captions that should be converted directly
-        if caption_text in self._direct_conversions:
-            return self._direct_conversions[caption_text]
-
-        # Process caption through both the case-sensitive and case-insensitive processors
-        caption_text = self._case_insensitive_processor.replace_keywords(caption_text)
-        caption_text = self._case_sensitive_processor.replace_keywords(caption_text)
-
-        # If any previous caption keys were matched in the previous caption, iterate through them and process the current caption as appropriate
-        for key in self._previous_caption_keys:
-            caption_text = self._previous_captions_processors[key].replace_keywords(
-                caption_text
+        edit_state = self._edit_state
+        previous_caption_keys = edit_state.previous_caption_keys
+        result = self.caption_cache.get(caption_text, previous_caption_keys)
+        if result is None:
+            caption_replacements: dict[str, int] = {}
+            result = (
+                *self._matcher.process(
+                    caption_text, previous_caption_keys, caption_replacements
+                ),
+                caption_replacements,
             )
+            self.caption_cache.put(caption_text, previous_caption_keys, result)
 
-        # Check the current caption for any matches in the previous caption keys so that they're ready when the next caption is processed
-        self._previous_caption_keys = (
-            self._previous_caption_keys_processor.extract_keywords(caption_text)
-        )
+        caption_text, edit_state.previous_caption_keys, caption_replacements = result
+        if replacements is not None:
+            for kind, count in caption_replacements.items():
+                replacements[kind] = replacements.get(kind, 0) + count
         return caption_text
 
     def _create_new_dest_filename(self) -> None:
@@ -158,62 +224,121 @@ class Editor:
         original_name = self._captions_file_path.stem
         self._dest_filename = original_name + "-converted"
 
+    def _dest_file_path(self, extension: str) -> Path:
+        """
+        Returns the path of the destination file with the given extension.
+        """
+
+        return Path(self._dest_directory / self._dest_filename).with_suffix(extension)
+
     def _build_keyword_processors(self) -> None:
         """
-        Uses the stored conversions data and creates keyword processors for case-sensitive, case-insensitive, and any other keys that are replaced based on previous captions.
+        Uses the stored conversions data and creates the matcher that replaces keys in captions, including keys that are replaced based on previous captions.
         """
 
-        # Processors to look for simple matches to be replaced
-        self._case_sensitive_processor = KeywordProcessor(case_sensitive=True)
-        self._case_insensitive_processor = KeywordProcessor()
+        self._matcher = shared_matcher(self._conversions)
 
-        # Processor to look for matches in the current caption that will be used to key conversions in the following caption
-        self._previous_caption_keys_processor = KeywordProcessor(case_sensitive=True)
+        # Captions processed with the previous conversions are no longer valid
+        self.caption_cache.clear()
 
-        # List to store any keys found from the previous captions processor so that they can be referenced when processing the following caption
+        # List to store any keys found in the previous caption so that they can be referenced when processing the following caption
         self._previous_caption_keys = []
 
-        # Dict to store the processors that are meant to process the following caption and are keyed to the matches that could be found in the previous caption
-        self._previous_captions_processors = {}
+    def update_cutoff(self, new_cutoff: int | float) -> None:
+        """
+        Updates the time cutoff (in seconds) for captions to be written. Any captions, after the offset has been applied, that would occur after the cutoff will not be included.
+        """
+        self._cutoff = new_cutoff
 
-        # Dict to store any conversions that are meant to process an entire caption that matches exactly and replace it with new contents
-        self._direct_conversions = {}
+    def update_time_window(
+        self, window_start: int | float = 0, window_end: int | float = -1
+    ) -> None:
+        """
+        Updates the time window (in seconds) for captions to be written. Only captions that start inside the window, after the offset has been applied, will be included.
+        A negative window end leaves the window open-ended. The cutoff, if there is one, still applies.
+        """
 
-        for conversion in self._conversions:
-            if "key" not in conversion:
-                continue
-            if "replacement" not in conversion:
-                continue
-            key = conversion["key"]
-            replacement = conversion["replacement"]
+        if window_end >= 0 and window_end < window_start:
+            raise ValueError("Window end must not be before window start")
 
-            # First check if the current conversion is dependent on a match occurring in the preceding caption
-            if "previous" in conversion and conversion["previous"]:
-                self._previous_caption_keys_processor.add_keyword(
-                    conversion["previous"]
-                )
-                self._previous_captions_processors[
-                    conversion["previous"]
-                ] = KeywordProcessor(case_sensitive=True)
-                self._previous_captions_processors[conversion["previous"]].add_keyword(
-                    key, replacement
-                )
+        self._window_start = window_start
+        self._window_end = window_end
+
+    def _effective_cutoff(self) -> int | float:
+        """
+        Returns the latest start time (in seconds, after the offset) of any caption that can be included, based on the cutoff and the time window, or -1 if there is no limit.
+        """
 
-            # Captions meant to be converted directly, without any partial replacement
-            elif "directConversion" in conversion and conversion["directConversion"]:
-                self._direct_conversions[conversion["key"]] = conversion["replacement"]
+        limits = [limit for limit in (self._cutoff, self._window_end) if limit >= 0]
+        return min(limits) if limits else -1
 
-            else:
-                if "caseSensitive" in conversion and conversion["caseSensitive"]:
-                    self._case_sensitive_processor.add_keyword(key, replacement)
-                else:
-                    self._case_insensitive_processor.add_keyword(key, replacement)
+    def _window_ranges(self) -> list[tuple[int, int | None]] | None:
+        """
+        Returns the (start, stop) byte ranges of the captions file to read, with None as the stop for the end of the file, or None if the whole file is read.
+        When WebVTT or SRT captions are assumed to be sorted by start time and a cutoff or time window is set, only the header and the captions inside the window are read,
+        using the sidecar cue index if enabled to find the window without scanning the file.
+        """
 
-    def update_cutoff(self, new_cutoff: int | float) -> None:
+        cutoff = self._effective_cutoff()
+        if (
+            self._captions_file_path.suffix not in STREAMING_FILE_TYPES
+            or not self.assume_sorted
+            or (self._window_start <= 0 and cutoff < 0)
+        ):
+            return None
+
+        # Cue times in the file are compared before the offset is applied
+        first = self._window_start * 1000 - self.timing_offset
+        last = cutoff * 1000 - self.timing_offset if cutoff >= 0 else None
+
+        # Files without any cue are read whole, so that they are reported as empty the same way with or without a window
+        if self.use_cue_index:
+            cues = load_cue_index(self._captions_file_path)
+            if not cues:
+                return None
+            starts = [start for start, _ in cues]
+            first_index = bisect_left(starts, first)
+            last_index = len(cues) if last is None else bisect_right(starts, last)
+            begin = cues[first_index][1] if first_index < last_index else None
+            stop = cues[last_index][1] if last_index < len(cues) else None
+            header_end = cues[0][1]
+        else:
+            with open(self._captions_file_path, "rb") as file:
+                scanned_cues = scan_cues(file)
+                first_cue = next(scanned_cues, None)
+                if first_cue is None:
+                    return None
+                header_end = first_cue[1]
+                begin, stop = find_window(chain([first_cue], scanned_cues), first, last)
+
+        ranges = [(0, header_end)]
+        if begin is not None:
+            ranges.append((begin, stop))
+        return ranges
+
+    def _read_captions_contents(self) -> str:
         """
-        Updates the time cutoff (in seconds) for captions to be written. Any captions, after the offset has been applied, that would occur after the cutoff will not be included.
+        Reads the captions file, or only the header and the captions inside the time window of sorted WebVTT or SRT captions. See _window_ranges.
         """
-        self._cutoff = new_cutoff
+
+        return self._read_ranges(self._window_ranges())
+
+    def _read_ranges(self, ranges: list[tuple[int, int | None]] | None) -> str:
+        """
+        Reads the byte ranges of the captions file as text, or the whole file if ranges is None.
+        """
+
+        if ranges is None:
+            with open(self._captions_file_path, "r", encoding="utf8") as file:
+                return file.read()
+
+        contents = b""
+        with open(self._captions_file_path, "rb") as file:
+            for start, stop in ranges:
+                file.seek(start)
+                contents += file.read(-1 if stop is None else stop - start)
+
+        return contents.decode("utf8")
 
     def update_captions_path(self, captions_file: str | Path) -> None:
         """
@@ -231,13 +356,14 @@ class Editor:
     def update_conversions(self, conversions: str | Path) -> None:
         """
         Accepts a string or Path object of the relative or absolute path to conversions file and checks if conversions file exists.
+        The conversions file can be a JSON file or a conversions store built from one, such as conversions.sqlite.
         If it does exist, its contents are processed and stored in the converter and the keyword processors are built.
         """
 
         self.conversions_file_path = Path(conversions)
-        if (
-            not self.conversions_file_path.is_file()
-            or self.conversions_file_path.suffix != ".json"
+        if not self.conversions_file_path.is_file() or not (
+            self.conversions_file_path.suffix == ".json"
+            or is_conversions_store(self.conversions_file_path)
         ):
             self.conversions_file_path = Path()
             raise FileNotFoundError("Conversions file not found")
@@ -274,143 +400,553 @@ class Editor:
         else:
             raise FileNotFoundError("The destination directory does not exist.")
 
-    def edit_captions(self) -> None:
+    def _edit_cue(
+        self, start: int, end: int, caption_text: str
+    ) -> tuple[int, int, str] | None:
         """
-        Reads captions from captions file, converts them based on offset, cutoff, and conversions, and writes them to the destination file(s) in the destination directory.
+        Applies the offset, cutoff, and conversions to a single cue with times in milliseconds. Returns None if the cue should not be included.
         """
 
-        timestamp_pattern = re.compile(r"((\d{2,}):)?(\d\d):(\d\d).(\d\d\d)")
+        # Since negative timestamps aren't valid/useful, captions that would start before zero are not included in the new file
+        new_times = offset_and_cut_one(
+            start, end, self.timing_offset, self._effective_cutoff(), self._window_start
+        )
+        if new_times is None:
+            return None
+
+        return *new_times, self._process_caption_contents(caption_text)
+
+    def _past_window(self, start: int) -> bool:
+        """
+        Returns whether sorted captions have passed the end of the window at a cue starting at the given milliseconds, before the offset.
+        Once they have, none of the remaining captions can be included.
+        """
+
+        cutoff = self._effective_cutoff()
+        return (
+            self.assume_sorted
+            and cutoff >= 0
+            and start + self.timing_offset > cutoff * 1000
+        )
+
+    def _edit_caption(
+        self,
+        cues: CueTable,
+        index: int,
+        start: int,
+        end: int,
+        new_cues: CueTable,
+        stats: EditStats | None = None,
+    ) -> None:
+        """
+        Applies the conversions to the caption at the index of cues and adds it to new_cues with the given start and end milliseconds.
+        If stats are given, the replacements made and the time spent making them are added to them.
+        """
 
-        def offset_time(time):
-            time_info = timestamp_pattern.search(time).groups()
-            hours = int(time_info[1]) if time_info[1] else 0
-            minutes = int(time_info[2])
-            seconds = int(time_info[3])
-            milliseconds = int(time_info[4]) + self.timing_offset
+        # Without conversions the text is copied without being decoded
+        if self._matcher.is_empty:
+            new_cues.append_copy(cues, index, start, end)
+            return
 
-            while milliseconds >= 1000:
-                seconds += 1
-                milliseconds -= 1000
+        caption_text = cues.text(index)
+        if stats is None:
+            new_text = self._process_caption_contents(caption_text)
+        else:
+            keywords_start = perf_counter()
+            new_text = self._process_caption_contents(caption_text, stats.replacements)
+            stats.add_time("keywords", perf_counter() - keywords_start)
 
-            while milliseconds < 0:
-                milliseconds += 1000
-                seconds -= 1
+        new_cues.append_edited(cues, index, start, end, new_text)
 
-            while seconds >= 60:
-                minutes += 1
-                seconds -= 60
+    def _read_cues(self, contents: str | bytes, captions_type: str) -> CueTable:
+        """
+        Parses the captions contents and returns the captions of their first language as a cue table. The parsed caption set is released as soon as the table is built.
+        """
 
-            while seconds < 0:
-                seconds += 60
-                minutes -= 1
+        from pycaption import CaptionReadNoCaptions
 
-            while minutes >= 60:
-                hours += 1
-                minutes -= 60
+        if isinstance(contents, bytes):
+            contents = contents.decode("utf8")
 
-            while minutes < 0:
-                minutes += 60
-                hours -= 1
+        try:
+            caption_set = self._reader(captions_type).read(contents)
+        except CaptionReadNoCaptions:
+            return CueTable()
 
-            # Since negative timestamps aren't valid/useful, None is returned to signal that the current caption should not be included in the new file
-            if min(hours, minutes, seconds, milliseconds) < 0:
-                return (None, 0)
+        return CueTable.from_captions(
+            caption_set.get_captions(caption_set.get_languages()[0])
+        )
 
-            new_time = f"{str(hours).zfill(2)}:{str(minutes).zfill(2)}:{str(seconds).zfill(2)}.{str(milliseconds).zfill(3)}"
-            return (
-                new_time,
-                hours * 3600 + minutes * 60 + seconds + milliseconds / 1000,
-            )
+    def _read_captions_cues(self, stats: EditStats | None = None) -> CueTable:
+        """
+        Reads the captions file, or the part of it inside the time window, into a cue table. WebVTT and SRT captions are read straight from a memory map of the file
+        when they can be, without decoding their text (see read_mapped_cues), and any other captions are read as text and parsed with pycaption.
+        If stats are given, the time spent reading and parsing and the bytes read are added to them.
+        """
 
-        # Check if captions file is not already VTT and convert it to a temporary VTT file if necessary
+        if stats is None:
+            stats = EditStats()
         captions_type = self._captions_file_path.suffix
-        vtt_captions_path = None
-        vtt_contents = ""
-        if captions_type != ".vtt":
-            reader = self.READERS[captions_type]
 
-            with open(self._captions_file_path, "r", encoding="utf8") as file:
-                raw_contents = file.read()
+        with stats.time_stage("read"):
+            ranges = self._window_ranges()
+
+        try:
+            with stats.time_stage("parse"):
+                cues, stats.bytes_in[captions_type] = read_mapped_cues(
+                    self._captions_file_path, captions_type, ranges
+                )
+            return cues
+        except UnsupportedCaptions:
+            pass
+
+        with stats.time_stage("read"):
+            contents = self._read_ranges(ranges)
+        stats.bytes_in[captions_type] = len(contents.encode("utf8"))
+        with stats.time_stage("parse"):
+            return self._read_cues(contents, captions_type)
+
+    def _edit_cues(
+        self,
+        contents: str | bytes,
+        captions_type: str,
+        stats: EditStats | None = None,
+    ) -> CueTable | None:
+        """
+        Parses the captions contents once and returns a new cue table with the offset, cutoff, and conversions applied.
+        Returns None if there are no captions left to write. If stats are given, the time spent in each stage and the captions read and dropped are added to them.
+        """
 
-            contents_caption_set = reader.read(raw_contents)
-            vtt_contents = WebVTTWriter().write(contents_caption_set)
+        if stats is None:
+            stats = EditStats()
 
-            temp_vtt_path = self._captions_file_path.with_stem(
-                self._captions_file_path.stem + "-temp"
+        with stats.time_stage("parse"):
+            cues = self._read_cues(contents, captions_type)
+        return self._edit_cue_table(cues, stats)
+
+    def _edit_cue_table(
+        self, cues: CueTable, stats: EditStats | None = None
+    ) -> CueTable | None:
+        """
+        Returns a new cue table with the offset, cutoff, and conversions applied to the captions of a parsed one, or None if there are no captions left to write.
+        If stats are given, the time spent in each stage and the captions read and dropped are added to them.
+        """
+
+        if stats is None:
+            stats = EditStats()
+
+        # Keys matched in the last caption of a previous file must not affect the first caption of this one
+        self._previous_caption_keys = []
+
+        stats.captions_read += len(cues)
+
+        # The offset and cutoff are applied to every caption at once, before any conversions
+        with stats.time_stage("offset"):
+            starts, ends, keep = cues.offset_and_cut(
+                self.timing_offset, self._effective_cutoff(), self._window_start
             )
 
-            with open(temp_vtt_path, "w", encoding="utf8") as file:
-                file.write(vtt_contents)
+        edit_start = perf_counter()
+        keywords_time = stats.stage_times.get("keywords", 0.0)
+        new_cues = CueTable()
+        for index, kept in enumerate(keep):
+            start = starts[index]
+            if kept:
+                self._edit_caption(cues, index, start, ends[index], new_cues, stats)
+            elif start < 0:
+                stats.dropped_by_offset += 1
+            elif start < self._window_start * 1000:
+                stats.dropped_by_window += 1
+            else:
+                stats.dropped_by_cutoff += 1
+
+        # Building the new captions, apart from the keyword processing inside it
+        stats.add_time(
+            "bridge",
+            perf_counter()
+            - edit_start
+            - (stats.stage_times.get("keywords", 0.0) - keywords_time),
+        )
 
-            vtt_captions_path = temp_vtt_path
-        else:
-            vtt_captions_path = self._captions_file_path
+        return new_cues if len(new_cues) else None
 
-        # Modify the captions from the VTT file
-        # TODO remove header
-        new_file_contents = "WEBVTT - Converted from " + str(vtt_captions_path)
-        caption_count = 0
+    def edit_captions_text(
+        self, contents: str | bytes, captions_type: str = ".vtt"
+    ) -> dict[str, str]:
+        """
+        Converts captions contents of the given type based on offset, cutoff, and conversions without touching the filesystem.
+        Returns a dict of the rendered captions keyed by each destination file extension, which is empty if there are no captions to write.
+        """
 
-        for caption in webvtt.read(vtt_captions_path):
-            start_time = caption.start
-            new_start, seconds_after_start = offset_time(start_time)
+        if captions_type not in self.READERS:
+            raise ValueError("Unsupported captions type")
 
-            end_time = caption.end
-            new_end, _ = offset_time(end_time)
+        new_cues = self._edit_cues(contents, captions_type)
+        if new_cues is None:
+            return {}
 
-            if not new_start:
-                continue
+        rendered = {}
+        for extensions in writer_groups(self._dest_filetypes):
+            contents = render_cues(self._writer(extensions[0]), new_cues)
+            rendered.update(dict.fromkeys(extensions, contents))
+        return rendered
 
-            if self._cutoff >= 0 and seconds_after_start > self._cutoff:
-                continue
+    def _write_cues(
+        self,
+        new_cues: CueTable,
+        stats: EditStats,
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Renders the edited captions as every destination filetype, at the same time in the executor or a thread pool, and writes each file as soon as it is ready.
+        The time spent on the whole is added to the stats as the 'write' stage, and the overlapping time spent on each filetype and the bytes written for it as well.
+        """
 
-            new_caption = "\n" * 2 + str(caption_count) + "\n"
-            new_caption += new_start + " --> " + new_end + "\n"
-            new_caption += self._process_caption_contents(caption.text)
+        groups = writer_groups(self._dest_filetypes)
+        with ExitStack() as stack:
+            stack.enter_context(stats.time_stage("write"))
+            if executor is None and len(groups) > 1:
+                executor = stack.enter_context(
+                    ThreadPoolExecutor(max_workers=len(groups))
+                )
 
-            new_file_contents += new_caption
-            caption_count += 1
+            if executor is None:
+                renders = [
+                    (extensions, _render_captions(extensions[0], new_cues))
+                    for extensions in groups
+                ]
+            else:
+                futures = {
+                    executor.submit(
+                        _render_captions, extensions[0], new_cues
+                    ): extensions
+                    for extensions in groups
+                }
+                renders = (
+                    (futures[future], future.result())
+                    for future in as_completed(futures)
+                )
 
-        try:
-            new_caption_set = WebVTTReader().read(new_file_contents)
-        except CaptionReadNoCaptions:
+            for extensions, (curr_contents, render_time) in renders:
+                # A shared render is counted once, under the first filetype it was rendered for
+                stats.add_write_time(extensions[0], render_time)
+                for extension in extensions:
+                    write_start = perf_counter()
+                    with open(
+                        self._dest_file_path(extension), "w", encoding="utf8"
+                    ) as new_file:
+                        new_file.write(curr_contents)
+                    stats.add_write_time(extension, perf_counter() - write_start)
+                    stats.bytes_out[extension] = len(curr_contents.encode("utf8"))
+
+    def edit_captions(self, executor: Executor | None = None) -> EditStats:
+        """
+        Reads captions from captions file, converts them based on offset, cutoff, and conversions, and writes them to the destination file(s) in the destination directory.
+        The destination filetypes are rendered at the same time in the executor, a thread pool by default, and each file is written as soon as its contents are ready.
+        Filetypes rendered by the same writer, such as .ttml and .dfxp, are rendered once. Returns statistics about the edit, including the number of captions written.
+        If use_output_cache is set, the files written by an identical earlier edit are copied from the output cache instead.
+        """
+
+        if not self._captions_file_path.is_file():
+            raise FileNotFoundError("Captions file not found")
+
+        if self.use_output_cache:
+            return self._edit_captions_cached(executor)
+        return self._edit_captions(executor)
+
+    def _edit_captions(self, executor: Executor | None = None) -> EditStats:
+        stats = EditStats()
+        cues = self._read_captions_cues(stats)
+        new_cues = self._edit_cue_table(cues, stats)
+        if new_cues is None:
             print("Cannot convert an empty captions file")
-            return
+            stats.peak_memory = peak_memory()
+            return stats
 
         # Convert captions to all specified file types
-        for extension in self._dest_filetypes:
-            writer = self.WRITERS[extension]
-            dest_file_path = Path(
-                self._dest_directory / self._dest_filename
-            ).with_suffix(extension)
-            curr_contents = writer.write(new_caption_set)
+        self._write_cues(new_cues, stats, executor)
+        stats.captions_written = len(new_cues)
+        stats.peak_memory = peak_memory()
+        return stats
 
-            with open(dest_file_path, "w", encoding="utf8") as new_file:
-                new_file.write(curr_contents)
+    def _edit_captions_cached(self, executor: Executor | None = None) -> EditStats:
+        """
+        Edits the captions like edit_captions, but first looks up the output cache for the outputs of an earlier edit of the same captions with the same conversions,
+        offset, cutoff, time window, and destination filetypes, and copies them to the destination files if found. Otherwise the outputs are stored once written.
+        """
 
-        # Clean up any temporary files if needed. Look for a starting VTT file that is temporary and a captions-converted VTT file if that's not needed in the file output.
-        if vtt_captions_path != self._captions_file_path:
-            if vtt_captions_path.is_file():
-                vtt_captions_path.unlink()
+        cache = OutputCache(max_size=self.output_cache_size)
+        dest_paths = {
+            extension: self._dest_file_path(extension)
+            for extension in self._dest_filetypes
+        }
+
+        start = perf_counter()
+        key = output_cache_key(self)
+        cached = cache.load(key, dest_paths)
+        lookup_time = perf_counter() - start
+        if cached is not None:
+            stats = EditStats(**cached, output_cache_hit=True)
+            stats.add_time("output cache", lookup_time)
+            stats.peak_memory = peak_memory()
+            return stats
+
+        stats = self._edit_captions(executor)
+        stats.add_time("output cache", lookup_time)
+
+        # Empty captions files write nothing, so there is nothing to cache
+        if stats.captions_written:
+            stored = asdict(stats)
+            for field in (
+                "stage_times",
+                "write_times",
+                "peak_memory",
+                "output_cache_hit",
+            ):
+                del stored[field]
+            with stats.time_stage("output cache"):
+                try:
+                    cache.store(key, dest_paths, stored)
+                except OSError:
+                    # The cache is only an optimization, so a read-only cache directory is not an error
+                    pass
 
+        return stats
+
+    def iter_edited_cues(self, lines: Iterable[str]) -> Iterator[tuple[int, int, str]]:
+        """
+        Lazily reads cues from the lines of a WebVTT or SRT file and yields each (start, end, text) cue, with times in milliseconds, after the offset, cutoff, and conversions have been applied.
+        Only one cue is held at a time, so the previous caption rules are applied as the cues stream past.
+        """
+
+        self._previous_caption_keys = []
+        for start, end, caption_text in read_cues(lines):
+            if self._past_window(start):
+                break
+
+            edited_cue = self._edit_cue(start, end, caption_text)
+
+            # Cues without any text are dropped, as they are by the pycaption writers
+            if edited_cue and edited_cue[2]:
+                yield edited_cue
+
+    def edit_captions_stream(
+        self,
+        source: TextIO | None = None,
+        dest: TextIO | None = None,
+        captions_type: str = "",
+    ) -> int:
+        """
+        Converts WebVTT or SRT captions one cue at a time so that memory use stays the same regardless of the length of the captions.
+        Captions are read from the source file object, or the captions file if no source is given, and written to the dest file object, or to the destination file(s) if no dest is given.
+        Streaming to a dest file object requires exactly one destination filetype. Returns the number of captions written.
+        """
+
+        captions_type = captions_type or self._captions_file_path.suffix or ".vtt"
+        if captions_type not in STREAMING_FILE_TYPES or any(
+            extension not in STREAMING_FILE_TYPES for extension in self._dest_filetypes
+        ):
+            raise ValueError("Streaming is only supported for .srt and .vtt captions")
+
+        if dest is not None and len(self._dest_filetypes) != 1:
+            raise ValueError(
+                "Streaming to a file object requires exactly one destination filetype"
+            )
+
+        caption_count = 0
+        with ExitStack() as stack:
+            if source is None:
+                if not self._captions_file_path.is_file():
+                    raise FileNotFoundError("Captions file not found")
+                captions_file = stack.enter_context(
+                    open(self._captions_file_path, "rb")
+                )
+
+                # With a sidecar cue index, reading starts at the first caption inside the time window
+                if self.use_cue_index and self.assume_sorted and self._window_start > 0:
+                    cues = load_cue_index(self._captions_file_path)
+                    first_index = bisect_left(
+                        [start for start, _ in cues],
+                        self._window_start * 1000 - self.timing_offset,
+                    )
+                    if first_index < len(cues):
+                        captions_file.seek(cues[first_index][1])
+                    else:
+                        captions_file.seek(0, SEEK_END)
+
+                source = TextIOWrapper(captions_file, encoding="utf8")
+
+            outputs = []
+            for start, end, caption_text in self.iter_edited_cues(source):
+                # Destinations are only opened once there is a caption to write, so an empty captions file produces no files
+                if not outputs:
+                    if dest is not None:
+                        outputs = [(self._dest_filetypes[0], dest)]
+                    else:
+                        outputs = [
+                            (
+                                extension,
+                                stack.enter_context(
+                                    open(
+                                        self._dest_file_path(extension),
+                                        "w",
+                                        encoding="utf8",
+                                    )
+                                ),
+                            )
+                            for extension in self._dest_filetypes
+                        ]
+                    for extension, output in outputs:
+                        output.write(HEADERS[extension])
+
+                for extension, output in outputs:
+                    output.write(
+                        format_cue(
+                            caption_count,
+                            start,
+                            end,
+                            caption_text,
+                            extension,
+                            captions_type,
+                        )
+                    )
+                caption_count += 1
+
+        if not caption_count:
+            print("Cannot convert an empty captions file")
+
+        return caption_count
+
+    def edit_captions_parallel(self, workers: int | None = None) -> int:
+        """
+        Converts WebVTT or SRT captions like edit_captions_stream, with the captions file split into time-ordered chunks that are edited on a pool of worker processes.
+        The chunks are merged in order, and the files written are exactly the same as the ones edit_captions_stream writes. The number of workers defaults to the number of CPUs.
+        Returns the number of captions written.
+        """
+
+        from .chunks import edit_captions_parallel
+
+        return edit_captions_parallel(self, workers)
+
+    @classmethod
+    def edit_captions_batch(
+        cls,
+        sources: Iterable[str | Path],
+        workers: int | None = None,
+        share_caption_cache: bool = True,
+        **editor_options,
+    ):
+        """
+        Edits every captions file found in the given files, directories, and glob patterns using a pool of worker processes and returns a BatchSummary.
+        Any other keyword arguments accepted by Editor, except captions_file and dest_filename, are used for every file.
+        Each converted file is named '<captions file stem>-converted' and is written to the destination directory, or next to its captions file if no destination directory is given.
+        If share_caption_cache is True, processed captions cached while editing one file are reused for the following files.
+        """
+
+        from .batch import edit_captions_batch
+
+        return edit_captions_batch(
+            sources,
+            workers=workers,
+            share_caption_cache=share_caption_cache,
+            **editor_options,
+        )
+
+    async def edit_captions_async(
+        self, executor: Executor | None = None
+    ) -> dict[str, str]:
+        """
+        The async counterpart of edit_captions. Reading, parsing, editing, and writing run in the executor, so the event loop is never blocked.
+        Returns the rendered captions keyed by each destination file extension, which is empty if there were no captions to write.
+        The executor defaults to the event loop's default executor and must run its work in threads. Concurrent calls on the same editor edit at the same time.
+        """
+
+        from .aio import edit_captions_async
+
+        return await edit_captions_async(self, executor)
+
+    async def edit_captions_text_async(
+        self,
+        contents: str | bytes,
+        captions_type: str = ".vtt",
+        executor: Executor | None = None,
+    ) -> dict[str, str]:
+        """
+        The async counterpart of edit_captions_text. Parsing, editing, and rendering run in the executor, with every destination filetype rendered concurrently.
+        """
+
+        from .aio import edit_captions_text_async
+
+        return await edit_captions_text_async(self, contents, captions_type, executor)
+
+    @classmethod
+    async def edit_captions_batch_async(
+        cls,
+        sources: Iterable[str | Path],
+        concurrency: int = 8,
+        executor: Executor | None = None,
+        **editor_options,
+    ):
+        """
+        The async counterpart of edit_captions_batch. At most *concurrency* files are edited at once, in the executor, which can be a thread or process pool.
+        Returns a BatchSummary whose results also hold the rendered captions of each file. Cancelling the batch stops any file that has not started yet.
+        """
+
+        from .aio import edit_captions_batch_async
+
+        return await edit_captions_batch_async(
+            sources, concurrency, executor, **editor_options
+        )
+
+
+def _render_captions(extension: str, cues: CueTable) -> tuple[str, float]:
+    """
+    Renders the captions as the given filetype and returns the rendered captions and the time it took. Runs in the threads or processes of an executor.
+    """
+
+    start = perf_counter()
+    contents = render_cues(_thread_copy(Editor.WRITERS[extension]), cues)
+    return contents, perf_counter() - start
+
+
+# Commands that can be given in place of a captions file, mapped to the module providing their main function
+COMMANDS = {
+    "build-conversions-store": "conversions_store",
+    "compile-conversions": "conversions",
+    "profile-conversions": "profiling",
+    "serve": "server",
+}
+
+
+def argument_parser() -> argparse.ArgumentParser:
+    """
+    Returns the parser of the arguments for converting captions, which are the arguments of edit-captions when they do not start with one of the COMMANDS.
+    """
 
-def main(args=None) -> argparse.Namespace:
-    if not args:
-        args = sys.argv[1:]
     parser = argparse.ArgumentParser()
-    parser.add_argument("caption_filename", type=str, help="the file to be converted")
+    parser.add_argument(
+        "caption_filename",
+        type=str,
+        help="the file to be converted, a directory or glob pattern of files to be converted, or '-' to stream captions from stdin to stdout",
+    )
+    parser.add_argument(
+        "more_caption_filenames",
+        type=str,
+        nargs="*",
+        help="optional additional files, directories, or glob patterns to be converted in the same batch",
+    )
     parser.add_argument(
         "-c",
         "-conversions",
         type=str,
         default="conversions.json",
         required=False,
-        help="the text file containing the conversion rules",
+        help="the JSON file containing the conversion rules, or a conversions store built from one with 'edit-captions build-conversions-store'",
     )
     parser.add_argument(
         "-n",
         "-name",
-        help="optional destination filename, default is '<previous filename>-converted.vtt'",
+        help="optional destination filename, default is '<previous filename>-converted.vtt'. Ignored when converting a batch of files.",
     )
     parser.add_argument(
         "-o",
@@ -437,35 +973,193 @@ def main(args=None) -> argparse.Namespace:
         help="An integer (in seconds) that specifies the timestamp after which no more captions should occur.",
         default=0,
     )
-    args = parser.parse_args(args)
+    parser.add_argument(
+        "-w",
+        "-workers",
+        type=int,
+        help="The number of worker processes used when converting a batch of files, or that a single file is split across when streaming. Default is the number of CPUs for a batch, and one process when streaming.",
+        default=None,
+    )
+    parser.add_argument(
+        "-ws",
+        "-window_start",
+        type=float,
+        help="The time (in seconds) before which no captions should occur.",
+        default=0,
+    )
+    parser.add_argument(
+        "-we",
+        "-window_end",
+        type=float,
+        help="The time (in seconds) after which no more captions should occur. Combined with the cutoff, the earlier of the two is used.",
+        default=-1,
+    )
+    parser.add_argument(
+        "-sorted",
+        action="store_true",
+        help="Stop reading .vtt and .srt files once the cutoff or window end has passed, for files whose captions are sorted by start time.",
+    )
+    parser.add_argument(
+        "-idx",
+        "-index",
+        action="store_true",
+        help="Use a sidecar index of caption positions, built on first use, to seek straight to the window start in .vtt and .srt files read with -sorted.",
+    )
+    parser.add_argument(
+        "-s",
+        "-stream",
+        action="store_true",
+        help="Convert .vtt and .srt captions one cue at a time so that memory use stays constant regardless of file length.",
+    )
+    parser.add_argument(
+        "-cc",
+        "-caption_cache",
+        type=int,
+        help="The number of processed captions kept so that repeated captions are only processed once. 0 disables the cache. Default is 1024.",
+        default=1024,
+    )
+    parser.add_argument(
+        "-stats",
+        "--stats",
+        action="store_true",
+        help="Print statistics about each converted file as JSON: time spent in each stage, captions read and dropped, replacements made, bytes read and written, and peak memory. Not available when streaming.",
+    )
+    parser.add_argument(
+        "-rp",
+        "-render_processes",
+        action="store_true",
+        help="Render the destination filetypes in separate processes instead of threads, so that slow filetypes such as .dfxp render in parallel. Helps with large captions files.",
+    )
+    parser.add_argument(
+        "-watch",
+        "--watch",
+        action="store_true",
+        help="Keep running after converting a single file, and convert it again whenever it or the conversions file changes, processing only the captions the change affects.",
+    )
+    parser.add_argument(
+        "-wi",
+        "-watch_interval",
+        type=float,
+        help="How often (in seconds) the files are checked for changes in watch mode. Default is 0.5.",
+        default=0.5,
+    )
+    parser.add_argument(
+        "-cache",
+        "--cache",
+        action="store_true",
+        help="Copy the files written by an earlier conversion of the same captions with the same options from the output cache, instead of converting the captions again.",
+    )
+    parser.add_argument(
+        "-cs",
+        "-cache_size",
+        type=int,
+        help="The size (in MB) the output cache is kept under by removing the least recently used outputs. Default is 512.",
+        default=OUTPUT_CACHE_SIZE // (1024 * 1024),
+    )
+    parser.add_argument(
+        "-it",
+        "-input_type",
+        help="The filetype of captions read from stdin. Default is WebVTT.",
+        default=".vtt",
+    )
+    return parser
+
+
+def main(args=None) -> argparse.Namespace:
+    if not args:
+        args = sys.argv[1:]
+
+    if args and args[0] in COMMANDS:
+        command = import_module(f".{COMMANDS[args[0]]}", __package__)
+        return command.main(args[1:])
+
+    args = argument_parser().parse_args(args)
     cutoff = -1
     if hasattr(args, "co") and args.co:
         cutoff = int(args.co)
+
+    offset = 0
     if hasattr(args, "o") and args.o:
         offset = int(args.o)
 
         if offset == 0:
             print("Offset must be nonzero.")
-        else:
-            converter = Editor(
-                captions_file=args.caption_filename,
-                dest_filename=args.n,
-                dest_directory=args.dd,
-                dest_file_extensions=args.dt,
-                offset=offset,
-                cutoff=cutoff,
+            return args
+
+    editor_options = {
+        "conversions_file": args.c,
+        "dest_file_extensions": args.dt,
+        "dest_directory": args.dd,
+        "offset": offset,
+        "cutoff": cutoff,
+        "window_start": args.ws,
+        "window_end": args.we,
+        "assume_sorted": args.sorted,
+        "use_cue_index": args.idx,
+        "caption_cache_size": args.cc,
+        "use_output_cache": args.cache,
+        "output_cache_size": args.cs * 1024 * 1024,
+    }
+
+    if args.caption_filename == "-":
+        converter = Editor(**editor_options)
+        converter.edit_captions_stream(sys.stdin, sys.stdout, args.it)
+        return args
+
+    sources = [args.caption_filename] + args.more_caption_filenames
+    is_pattern = any(character in args.caption_filename for character in "*?[")
+    if len(sources) > 1 or is_pattern or Path(args.caption_filename).is_dir():
+        summary = Editor.edit_captions_batch(sources, workers=args.w, **editor_options)
+        for result in summary.failures:
+            print(f"Failed to convert {result.captions_file}: {result.error}")
+        print(summary)
+        if args.stats:
+            print(
+                json.dumps(
+                    {
+                        str(result.captions_file): asdict(result.stats)
+                        for result in summary.results
+                        if result.stats
+                    },
+                    indent=2,
+                )
             )
-            converter.edit_captions()
     else:
+        if args.watch:
+            from .watch import watch_captions
+
+            try:
+                watch_captions(
+                    lambda: Editor(
+                        captions_file=args.caption_filename,
+                        dest_filename=args.n,
+                        **editor_options,
+                    ),
+                    args.wi,
+                )
+            except KeyboardInterrupt:
+                pass
+            return args
+
         converter = Editor(
             captions_file=args.caption_filename,
-            conversions_file=args.c,
             dest_filename=args.n,
-            dest_directory=args.dd,
-            dest_file_extensions=args.dt,
-            cutoff=cutoff,
+            **editor_options,
         )
-        converter.edit_captions()
+        if args.s and args.w and args.w > 1:
+            converter.edit_captions_parallel(args.w)
+        elif args.s:
+            converter.edit_captions_stream()
+        else:
+            with ExitStack() as stack:
+                executor = None
+                if args.rp:
+                    executor = stack.enter_context(
+                        ProcessPoolExecutor(max_workers=len(converter._dest_filetypes))
+                    )
+                stats = converter.edit_captions(executor)
+            if args.stats:
+                print(stats.to_json())
 
     return args
 
@@ -0,0 +1,71 @@
+import threading
+from collections.abc import Mapping
+from importlib import import_module
+from typing import Iterable
+
+# The reader and writer classes for each supported file type, as module:class paths, with module paths starting with a dot relative to this package.
+# Modules are only imported once a reader or writer is first needed, so that jobs which never parse or render captions with pycaption,
+# such as streaming conversions, do not pay for importing it.
+FORMATS = {
+    ".vtt": ("pycaption:WebVTTReader", ".writers:FastWebVTTWriter"),
+    ".srt": ("pycaption:SRTReader", ".writers:FastSRTWriter"),
+    ".ttml": (".dfxp:StreamingDFXPReader", "pycaption:DFXPWriter"),
+    ".dfxp": (".dfxp:StreamingDFXPReader", "pycaption:DFXPWriter"),
+}
+
+READER = 0
+WRITER = 1
+
+
+class FormatRegistry(Mapping):
+    """
+    Maps each supported file extension to a reader or writer, which is imported and created the first time its extension is looked up.
+    Checking whether an extension is supported, or listing the supported extensions, does not import anything.
+    """
+
+    def __init__(self, role: int) -> None:
+        self._class_paths = {
+            extension: class_paths[role] for extension, class_paths in FORMATS.items()
+        }
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, extension: str):
+        instance = self._instances.get(extension)
+        if instance is not None:
+            return instance
+
+        module_path, class_name = self._class_paths[extension].split(":")
+        with self._lock:
+            if extension not in self._instances:
+                self._instances[extension] = getattr(
+                    import_module(module_path, __package__), class_name
+                )()
+            return self._instances[extension]
+
+    def __contains__(self, extension) -> bool:
+        return extension in self._class_paths
+
+    def __iter__(self):
+        return iter(self._class_paths)
+
+    def __len__(self) -> int:
+        return len(self._class_paths)
+
+    def loaded(self) -> list[str]:
+        """
+        Returns the extensions whose reader or writer has been created.
+        """
+
+        return list(self._instances)
+
+
+def writer_groups(extensions: Iterable[str]) -> list[list[str]]:
+    """
+    Groups the extensions by the writer that renders them, so that extensions rendered by the same writer, such as .ttml and .dfxp, are only rendered once.
+    """
+
+    groups: dict[str, list[str]] = {}
+    for extension in extensions:
+        groups.setdefault(FORMATS[extension][WRITER], []).append(extension)
+    return list(groups.values())
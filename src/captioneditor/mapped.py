@@ -0,0 +1,337 @@
+import codecs
+import html
+import mmap
+import re
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .cues import CueTable
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+# Line breaks that str.splitlines, which pycaption splits captions into lines with, finds but a scan for '\n' does not, including carriage returns outside of '\r\n'
+SPLITLINES_ONLY = re.compile(
+    rb"[\x0b\x0c\x1c-\x1f]|\xc2\x85|\xe2\x80[\xa8\xa9]|\r(?!\n)"
+)
+NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+# WebVTT markup that WebVTTReader styles or positions captions with: tags and voice spans, and STYLE and REGION blocks
+WEBVTT_MARKUP = (b"<", b"STYLE", b"REGION")
+
+# The timing lines that WebVTTReader and SRTReader read, without cue settings. Other timing lines are read by pycaption itself.
+WEBVTT_TIMING = re.compile(
+    rb"(\d+):(\d{2})(?::(\d{2}))?\.(\d{3})[ \t]+-->[ \t]+(\d+):(\d{2})(?::(\d{2}))?\.(\d{3})[ \t]*"
+)
+SRT_TIMING = re.compile(
+    rb" *(\d+):(\d+):(\d+)(?:,(\d+))? *--> *(\d+):(\d+):(\d+)(?:,(\d+))? *"
+)
+
+# How much of the file is split into lines, and decoded to check its encoding, at a time
+LINES_SIZE = 1 << 20
+DECODE_SIZE = 1 << 20
+
+
+class UnsupportedCaptions(Exception):
+    """
+    Raised for captions outside the subset of WebVTT and SRT that read_mapped_cues reads, which are read with pycaption instead.
+    """
+
+
+def _lines(buffer: mmap.mmap, start: int, stop: int) -> Iterator[bytes]:
+    """
+    Lazily yields the lines between the byte offsets without their line breaks, split as str.splitlines splits them once there are no other line breaks than '\\n' and '\\r\\n'.
+    Lines are split a chunk of the buffer at a time, so only one chunk is copied out of it at once.
+    """
+
+    while start < stop:
+        # Each chunk ends at the end of a line
+        end = min(stop, start + LINES_SIZE)
+        if end < stop:
+            end = buffer.find(b"\n", end - 1, stop) + 1 or stop
+
+        chunk = buffer[start:end]
+        lines = chunk.split(b"\n")
+        if chunk.endswith(b"\n"):
+            lines.pop()
+        if b"\r" in chunk:
+            lines = [line[:-1] if line.endswith(b"\r") else line for line in lines]
+        yield from lines
+        start = end
+
+
+def _text(line: bytes) -> bytes | str:
+    """
+    Returns ASCII lines as they are, and decodes any other line, so that checks on it treat Unicode whitespace and digits as pycaption does.
+    """
+
+    return line if line.isascii() else line.decode("utf8")
+
+
+def _milliseconds(
+    hours: bytes, minutes: bytes, seconds: bytes, fraction: bytes | None
+) -> int:
+    return (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) * 1000 + int(
+        fraction or 0
+    )
+
+
+def _webvtt_times(match: re.Match) -> tuple[int, int]:
+    """
+    Returns the start and end milliseconds of a matched WebVTT timing line. Timestamps without hours are minutes and seconds.
+    """
+
+    times = []
+    for first, second, third, fraction in (match.groups()[:4], match.groups()[4:]):
+        if third is None:
+            first, second, third = b"0", first, second
+        times.append(_milliseconds(first, second, third, fraction))
+    return times[0], times[1]
+
+
+def _check_decoding(buffer: mmap.mmap, ranges: list[tuple[int, int]]) -> None:
+    """
+    Decodes the ranges a chunk at a time, raising UnicodeDecodeError for invalid UTF-8 just as reading them as text would.
+    Raises UnsupportedCaptions if pycaption would repair them as UTF-8 that was encoded twice, which only the fully decoded text can be repaired from.
+    """
+
+    decoder = codecs.getincrementaldecoder("utf8")()
+    repair_decoder = codecs.getincrementaldecoder("utf8")()
+    repairable = True
+    for start, stop in ranges:
+        for chunk_start in range(start, stop, DECODE_SIZE):
+            text = decoder.decode(
+                buffer[chunk_start : min(stop, chunk_start + DECODE_SIZE)]
+            )
+            if repairable:
+                try:
+                    repair_decoder.decode(text.encode("cp1252"))
+                except UnicodeError:
+                    repairable = False
+    decoder.decode(b"", final=True)
+
+    if repairable:
+        try:
+            repair_decoder.decode(b"", final=True)
+        except UnicodeError:
+            return
+        raise UnsupportedCaptions
+
+
+def _append_webvtt_cue(
+    cues: CueTable, start: int, end: int, lines: list[bytes | None], plain: bool
+) -> None:
+    """
+    Adds a WebVTT cue from the text of its lines, with None for each line break. Cues that are not plain, with a text node for every line, keep their nodes.
+    """
+
+    if plain:
+        cues.append(start, end, b"\n".join(lines[::2]))
+        return
+
+    from pycaption import Caption, CaptionNode
+
+    cues.append_caption(
+        Caption(
+            start * 1000,
+            end * 1000,
+            [
+                (
+                    CaptionNode.create_break()
+                    if line is None
+                    else CaptionNode.create_text(line.decode("utf8"))
+                )
+                for line in lines
+            ],
+        )
+    )
+
+
+def _read_webvtt(lines: Iterable[bytes], cues: CueTable) -> None:
+    """
+    Reads WebVTT cues into the table line by line, with the same steps as WebVTTReader: NOTE blocks and identifiers are skipped, cue text lines are stripped
+    and have their character references decoded, and a blank line ends a cue once it has text.
+    """
+
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or not (
+        first == b"WEBVTT" or first.startswith((b"WEBVTT ", b"WEBVTT\t"))
+    ):
+        raise UnsupportedCaptions
+
+    line_count = 1
+    found_blank = False
+    found_timing = False
+    in_note = False
+    text_lines: list[bytes | None] = []
+    plain = True
+    start = end = 0
+    for line in lines:
+        line_count += 1
+        if in_note:
+            in_note = line != b""
+            found_blank = found_blank or not in_note
+            continue
+
+        if not found_timing:
+            if not line:
+                found_blank = True
+            elif line == b"NOTE" or line.startswith((b"NOTE ", b"NOTE\t")):
+                in_note = True
+            elif b"-->" in line:
+                match = WEBVTT_TIMING.fullmatch(line)
+                if match is None:
+                    raise UnsupportedCaptions
+                start, end = _webvtt_times(match)
+                found_timing = True
+            # Anything else before a timing line is an identifier, which is not kept
+            continue
+
+        if not line:
+            found_blank = True
+            if text_lines:
+                _append_webvtt_cue(cues, start, end, text_lines, plain)
+                text_lines = []
+                plain = True
+                found_timing = False
+            continue
+
+        if b"-->" in line:
+            match = WEBVTT_TIMING.fullmatch(line)
+            if match is None:
+                raise UnsupportedCaptions
+            start, end = _webvtt_times(match)
+            continue
+
+        text = line.strip() if line.isascii() else line.decode("utf8").strip()
+        if b"&" in line:
+            text = html.unescape(text if isinstance(text, str) else text.decode())
+            plain = plain and "\n" not in text
+        if isinstance(text, str):
+            text = text.encode("utf8")
+
+        # A line break is only added after text, and a cue is plain as long as text follows every line break
+        if text_lines:
+            text_lines.append(None)
+            if text:
+                text_lines.append(text)
+            else:
+                plain = False
+        elif text:
+            text_lines.append(text)
+
+    if text_lines:
+        _append_webvtt_cue(cues, start, end, text_lines, plain)
+
+    # The header must be followed by a blank line, unless it is the only line
+    if line_count > 1 and not found_blank:
+        raise UnsupportedCaptions
+
+
+def _read_srt(lines: Iterable[bytes], cues: CueTable) -> None:
+    """
+    Reads SRT cues into the table line by line, with the same steps as SRTReader: reading stops at the first cue that does not start with a number,
+    a cue ends at the first line with text after a blank line, and text lines are kept as they are apart from extra blank lines.
+    """
+
+    lines = iter(lines)
+    line = next(lines, None)
+    while line is not None and _text(line).isdigit():
+        timing = next(lines, None)
+        match = None if timing is None else SRT_TIMING.fullmatch(timing)
+        if match is None:
+            raise UnsupportedCaptions
+
+        cue_lines = []
+        found_blank = False
+        line = None
+        for following in lines:
+            # Only lines with non-ASCII text can be blank apart from ASCII whitespace
+            if not following.strip() or (
+                not following.isascii() and not following.decode("utf8").strip()
+            ):
+                found_blank = True
+            elif found_blank:
+                line = following
+                break
+            cue_lines.append(following)
+
+        # The blank line before the next cue is not part of the cue, but the last cue keeps all of its trailing blank lines
+        if line is not None:
+            cue_lines.pop()
+
+        text_lines = []
+        for cue_line in cue_lines:
+            # Blank lines are skipped, unless they are the first line
+            if not text_lines or cue_line:
+                text_lines.append(cue_line)
+        if text_lines:
+            cues.append(
+                _milliseconds(*match.groups()[:4]),
+                _milliseconds(*match.groups()[4:]),
+                b"\n".join(text_lines),
+            )
+
+
+def read_mapped_cues(
+    captions_file: Path,
+    captions_type: str,
+    ranges: list[tuple[int, int | None]] | None = None,
+) -> tuple[CueTable, int]:
+    """
+    Reads the WebVTT or SRT captions in the (start, stop) byte ranges of the file, or in the whole file, into a cue table straight from a memory map of it.
+    Timing lines are parsed as bytes and the text of each cue is copied into the table as it is, so ASCII captions are never decoded.
+    The captions are exactly those pycaption would read from the same bytes. Returns the table and the number of bytes read.
+
+    Raises UnsupportedCaptions for captions that pycaption could read differently, such as ones with styling, cue settings, or line breaks other than '\\n' and '\\r\\n'.
+    """
+
+    if captions_type not in (".vtt", ".srt"):
+        raise UnsupportedCaptions
+
+    with open(captions_file, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            raise UnsupportedCaptions from None
+
+    with buffer:
+        ranges = [
+            (start, len(buffer) if stop is None else stop)
+            for start, stop in ranges or [(0, None)]
+        ]
+        ranges = [(start, stop) for start, stop in ranges if start < stop]
+        if not ranges:
+            raise UnsupportedCaptions
+        bytes_read = sum(stop - start for start, stop in ranges)
+
+        # Like pycaption, a byte order mark is only skipped at the very start of the captions
+        if ranges[0][0] == 0 and buffer[:3] == UTF8_BOM:
+            ranges[0] = (3, ranges[0][1])
+
+        markup = WEBVTT_MARKUP if captions_type == ".vtt" else ()
+        for start, stop in ranges:
+            if SPLITLINES_ONLY.search(buffer, start, stop) or any(
+                buffer.find(needle, start, stop) >= 0 for needle in markup
+            ):
+                raise UnsupportedCaptions
+
+        # ASCII bytes decode to themselves, so only the captions from their first non-ASCII byte on need decoding
+        for index, (start, stop) in enumerate(ranges):
+            match = NON_ASCII.search(buffer, start, stop)
+            if match is not None:
+                _check_decoding(buffer, [(match.start(), stop), *ranges[index + 1 :]])
+                break
+
+        cues = CueTable()
+        lines = chain.from_iterable(
+            _lines(buffer, start, stop) for start, stop in ranges
+        )
+        if captions_type == ".vtt":
+            _read_webvtt(lines, cues)
+        else:
+            _read_srt(lines, cues)
+
+    return cues, bytes_read
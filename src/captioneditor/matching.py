@@ -0,0 +1,289 @@
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from . import conversions as conversions_module
+from .conversions import CompiledConversions
+from .patterns import compile_regex_conversions
+
+if TYPE_CHECKING:
+    from flashtext2 import KeywordProcessor
+
+# A noncharacter appended to every keyword replacement, so that the replacements a pass makes are counted in the text it returns rather than with a second scan.
+# flashtext treats it as a word boundary, so the rare caption that contains it is processed in the pieces between its occurrences.
+MATCH_MARK = "\uffff"
+
+# Matchers built for conversions kept in memory by load_conversions, keyed by the id of the conversions they were built from
+SHARED_MATCHERS_SIZE = 16
+_shared_matchers: OrderedDict[int, tuple[CompiledConversions, "ConversionMatcher"]] = (
+    OrderedDict()
+)
+_shared_matchers_lock = threading.Lock()
+
+
+def _keyword_processor(case_sensitive: bool) -> "KeywordProcessor":
+    # flashtext2 is only imported once there are keywords to match, so that offset-only jobs and conversions without keywords do not load it
+    from flashtext2 import KeywordProcessor
+
+    return KeywordProcessor(case_sensitive=case_sensitive)
+
+
+class ConversionMatcher:
+    """
+    Applies compiled conversions to caption text.
+
+    Regex conversions are applied first, all in one pass with a single combined pattern. The keyword passes follow in order, so that case-insensitive conversions are
+    applied before case-sensitive ones, and conversions keyed to the previous caption are applied last. Passes without any keys are skipped, so conversions without
+    any keys, such as direct conversions only, need no processors at all.
+
+    The passes are deliberately not merged into one scan. Each pass replaces keys in the text the pass before it returned, so a key can match text that an earlier
+    replacement produced, which no single scan of the original text can find. Probing with every key at once does not work either: flashtext matches the longest key
+    at each position without backtracking, so a longer key of one pass that only partly matches would hide a shorter key of another pass inside it.
+
+    A matcher is the compiled, immutable form of its conversions: it copies them when it is built and is never changed by processing captions,
+    so one matcher can process captions in any number of threads at once.
+    """
+
+    def __init__(self, conversions: CompiledConversions) -> None:
+        self._direct_conversions = dict(conversions.direct)
+        self._previous_conversions = {
+            previous: tuple(previous_conversions)
+            for previous, previous_conversions in conversions.previous.items()
+        }
+
+        self._regex_conversions = None
+        if conversions.regex:
+            self._regex_conversions = compile_regex_conversions(
+                tuple(conversions.regex)
+            )
+
+        # Without any conversions no caption is ever changed, so captions can be copied without being processed
+        self.is_empty = not (
+            conversions.direct
+            or conversions.regex
+            or conversions.case_sensitive
+            or conversions.case_insensitive
+            or conversions.previous
+        )
+
+        # Processors to look for simple matches to be replaced
+        self._case_sensitive_processor = None
+        if conversions.case_sensitive:
+            self._case_sensitive_processor = _keyword_processor(case_sensitive=True)
+            for key, replacement in conversions.case_sensitive:
+                self._case_sensitive_processor.add_keyword(
+                    key, replacement + MATCH_MARK
+                )
+
+        self._case_insensitive_processor = None
+        if conversions.case_insensitive:
+            self._case_insensitive_processor = _keyword_processor(case_sensitive=False)
+            for key, replacement in conversions.case_insensitive:
+                self._case_insensitive_processor.add_keyword(
+                    key, replacement + MATCH_MARK
+                )
+
+        # Processor to look for matches in the current caption that will be used to key conversions in the following caption
+        self._previous_caption_keys_processor = None
+        if conversions.previous:
+            self._previous_caption_keys_processor = _keyword_processor(
+                case_sensitive=True
+            )
+            for previous in conversions.previous:
+                self._previous_caption_keys_processor.add_keyword(previous)
+
+        # Processors meant to process the following caption, keyed to the matches that could be found in the previous caption.
+        # They are only built once their key has been matched, so unused keys cost nothing. Each is added whole, once built, so threads never see a partly built one.
+        self._previous_captions_processors: dict[str, "KeywordProcessor"] = {}
+        self._previous_captions_lock = threading.Lock()
+
+    def _previous_captions_processor(self, previous: str) -> "KeywordProcessor":
+        processor = self._previous_captions_processors.get(previous)
+        if processor is not None:
+            return processor
+
+        with self._previous_captions_lock:
+            processor = self._previous_captions_processors.get(previous)
+            if processor is None:
+                processor = _keyword_processor(case_sensitive=True)
+                for key, replacement in self._previous_conversions[previous]:
+                    processor.add_keyword(key, replacement + MATCH_MARK)
+                self._previous_captions_processors[previous] = processor
+
+        return processor
+
+    @staticmethod
+    def _replace(
+        processor: "KeywordProcessor",
+        caption_text: str,
+        replacements: dict[str, int] | None,
+        kind: str,
+    ) -> str:
+        if MATCH_MARK in caption_text:
+            return MATCH_MARK.join(
+                ConversionMatcher._replace(processor, piece, replacements, kind)
+                for piece in caption_text.split(MATCH_MARK)
+            )
+
+        new_text = processor.replace_keywords(caption_text)
+        if MATCH_MARK not in new_text:
+            return new_text
+
+        # Every replacement ends with the mark, so the replacements made are counted in the replaced text itself
+        if replacements is not None:
+            replacements[kind] = replacements.get(kind, 0) + new_text.count(MATCH_MARK)
+        return new_text.replace(MATCH_MARK, "")
+
+    def process(
+        self,
+        caption_text: str,
+        previous_caption_keys: list[str],
+        replacements: dict[str, int] | None = None,
+    ) -> tuple[str, list[str]]:
+        """
+        Replaces any keywords in the caption text, given the keys matched in the previous caption.
+        Returns the new text and the keys matched in it that are relevant for the next caption.
+        If a replacements dict is given, the number of replacements made by each kind of conversion is added to it.
+        """
+
+        # First, check for any captions that should be converted directly
+        if caption_text in self._direct_conversions:
+            if replacements is not None:
+                replacements["direct"] = replacements.get("direct", 0) + 1
+            return self._direct_conversions[caption_text], previous_caption_keys
+
+        # Regex conversions come before the keys are looked for, so keys in the text they replace are matched as well
+        if self._regex_conversions is not None:
+            caption_text, count = self._regex_conversions.replace(caption_text)
+            if replacements is not None and count:
+                replacements["regex"] = replacements.get("regex", 0) + count
+
+        # Process caption through both the case-insensitive and case-sensitive processors
+        if self._case_insensitive_processor is not None:
+            caption_text = self._replace(
+                self._case_insensitive_processor,
+                caption_text,
+                replacements,
+                "case_insensitive",
+            )
+        if self._case_sensitive_processor is not None:
+            caption_text = self._replace(
+                self._case_sensitive_processor,
+                caption_text,
+                replacements,
+                "case_sensitive",
+            )
+
+        # If any previous caption keys were matched in the previous caption, iterate through them and process the current caption as appropriate
+        for key in previous_caption_keys:
+            # Keys matched with other conversions, such as before a reload, have nothing to apply
+            if key not in self._previous_conversions:
+                continue
+            caption_text = self._replace(
+                self._previous_captions_processor(key),
+                caption_text,
+                replacements,
+                "previous",
+            )
+
+        # Check the current caption for any matches in the previous caption keys so that they're ready when the next caption is processed
+        if self._previous_caption_keys_processor is None:
+            return caption_text, []
+        return caption_text, self._previous_caption_keys_processor.extract_keywords(
+            caption_text
+        )
+
+
+class CaptionCache:
+    """
+    A bounded least-recently-used cache of processed captions, keyed on the caption text and the keys matched in the previous caption.
+    A maximum size of zero disables the cache. Counts of hits and misses are kept until the cache is cleared.
+    The cache can be used by several threads at once. Results depend only on their key, so threads sharing it get the same results as they would alone.
+    Lookups are not locked, since every step of one is atomic, so the counts can miss the odd lookup made at the same moment as another.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        if maxsize < 0:
+            raise ValueError("Cache size must not be negative")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict[tuple[str, tuple[str, ...]], tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, caption_text: str, previous_caption_keys: list[str]) -> tuple | None:
+        """
+        Returns the cached result for the caption, or None if it has not been processed with the same previous caption keys.
+        """
+
+        cache_key = (caption_text, tuple(previous_caption_keys))
+        result = self._results.get(cache_key)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        try:
+            self._results.move_to_end(cache_key)
+        except KeyError:
+            # Evicted by another thread since it was found
+            pass
+        return result
+
+    def put(
+        self,
+        caption_text: str,
+        previous_caption_keys: list[str],
+        result: tuple,
+    ) -> None:
+        """
+        Stores the processed result for the caption, evicting the least recently used result if the cache is full.
+        """
+
+        if not self.maxsize:
+            return
+
+        cache_key = (caption_text, tuple(previous_caption_keys))
+        with self._lock:
+            self._results[cache_key] = result
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes every cached result and resets the hit and miss counts.
+        """
+
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def shared_matcher(conversions: CompiledConversions) -> ConversionMatcher:
+    """
+    Returns a matcher for the conversions. When loaded conversions are kept in memory, the matcher is kept with them, so that every editor using the same
+    conversions shares one matcher instead of building its own. Matchers only hold state that is safe to share between editors and threads.
+    """
+
+    if not conversions_module.keep_loaded_conversions:
+        return ConversionMatcher(conversions)
+
+    with _shared_matchers_lock:
+        shared = _shared_matchers.get(id(conversions))
+        # The conversions are kept in the entry, so their id cannot be reused by other conversions while the entry exists
+        if shared and shared[0] is conversions:
+            _shared_matchers.move_to_end(id(conversions))
+            return shared[1]
+
+    matcher = ConversionMatcher(conversions)
+    with _shared_matchers_lock:
+        _shared_matchers[id(conversions)] = (conversions, matcher)
+        if len(_shared_matchers) > SHARED_MATCHERS_SIZE:
+            _shared_matchers.popitem(last=False)
+
+    return matcher
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .conversions import conversions_cache_dir
+
+if TYPE_CHECKING:
+    from .editor import Editor
+
+# Bump whenever the layout of a cache entry or what goes into its key changes so that old entries are ignored
+OUTPUT_CACHE_VERSION = 1
+
+# The default limit on the total size of the cached outputs, in bytes
+OUTPUT_CACHE_SIZE = 512 * 1024 * 1024
+
+# Once the cache grows past its limit, the least recently used entries are removed until it is back under this fraction of the limit,
+# so that a full cache is not scanned again after every edit
+EVICT_TO = 0.75
+
+# The size of each cache directory as last measured by this process plus everything it has stored since, keyed by directory
+_cache_sizes: dict[Path, int] = {}
+_cache_sizes_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """
+    Returns the versions of the package and of pycaption, along with the size and modification time of every module of the package,
+    so that outputs cached by a different version of the code, including a changed source checkout, are never reused.
+    """
+
+    versions = []
+    for package in ("captioneditor", "pycaption"):
+        try:
+            versions.append(f"{package} {version(package)}")
+        except PackageNotFoundError:
+            versions.append(f"{package} unknown")
+
+    for module in sorted(Path(__file__).parent.glob("*.py")):
+        stat = module.stat()
+        versions.append(f"{module.name} {stat.st_size} {stat.st_mtime_ns}")
+
+    return "\n".join(versions)
+
+
+def output_cache_key(editor: "Editor") -> str:
+    """
+    Returns the key of the outputs of an edit: a hash of the captions file's contents and type, the compiled conversions, the offset, cutoff, and time window,
+    the destination filetypes, and the version of the code. Two edits with the same key write the same destination files.
+    """
+
+    digest = hashlib.sha256()
+    with open(editor._captions_file_path, "rb") as captions_file:
+        digest.update(captions_file.read())
+
+    settings = {
+        "version": OUTPUT_CACHE_VERSION,
+        "code": code_version(),
+        "captions_type": editor._captions_file_path.suffix,
+        "conversions": vars(editor._conversions),
+        "offset": editor.timing_offset,
+        "cutoff": editor._effective_cutoff(),
+        "window_start": editor._window_start,
+        "assume_sorted": editor.assume_sorted,
+        "dest_filetypes": sorted(editor._dest_filetypes),
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf8"))
+    return digest.hexdigest()
+
+
+class OutputCache:
+    """
+    A directory of the destination files written by past edits, keyed by output_cache_key. Each entry is a '<key><extension>' file for every destination filetype
+    and a '<key>.json' file holding the statistics of the edit, which is written last so that an entry is only used once it is complete.
+    Entries are removed least recently used first once their total size passes max_size bytes.
+    """
+
+    def __init__(
+        self, cache_dir: Path | str | None = None, max_size: int = OUTPUT_CACHE_SIZE
+    ) -> None:
+        self.cache_dir = (
+            Path(cache_dir) if cache_dir else conversions_cache_dir() / "outputs"
+        )
+        self.max_size = max_size
+
+    def _entry_path(self, key: str, extension: str) -> Path:
+        return self.cache_dir / f"{key}{extension}"
+
+    def load(self, key: str, dest_paths: dict[str, Path]) -> dict | None:
+        """
+        Copies the cached outputs for the key to the destination paths, keyed by extension, and returns the statistics stored with them,
+        or returns None without writing anything if the cache has no complete entry for the key.
+        """
+
+        stats_path = self._entry_path(key, ".json")
+        try:
+            with open(stats_path, "r", encoding="utf8") as stats_file:
+                stats = json.load(stats_file)
+            if not all(
+                self._entry_path(key, extension).is_file() for extension in dest_paths
+            ):
+                return None
+
+            for extension, dest_path in dest_paths.items():
+                shutil.copyfile(self._entry_path(key, extension), dest_path)
+
+            # The statistics file's modification time records when the entry was last used
+            os.utime(stats_path)
+        except (OSError, ValueError):
+            # An entry removed or replaced part way through is treated as missing
+            return None
+
+        return stats
+
+    def store(self, key: str, dest_paths: dict[str, Path], stats: dict) -> None:
+        """
+        Copies the destination files just written for the key into the cache along with the statistics of the edit, then removes old entries if the cache is too large.
+        """
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Each file is copied to a temporary file first so that a concurrent edit never sees a partial entry
+        stored = 0
+        for extension, dest_path in [*dest_paths.items(), (".json", None)]:
+            entry_path = self._entry_path(key, extension)
+            temp_path = entry_path.with_name(
+                f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            if dest_path is None:
+                with open(temp_path, "w", encoding="utf8") as stats_file:
+                    json.dump(stats, stats_file)
+            else:
+                shutil.copyfile(dest_path, temp_path)
+            stored += temp_path.stat().st_size
+            os.replace(temp_path, entry_path)
+
+        with _cache_sizes_lock:
+            if self.cache_dir in _cache_sizes:
+                _cache_sizes[self.cache_dir] += stored
+                size = _cache_sizes[self.cache_dir]
+            else:
+                size = None
+
+        if size is None or size > self.max_size:
+            self.evict(int(self.max_size * EVICT_TO) if size else self.max_size)
+
+    def _entries(self) -> dict[str, tuple[int, float]]:
+        """
+        Returns the total size and last use of every entry in the cache, keyed by the entry's key.
+        """
+
+        entries = {}
+        with os.scandir(self.cache_dir) as files:
+            for file in files:
+                if file.name.endswith(".tmp"):
+                    continue
+                key, _, extension = file.name.partition(".")
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue
+
+                size, last_used = entries.get(key, (0, 0.0))
+                # An entry without its statistics file is incomplete and removed first
+                if extension == "json":
+                    last_used = stat.st_mtime
+                entries[key] = (size + stat.st_size, last_used)
+
+        return entries
+
+    def evict(self, max_size: int | None = None) -> int:
+        """
+        Removes the least recently used entries until the cache holds at most max_size bytes, the cache's limit by default. Returns the size of the cache afterwards.
+        """
+
+        if max_size is None:
+            max_size = self.max_size
+
+        entries = self._entries()
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda entry: entry[1][1]):
+            if total <= max_size:
+                break
+
+            # The statistics file goes first so that the entry stops being used before its outputs disappear
+            for entry_path in sorted(
+                self.cache_dir.glob(f"{key}.*"), key=lambda path: path.suffix != ".json"
+            ):
+                try:
+                    entry_path.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+        with _cache_sizes_lock:
+            _cache_sizes[self.cache_dir] = total
+        return total
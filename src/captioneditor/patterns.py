@@ -0,0 +1,353 @@
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# The parser behind re is only used to find the literal text a pattern requires. Without it, every pattern is tried on every caption.
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    try:
+        import sre_parse
+    except ImportError:
+        sre_parse = None
+
+# The number of combined patterns kept compiled, so that editors, workers, and reloads built from the same regex conversions compile them only once
+PATTERN_CACHE_SIZE = 32
+
+# The number of combinations of conversions each RegexConversions keeps a combined pattern for
+COMBINED_PATTERNS_SIZE = 256
+
+
+def _literal_runs(items, runs: list[str], run: list[str]) -> list[str]:
+    """
+    Adds every run of literal text that a match of the parsed items must contain to runs, and returns the run still open after the last item.
+    """
+
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+
+        runs.append("".join(run))
+        run = []
+        if op == sre_parse.SUBPATTERN and not av[1] and not av[2]:
+            # A group without scoped flags is part of the sequence around it
+            run = _literal_runs(av[-1], runs, run)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            # Anything repeated at least once is required, but not next to the text around it
+            runs.append("".join(_literal_runs(av[2], runs, [])))
+
+    return run
+
+
+def required_literal(pattern: re.Pattern) -> str | None:
+    """
+    Returns the longest run of literal text that every match of the pattern contains, lowercased if the pattern ignores case, or None if there is none.
+    Patterns that ignore case only have a required literal if it is ASCII, since characters such as 'ſ' match ASCII letters when case is ignored.
+    """
+
+    if sre_parse is None:
+        return None
+
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+        runs = []
+        runs.append("".join(_literal_runs(parsed, runs, [])))
+    except (AttributeError, TypeError, ValueError, re.error):
+        return None
+
+    literal = max(runs, key=len)
+    if pattern.flags & re.IGNORECASE:
+        literal = literal.lower() if literal.isascii() else ""
+    return literal or None
+
+
+# Flags such as '(?i)' that apply to a whole pattern, which re only allows at its start
+GLOBAL_FLAGS = re.compile(r"(?:\(\?[aiLmsux]+\))+")
+
+
+def _isolated_pattern(pattern: str, verbose: bool, prefix: str) -> str:
+    """
+    Returns the pattern rewritten to match the same text wherever it is placed inside another pattern. Flags at its start, such as '(?i)', are scoped to it,
+    its named groups are prefixed with the prefix, and each reference to a group by number, as in '(\\w)\\1' or '(?(1)...)', refers to the group by name instead.
+    Groups without a name that are referred to are named with the prefix and their number.
+    """
+
+    flags = GLOBAL_FLAGS.match(pattern)
+    if flags:
+        pattern = pattern[flags.end() :]
+
+    # Text, or ("reference", number or name) and ("condition", number or name) for each reference to a group
+    pieces = []
+    # The index in pieces of the opening of each group that captures, and its name if it has one
+    groups = []
+    position = 0
+    in_class = False
+    while position < len(pattern):
+        char = pattern[position]
+        if char == "\\":
+            # As in re, three octal digits are a character rather than a reference to a group
+            reference = re.match(
+                r"\\(?![1-7][0-7]{2})([1-9][0-9]?)", pattern[position:]
+            )
+            if reference and not in_class:
+                pieces.append(("reference", int(reference.group(1))))
+                position += reference.end()
+                continue
+            pieces.append(pattern[position : position + 2])
+            position += 2
+        elif in_class:
+            in_class = char != "]"
+            pieces.append(char)
+            position += 1
+        elif char == "[":
+            # A ']' straight after the opening bracket, or after '^', is part of the class
+            end = position + 1
+            if pattern.startswith("^", end):
+                end += 1
+            if pattern.startswith("]", end):
+                end += 1
+            in_class = True
+            pieces.append(pattern[position:end])
+            position = end
+        elif char == "#" and verbose:
+            end = pattern.find("\n", position)
+            end = len(pattern) if end == -1 else end
+            pieces.append(pattern[position:end])
+            position = end
+        elif char == "(":
+            condition = re.match(r"\(\?\((\w+)\)", pattern[position:])
+            named = re.match(r"\(\?P<(\w+)>", pattern[position:])
+            reference = re.match(r"\(\?P=(\w+)\)", pattern[position:])
+            if pattern.startswith("(?#", position):
+                end = pattern.find(")", position) + 1 or len(pattern)
+                pieces.append(pattern[position:end])
+                position = end
+            elif condition or reference:
+                name = (condition or reference).group(1)
+                pieces.append(
+                    (
+                        "condition" if condition else "reference",
+                        int(name) if name.isdigit() else name,
+                    )
+                )
+                position += (condition or reference).end()
+            elif named:
+                groups.append((len(pieces), named.group(1)))
+                pieces.append(f"(?P<{prefix}{named.group(1)}>")
+                position += named.end()
+            elif not pattern.startswith("(?", position):
+                groups.append((len(pieces), None))
+                pieces.append("(")
+                position += 1
+            else:
+                pieces.append(char)
+                position += 1
+        else:
+            pieces.append(char)
+            position += 1
+
+    for index, piece in enumerate(pieces):
+        if isinstance(piece, str):
+            continue
+        kind, group = piece
+        if isinstance(group, str):
+            name = f"{prefix}{group}"
+        elif group > len(groups):
+            pieces[index] = f"\\{group}" if kind == "reference" else f"(?({group})"
+            continue
+        else:
+            opening, name = groups[group - 1]
+            if name is None:
+                name = f"{group}"
+                groups[group - 1] = (opening, name)
+                pieces[opening] = f"(?P<{prefix}{name}>"
+            name = f"{prefix}{name}"
+        pieces[index] = f"(?P={name})" if kind == "reference" else f"(?({name})"
+
+    pattern = "".join(pieces)
+    if flags:
+        # A comment at the end of a verbose pattern would otherwise hide the closing parenthesis
+        ending = "\n" if verbose else ""
+        return f"(?{''.join(re.findall('[aiLmsux]', flags.group()))}:{pattern}{ending})"
+    return pattern
+
+
+class RegexConversions:
+    """
+    Applies every regex conversion to caption text in a single pass, with one pattern that alternates between the pattern of each conversion.
+    At each position, the first conversion in file order whose pattern matches there is replaced, and the text it is replaced with is not searched again.
+    Replacements can refer to the groups of their own pattern, as in re.sub.
+
+    The re module tries every alternative at every position, so each caption is only searched with the conversions whose required literal text, such as 'km' in
+    '(\\d+) ?km', it contains. The combined pattern of each such set of conversions is compiled once and kept. A conversion left out of the set could not have matched.
+    A conversion whose pattern cannot be combined with others even once isolated (see _isolated_pattern) is applied on its own, in file order, after the combined ones.
+    """
+
+    def __init__(self, rules: tuple[tuple[str, str, bool], ...]) -> None:
+        # (compiled pattern, replacement, whether the replacement refers to groups, alternative, required literal, case sensitive) for each conversion
+        self._rules = []
+        # The indexes of the conversions that are applied on their own
+        self._separate: list[int] = []
+        for index, (pattern, replacement, case_sensitive) in enumerate(rules):
+            try:
+                compiled = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+            except re.error as exc:
+                raise ValueError(f"Invalid regex conversion {pattern!r}: {exc}")
+
+            # Replacements are checked against their pattern now, rather than when a caption first matches it
+            try:
+                compiled.sub(replacement, "")
+            except (IndexError, re.error) as exc:
+                raise ValueError(
+                    f"Invalid replacement {replacement!r} of regex conversion {pattern!r}: {exc}"
+                )
+
+            isolated = _isolated_pattern(
+                pattern, bool(compiled.flags & re.VERBOSE), f"_conversion{index}_"
+            )
+            alternative = f"({isolated})" if case_sensitive else f"((?i:{isolated}))"
+            try:
+                re.compile(f"(?:)|{alternative}")
+            except re.error:
+                self._separate.append(index)
+
+            self._rules.append(
+                (
+                    compiled,
+                    replacement,
+                    "\\" in replacement,
+                    alternative,
+                    required_literal(compiled),
+                    not compiled.flags & re.IGNORECASE,
+                )
+            )
+
+        # (index, required literal, case sensitive) of each conversion that is combined with the others
+        self._literals = [
+            (index, rule[4], rule[5])
+            for index, rule in enumerate(self._rules)
+            if index not in self._separate
+        ]
+
+        # Matchers are shared between threads, so the combined patterns kept are only changed while holding the lock
+        self._combined_patterns: OrderedDict[tuple[int, ...], tuple] = OrderedDict()
+        self._combined_patterns_lock = threading.Lock()
+
+    def _combined(self, indexes: tuple[int, ...]) -> tuple[re.Pattern, dict[int, int]]:
+        """
+        Returns the combined pattern of the conversions at the indexes, along with the conversion each pattern's enclosing group belongs to.
+        Each pattern is wrapped in a group numbered after the groups of the patterns before it, so the group that closed last names the conversion that matched.
+        Every pattern is isolated from the others, so any set of the conversions that are not applied on their own combines.
+        """
+
+        with self._combined_patterns_lock:
+            combined = self._combined_patterns.get(indexes)
+            if combined is not None:
+                self._combined_patterns.move_to_end(indexes)
+                return combined
+
+        groups = {}
+        group = 1
+        for index in indexes:
+            groups[group] = index
+            group += self._rules[index][0].groups + 1
+
+        pattern = re.compile("|".join(self._rules[index][3] for index in indexes))
+
+        combined = (pattern, groups)
+        with self._combined_patterns_lock:
+            self._combined_patterns[indexes] = combined
+            if len(self._combined_patterns) > COMBINED_PATTERNS_SIZE:
+                self._combined_patterns.popitem(last=False)
+        return combined
+
+    def _candidates(self, caption_text: str) -> tuple[int, ...]:
+        # Lowercasing only finds every case-insensitive match in ASCII text, since some other characters, such as the Kelvin sign, match ASCII letters when case is ignored
+        lowered = caption_text.lower() if caption_text.isascii() else None
+        return tuple(
+            index
+            for index, literal, case_sensitive in self._literals
+            if literal is None
+            or (
+                literal in caption_text
+                if case_sensitive
+                else lowered is None or literal in lowered
+            )
+        )
+
+    def _replace_combined(self, caption_text: str) -> tuple[str, int]:
+        indexes = self._candidates(caption_text)
+        if not indexes:
+            return caption_text, 0
+
+        if len(indexes) == 1:
+            pattern, replacement = self._rules[indexes[0]][:2]
+            return pattern.subn(replacement, caption_text)
+
+        pattern, groups = self._combined(indexes)
+
+        def replacement(match: re.Match) -> str:
+            rule_pattern, rule_replacement, is_template = self._rules[
+                groups[match.lastindex]
+            ][:3]
+            if not is_template:
+                return rule_replacement
+
+            # The conversion's own pattern matches the same text from the same position, with its groups numbered the way the replacement expects
+            return rule_pattern.match(caption_text, match.start()).expand(
+                rule_replacement
+            )
+
+        return pattern.subn(replacement, caption_text)
+
+    def replace(self, caption_text: str) -> tuple[str, int]:
+        """
+        Returns the caption text with every match replaced, along with the number of replacements made.
+        """
+
+        caption_text, count = self._replace_combined(caption_text)
+        for index in self._separate:
+            pattern, replacement = self._rules[index][:2]
+            caption_text, separate_count = pattern.subn(replacement, caption_text)
+            count += separate_count
+        return caption_text, count
+
+    def matches(self, caption_text: str) -> list[int]:
+        """
+        Returns the index, in file order, of the conversion replaced at each of the matches that replace would make in the caption text.
+        """
+
+        indexes = self._candidates(caption_text)
+        if len(indexes) == 1:
+            matched = [indexes[0]] * len(
+                self._rules[indexes[0]][0].findall(caption_text)
+            )
+        elif indexes:
+            pattern, groups = self._combined(indexes)
+            matched = [
+                groups[match.lastindex] for match in pattern.finditer(caption_text)
+            ]
+        else:
+            matched = []
+
+        if self._separate:
+            caption_text = self._replace_combined(caption_text)[0]
+            for index in self._separate:
+                pattern, replacement = self._rules[index][:2]
+                caption_text, count = pattern.subn(replacement, caption_text)
+                matched.extend([index] * count)
+        return matched
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_regex_conversions(
+    rules: tuple[tuple[str, str, bool], ...],
+) -> RegexConversions:
+    """
+    Returns the regex conversions for the (pattern, replacement, case sensitive) rules, compiling them the first time they are seen.
+    Raises a ValueError if a pattern or the replacement of one is invalid.
+    """
+
+    return RegexConversions(rules)
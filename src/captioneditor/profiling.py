@@ -0,0 +1,444 @@
+import argparse
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from .batch import collect_captions_files
+from .conversions import CompiledConversions
+from .editor import Editor
+from .matching import ConversionMatcher, _keyword_processor
+from .patterns import RegexConversions
+
+if TYPE_CHECKING:
+    from flashtext2 import KeywordProcessor
+
+# Kinds of conversion rules, in the order their passes are applied to a caption
+KINDS = ("direct", "regex", "case_insensitive", "case_sensitive", "previous")
+
+
+@dataclass
+class RuleProfile:
+    """
+    One conversion rule, with the number of times it was replaced in the profiled captions and the matching time attributed to it in seconds.
+    """
+
+    kind: str
+    key: str
+    replacement: str
+    case_sensitive: bool
+    previous: str = ""
+    hits: int = 0
+    time: float = 0.0
+
+    def __str__(self) -> str:
+        rule = f"{self.kind} {self.key!r} -> {self.replacement!r}"
+        return f"{rule} after {self.previous!r}" if self.previous else rule
+
+
+@dataclass
+class PreviousProfile:
+    """
+    The processor of the rules keyed to one previous key, with the number of captions it processed, the replacements it made, and the time it took in seconds.
+    """
+
+    previous: str
+    rules: int
+    runs: int = 0
+    hits: int = 0
+    time: float = 0.0
+
+
+@dataclass
+class Conflict:
+    """
+    Rules that match the same text, so that only one of them can be replaced there. The rules are indexes into the profile's rules.
+    """
+
+    reason: str
+    rules: list[int]
+
+
+@dataclass
+class ConversionsProfile:
+    """
+    How the rules of a conversions file fared on a corpus of captions. Times are wall-clock seconds.
+    """
+
+    conversions_file: str
+    files: int = 0
+    captions: int = 0
+
+    # Time spent processing captions, which is attributed to rules, to previous processors, or to passes that replaced nothing
+    time: float = 0.0
+
+    rules: list[RuleProfile] = field(default_factory=list)
+    previous: list[PreviousProfile] = field(default_factory=list)
+
+    # Time spent in each kind of pass that replaced nothing, and in scanning captions for keys (as "scan")
+    unattributed: dict[str, float] = field(default_factory=dict)
+
+    conflicts: list[Conflict] = field(default_factory=list)
+
+    @property
+    def dead_rules(self) -> list[RuleProfile]:
+        return [rule for rule in self.rules if not rule.hits]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                **asdict(self),
+                "dead_rules": [
+                    index for index, rule in enumerate(self.rules) if not rule.hits
+                ],
+            },
+            indent=2,
+        )
+
+
+class _ProfiledRegexConversions:
+    """
+    Applies regex conversions like RegexConversions, recording the time each replacement takes and the rules it replaced with the profiling matcher.
+    """
+
+    def __init__(
+        self, regex_conversions: RegexConversions, matcher: "ProfilingMatcher"
+    ) -> None:
+        self._regex_conversions = regex_conversions
+        self._matcher = matcher
+
+    def replace(self, caption_text: str) -> tuple[str, int]:
+        start = perf_counter()
+        result = self._regex_conversions.replace(caption_text)
+        self._matcher._record(
+            "regex",
+            perf_counter() - start,
+            lambda: [
+                self._matcher._regex_rules[index]
+                for index in self._regex_conversions.matches(caption_text)
+            ],
+        )
+        return result
+
+
+class ProfilingMatcher(ConversionMatcher):
+    """
+    A matcher that processes captions exactly as ConversionMatcher does, while counting how many times each rule is replaced and timing every pass.
+    The time of a pass over a caption is split evenly between the rules it replaced. Passes that replaced nothing, and scanning captions for keys, are timed by kind.
+    The rules a pass replaced are found after it is timed, with processors that name the rule of each key, so finding them is not counted.
+    Unlike ConversionMatcher, it keeps counts as it processes captions, so it must only be used by one thread.
+    """
+
+    def __init__(self, conversions: CompiledConversions) -> None:
+        super().__init__(conversions)
+
+        self.rules: list[RuleProfile] = []
+        self.previous: dict[str, PreviousProfile] = {}
+        self.unattributed = dict.fromkeys((*KINDS, "scan"), 0.0)
+        self.captions = 0
+        self.time = 0.0
+
+        # Time taken by the passes over the caption being processed, and time spent finding the rules they replaced, which is left out of the caption's time
+        self._pass_time = 0.0
+        self._overhead = 0.0
+
+        self._direct_rules = {
+            key: self._add_rule("direct", key, replacement, True)
+            for key, replacement in conversions.direct.items()
+        }
+        self._regex_rules = [
+            self._add_rule("regex", pattern, replacement, case_sensitive)
+            for pattern, replacement, case_sensitive in conversions.regex
+        ]
+        if self._regex_conversions is not None:
+            self._regex_conversions = _ProfiledRegexConversions(
+                self._regex_conversions, self
+            )
+
+        case_insensitive_rules = [
+            self._add_rule("case_insensitive", key, replacement, False)
+            for key, replacement in conversions.case_insensitive
+        ]
+        case_sensitive_rules = [
+            self._add_rule("case_sensitive", key, replacement, True)
+            for key, replacement in conversions.case_sensitive
+        ]
+
+        # Processors that find the rules replaced by each replacing processor, keyed by the id of the replacing processor, along with its previous key if it has one
+        self._rule_finders: dict[int, tuple["KeywordProcessor", str]] = {}
+        if self._case_insensitive_processor is not None:
+            self._rule_finders[id(self._case_insensitive_processor)] = (
+                self._rule_finder(case_insensitive_rules, False),
+                "",
+            )
+        if self._case_sensitive_processor is not None:
+            self._rule_finders[id(self._case_sensitive_processor)] = (
+                self._rule_finder(case_sensitive_rules, True),
+                "",
+            )
+
+        # Rules keyed to a previous key, by previous key. Their finders are built along with their processors, the first time the previous key is matched.
+        self._previous_rules: dict[str, list[int]] = {}
+        for previous, previous_conversions in conversions.previous.items():
+            self._previous_rules[previous] = [
+                self._add_rule("previous", key, replacement, True, previous)
+                for key, replacement in previous_conversions
+            ]
+            self.previous[previous] = PreviousProfile(
+                previous, len(previous_conversions)
+            )
+
+    def _add_rule(
+        self,
+        kind: str,
+        key: str,
+        replacement: str,
+        case_sensitive: bool,
+        previous: str = "",
+    ) -> int:
+        self.rules.append(RuleProfile(kind, key, replacement, case_sensitive, previous))
+        return len(self.rules) - 1
+
+    def _rule_finder(
+        self, rules: list[int], case_sensitive: bool
+    ) -> "KeywordProcessor":
+        # Keys added later replace earlier ones with the same key, just as they do in the replacing processor
+        finder = _keyword_processor(case_sensitive=case_sensitive)
+        for index in rules:
+            finder.add_keyword(self.rules[index].key, str(index))
+        return finder
+
+    def _record(
+        self, kind: str, elapsed: float, find_rules: Callable[[], list[int]]
+    ) -> list[int]:
+        """
+        Attributes the time of a pass to the rules it replaced, or to its kind if it replaced nothing. Returns the rules it replaced.
+        """
+
+        start = perf_counter()
+        self._pass_time += elapsed
+        rules = find_rules()
+        if rules:
+            for index in rules:
+                self.rules[index].hits += 1
+                self.rules[index].time += elapsed / len(rules)
+        else:
+            self.unattributed[kind] += elapsed
+        self._overhead += perf_counter() - start
+        return rules
+
+    def _previous_captions_processor(self, previous: str) -> "KeywordProcessor":
+        processor = super()._previous_captions_processor(previous)
+        if id(processor) not in self._rule_finders:
+            self._rule_finders[id(processor)] = (
+                self._rule_finder(self._previous_rules[previous], True),
+                previous,
+            )
+        return processor
+
+    def _replace(
+        self,
+        processor: "KeywordProcessor",
+        caption_text: str,
+        replacements: dict[str, int] | None,
+        kind: str,
+    ) -> str:
+        start = perf_counter()
+        new_text = ConversionMatcher._replace(
+            processor, caption_text, replacements, kind
+        )
+        elapsed = perf_counter() - start
+
+        finder, previous = self._rule_finders[id(processor)]
+        rules = self._record(
+            kind,
+            elapsed,
+            lambda: [int(index) for index in finder.extract_keywords(caption_text)],
+        )
+        if previous:
+            previous_profile = self.previous[previous]
+            previous_profile.runs += 1
+            previous_profile.hits += len(rules)
+            previous_profile.time += elapsed
+
+        return new_text
+
+    def process(
+        self,
+        caption_text: str,
+        previous_caption_keys: list[str],
+        replacements: dict[str, int] | None = None,
+    ) -> tuple[str, list[str]]:
+        self._pass_time = 0.0
+        self._overhead = 0.0
+        start = perf_counter()
+        result = super().process(caption_text, previous_caption_keys, replacements)
+        elapsed = perf_counter() - start - self._overhead
+
+        self.captions += 1
+        self.time += elapsed
+        direct = self._direct_rules.get(caption_text)
+        if direct is not None:
+            self.rules[direct].hits += 1
+            self.rules[direct].time += elapsed
+        else:
+            # Whatever the passes did not take was spent scanning the caption for keys
+            self.unattributed["scan"] += elapsed - self._pass_time
+        return result
+
+
+def find_conflicts(rules: list[RuleProfile]) -> list[Conflict]:
+    """
+    Finds rules that match the same text: rules of the same kind with the same key, of which only one is ever replaced, and keys that are matched both with and
+    without case sensitivity, of which the case-insensitive rule is replaced first.
+    """
+
+    conflicts = []
+    same_key: dict[tuple, list[int]] = {}
+    case_sensitive_keys: dict[str, list[int]] = {}
+    for index, rule in enumerate(rules):
+        key = rule.key if rule.case_sensitive else rule.key.lower()
+        same_key.setdefault(
+            (rule.kind, rule.previous, rule.case_sensitive, key), []
+        ).append(index)
+        if rule.kind in ("case_sensitive", "case_insensitive"):
+            case_sensitive_keys.setdefault(rule.key.lower(), []).append(index)
+
+    for (kind, *_), indexes in same_key.items():
+        if len(indexes) > 1:
+            # The first regex rule matching at a position is replaced, while a later keyword replaces an earlier one with the same key
+            winner = "first" if kind == "regex" else "last"
+            conflicts.append(
+                Conflict(f"same key, only the {winner} is replaced", indexes)
+            )
+
+    for indexes in case_sensitive_keys.values():
+        if len({rules[index].kind for index in indexes}) > 1:
+            conflicts.append(
+                Conflict("same key with and without case sensitivity", indexes)
+            )
+
+    return conflicts
+
+
+def profile_conversions(
+    sources: Iterable[str | Path],
+    conversions_file: str | Path = "conversions.json",
+    use_conversions_cache: bool = True,
+) -> ConversionsProfile:
+    """
+    Runs every caption of the captions files found in the given files, directories, and glob patterns through the conversions, as Editor._process_caption_contents
+    does when editing them, and returns how often each rule was replaced and the time spent on it. Captions are processed whatever their times, without the caption
+    cache, so every caption is processed. The keys matched in the previous caption are reset at the start of each file.
+    """
+
+    editor = Editor(
+        conversions_file=conversions_file,
+        use_conversions_cache=use_conversions_cache,
+        caption_cache_size=0,
+    )
+    matcher = ProfilingMatcher(editor._conversions)
+    editor._matcher = matcher
+    # A cutoff in the conversions file would stop sorted WebVTT and SRT files from being read past it
+    editor.update_cutoff(-1)
+    editor.update_time_window()
+
+    profile = ConversionsProfile(str(conversions_file))
+    for captions_file in collect_captions_files(sources):
+        editor.update_captions_path(captions_file)
+        cues = editor._read_captions_cues()
+        editor._previous_caption_keys = []
+        for index in range(len(cues)):
+            editor._process_caption_contents(cues.text(index))
+        profile.files += 1
+
+    profile.captions = matcher.captions
+    profile.time = matcher.time
+    profile.rules = matcher.rules
+    profile.previous = list(matcher.previous.values())
+    profile.unattributed = matcher.unattributed
+    profile.conflicts = find_conflicts(matcher.rules)
+    return profile
+
+
+def print_profile(profile: ConversionsProfile, top: int = 20) -> None:
+    print(
+        f"Processed {profile.captions} captions from {profile.files} files with {len(profile.rules)} rules in {profile.time:.3f}s"
+    )
+
+    print(f"\n{'kind':>16} {'rules':>8} {'fired':>8} {'hits':>10} {'time s':>9}")
+    for kind in KINDS:
+        rules = [rule for rule in profile.rules if rule.kind == kind]
+        time = sum(rule.time for rule in rules) + profile.unattributed.get(kind, 0.0)
+        print(
+            f"{kind:>16} {len(rules):>8} {sum(bool(rule.hits) for rule in rules):>8} "
+            f"{sum(rule.hits for rule in rules):>10} {time:>9.3f}"
+        )
+    print(
+        f"{'scan':>16} {'':>8} {'':>8} {'':>10} {profile.unattributed.get('scan', 0.0):>9.3f}"
+    )
+
+    rules = sorted(profile.rules, key=lambda rule: (-rule.time, -rule.hits))
+    print(f"\nRules by time:\n{'hits':>10} {'time s':>9}  rule")
+    for rule in rules[:top]:
+        if rule.hits:
+            print(f"{rule.hits:>10} {rule.time:>9.3f}  {rule}")
+
+    previous = sorted(profile.previous, key=lambda previous: -previous.time)
+    print(
+        f"\nPrevious processors by time:\n{'rules':>8} {'runs':>10} {'hits':>10} {'time s':>9}  previous"
+    )
+    for processor in previous[:top]:
+        print(
+            f"{processor.rules:>8} {processor.runs:>10} {processor.hits:>10} {processor.time:>9.3f}  {processor.previous!r}"
+        )
+
+    dead_rules = profile.dead_rules
+    print(f"\nRules that never fired: {len(dead_rules)}")
+    for rule in dead_rules:
+        print(f"  {rule}")
+
+    print(f"\nConflicting rules: {len(profile.conflicts)}")
+    for conflict in profile.conflicts:
+        print(f"  {conflict.reason}:")
+        for index in conflict.rules:
+            print(f"    {profile.rules[index]}")
+
+
+def main(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="edit-captions profile-conversions",
+        description="Run a corpus of captions through the conversions and report how often each rule and previous processor is replaced and the time spent on it, "
+        "along with the rules that never fire and the rules that conflict, to find rules that can be pruned.",
+    )
+    parser.add_argument(
+        "caption_filenames",
+        nargs="+",
+        help="the captions files, directories, or glob patterns of files to profile the conversions with",
+    )
+    parser.add_argument(
+        "-c",
+        "-conversions",
+        default="conversions.json",
+        help="the JSON file containing the conversion rules, or a conversions store built from one",
+    )
+    parser.add_argument(
+        "-top",
+        type=int,
+        default=20,
+        help="the number of rules and previous processors listed by time",
+    )
+    parser.add_argument(
+        "-o",
+        "-output",
+        help="a file to write the whole profile to as JSON",
+    )
+    args = parser.parse_args(args)
+
+    profile = profile_conversions(args.caption_filenames, args.c)
+    if args.o:
+        Path(args.o).write_text(profile.to_json(), encoding="utf8")
+    print_profile(profile, args.top)
+
+    return args
@@ -0,0 +1,329 @@
+import argparse
+import http.client
+import hmac
+import json
+import os
+import secrets
+import socketserver
+import sys
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+
+from . import conversions
+from .client import TOKEN_HEADER, UnixHTTPConnection, request, socket_path, token_path
+from .conversions import load_conversions, loaded_conversions_files
+from .editor import COMMANDS, argument_parser
+from .editor import main as editor_main
+from .matching import shared_matcher
+
+
+def _unsupported_job(args: list[str]) -> str | None:
+    """
+    Returns why a job with the given arguments cannot run on the server, or None if it can. Raises SystemExit if the arguments are invalid, as argparse does.
+    Jobs are answered once they finish, and the standard input of the server is not the client's, so jobs cannot watch files or stream captions from stdin.
+    """
+
+    if args[0] == "serve":
+        return "A job cannot start another server"
+    if args[0] in COMMANDS:
+        return None
+
+    parsed = argument_parser().parse_args(args)
+    if parsed.watch:
+        return "A job cannot watch files"
+    if "-" in [parsed.caption_filename] + parsed.more_caption_filenames:
+        return "A job cannot read captions from stdin"
+    return None
+
+
+class JobRunner:
+    """
+    Runs 'edit-captions' jobs inside the server process, where compiled conversions stay loaded between jobs, and reloads conversions files when they change.
+    Jobs run one at a time, whatever files they write: a job sent while another is running waits for it to finish, so a server gives no parallelism across clients.
+    """
+
+    def __init__(self, log=None) -> None:
+        # Jobs change the working directory and capture the standard streams, which are shared by the whole process, so they run one at a time
+        self._job_lock = threading.Lock()
+        self.jobs = 0
+        self.log = log or sys.stderr
+
+    def warm(self, conversions_file: Path | str) -> None:
+        """
+        Loads a conversions file and builds its matcher, unless they are already loaded and the file has not changed.
+        """
+
+        shared_matcher(load_conversions(conversions_file))
+
+    def reload_changed(self) -> None:
+        """
+        Reloads every loaded conversions file that has changed, so that the next job using it does not wait for it to be compiled.
+        """
+
+        for conversions_file in loaded_conversions_files():
+            try:
+                self.warm(conversions_file)
+            except (OSError, ValueError) as exc:
+                # A file that was removed, or saved while invalid, is reported when a job uses it
+                print(f"Could not reload {conversions_file}: {exc}", file=self.log)
+
+    def run_job(self, args: list[str], cwd: str) -> dict:
+        """
+        Runs 'edit-captions' with the given arguments in the given working directory and returns its output, errors, and exit code.
+        """
+
+        if not args:
+            return {"output": "", "errors": "No arguments given\n", "exit_code": 2}
+
+        output = StringIO()
+        errors = StringIO()
+        exit_code = 0
+        with self._job_lock:
+            self.jobs += 1
+            original_cwd = os.getcwd()
+            try:
+                os.chdir(cwd)
+                with redirect_stdout(output), redirect_stderr(errors):
+                    unsupported = _unsupported_job(args)
+                    if unsupported is None:
+                        editor_main(args)
+                    else:
+                        errors.write(f"{unsupported}\n")
+                        exit_code = 2
+            except SystemExit as exc:
+                # Raised by argparse for invalid arguments or --help
+                exit_code = exc.code if isinstance(exc.code, int) else 1
+            except Exception as exc:
+                errors.write(f"{type(exc).__name__}: {exc}\n")
+                exit_code = 1
+            finally:
+                os.chdir(original_cwd)
+
+        return {
+            "output": output.getvalue(),
+            "errors": errors.getvalue(),
+            "exit_code": exit_code,
+        }
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    """
+    Handles 'POST /jobs' with a JSON body holding the job's 'args' and 'cwd', and 'GET /status'.
+    Requests to a localhost port must carry the server's token, since any user on the machine, or a web page in a browser, can send requests to the port.
+    """
+
+    server_version = "edit-captions"
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            print(format % args, file=self.server.runner.log)
+
+    def _respond(self, status: int, body: dict) -> None:
+        contents = json.dumps(body).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def _authorized(self) -> bool:
+        """
+        Returns whether the request carries the server's token, if it has one, and responds with an error if it does not.
+        """
+
+        token = self.server.token
+        if token is None or hmac.compare_digest(
+            self.headers.get(TOKEN_HEADER, "").encode("utf8"), token.encode("utf8")
+        ):
+            return True
+
+        self._respond(403, {"error": "Invalid token"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self.path != "/status":
+            self._respond(404, {"error": "Not found"})
+            return
+
+        self._respond(
+            200,
+            {
+                "pid": os.getpid(),
+                "jobs": self.server.runner.jobs,
+                "conversions": [str(path) for path in loaded_conversions_files()],
+            },
+        )
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        if self.path != "/jobs":
+            self._respond(404, {"error": "Not found"})
+            return
+
+        # Browsers only send JSON to another origin after asking it, which the server never allows
+        if self.headers.get_content_type() != "application/json":
+            self._respond(415, {"error": "Jobs must be sent as JSON"})
+            return
+
+        try:
+            job = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            args = [str(arg) for arg in job["args"]]
+            cwd = str(job.get("cwd") or os.getcwd())
+        except (TypeError, ValueError, KeyError):
+            self._respond(400, {"error": "Invalid job"})
+            return
+
+        self._respond(200, self.server.runner.run_job(args, cwd))
+
+
+class UnixJobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TCPJobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def server_close(self) -> None:
+        super().server_close()
+        token_path(self.server_address[1]).unlink(missing_ok=True)
+
+
+def _write_token(path: Path) -> str:
+    """
+    Writes a new random token to a file at the path that only the user running the server can read, and returns it.
+    """
+
+    token = secrets.token_urlsafe(32)
+    path.unlink(missing_ok=True)
+    # The file is created with its permissions, so that no one else can open it before they are set
+    with os.fdopen(
+        os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w"
+    ) as file:
+        file.write(token)
+    return token
+
+
+def _reload_periodically(
+    runner: JobRunner, interval: float, stopped: threading.Event
+) -> None:
+    while not stopped.wait(interval):
+        runner.reload_changed()
+
+
+def _server_running(path: Path) -> bool:
+    try:
+        request("GET", "/status", connection=UnixHTTPConnection(path, timeout=1))
+    except (OSError, http.client.HTTPException, ValueError):
+        return False
+    return True
+
+
+def create_server(
+    path: Path | str | None = None, port: int | None = None, verbose: bool = False
+) -> UnixJobServer | TCPJobServer:
+    """
+    Creates a job server listening on localhost at the given port if one is given, or on the Unix socket at the given path, or the default path.
+    Only the user running the server can connect to its Unix socket, and only clients that can read the server's token file (see token_path) are answered on a port.
+    """
+
+    token = None
+    if port is not None:
+        server = TCPJobServer(("127.0.0.1", port), JobHandler)
+        try:
+            token = _write_token(token_path(server.server_address[1]))
+        except OSError:
+            server.socket.close()
+            raise
+    else:
+        path = Path(path or socket_path())
+        if path.exists():
+            if _server_running(path):
+                raise OSError(f"A server is already listening on {path}")
+            path.unlink()
+
+        # Restrict the socket to its owner from the moment it is created
+        umask = os.umask(0o177)
+        try:
+            server = UnixJobServer(str(path), JobHandler)
+        finally:
+            os.umask(umask)
+
+    server.runner = JobRunner()
+    server.token = token
+    server.verbose = verbose
+    return server
+
+
+def main(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="edit-captions serve",
+        description="Keep conversions compiled in a resident process and run 'edit-captions' jobs sent by 'edit-captions-client' over a Unix socket or localhost HTTP. Jobs run one at a time.",
+    )
+    parser.add_argument(
+        "-socket",
+        help="the Unix socket to listen on. Default is $CAPTIONEDITOR_SOCKET, or captioneditor.sock in $XDG_RUNTIME_DIR or the temporary directory.",
+        default=None,
+    )
+    parser.add_argument(
+        "-port",
+        type=int,
+        help="listen on this localhost port instead of a Unix socket. Clients find it through $CAPTIONEDITOR_PORT, and read the token they must send from a file next to the default socket.",
+        default=None,
+    )
+    parser.add_argument(
+        "-c",
+        "-conversions",
+        nargs="*",
+        default=[],
+        help="conversions files to compile before the first job",
+    )
+    parser.add_argument(
+        "-reload_interval",
+        type=float,
+        default=1.0,
+        help="how often (in seconds) loaded conversions files are checked for changes and recompiled",
+    )
+    parser.add_argument("-v", "-verbose", action="store_true", help="log every request")
+    args = parser.parse_args(args)
+
+    # Conversions stay loaded between jobs and are only compiled again when their file changes
+    conversions.keep_loaded_conversions = True
+
+    server = create_server(args.socket, args.port, args.v)
+    for conversions_file in args.c:
+        server.runner.warm(conversions_file)
+
+    stopped = threading.Event()
+    threading.Thread(
+        target=_reload_periodically,
+        args=(server.runner, args.reload_interval, stopped),
+        daemon=True,
+    ).start()
+
+    address = (
+        f"http://127.0.0.1:{server.server_address[1]} (token in {token_path(server.server_address[1])})"
+        if args.port is not None
+        else server.server_address
+    )
+    print(f"Serving on {address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopped.set()
+        server.server_close()
+        if args.port is None:
+            Path(server.server_address).unlink(missing_ok=True)
+
+    return args
@@ -0,0 +1,80 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+# The resource module is only available on Unix. Without it, peak memory is not reported.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_memory() -> int | None:
+    """
+    Returns the peak resident memory of the current process in bytes, or None if it cannot be measured on this platform.
+    """
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other platforms report kilobytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class EditStats:
+    """
+    Statistics about a single edit of a captions file. Times are wall-clock seconds and sizes are bytes.
+    """
+
+    captions_read: int = 0
+    captions_written: int = 0
+
+    # Captions that were not written because they started before zero after the offset, before the window start, or after the cutoff or window end
+    dropped_by_offset: int = 0
+    dropped_by_window: int = 0
+    dropped_by_cutoff: int = 0
+
+    # Replacements made by each kind of conversion
+    replacements: dict[str, int] = field(default_factory=dict)
+
+    # Size of the captions read and of the captions written, keyed by file extension
+    bytes_in: dict[str, int] = field(default_factory=dict)
+    bytes_out: dict[str, int] = field(default_factory=dict)
+
+    # Time spent in each stage of the edit, one after another, including the whole of rendering and writing every filetype as the 'write' stage
+    stage_times: dict[str, float] = field(default_factory=dict)
+
+    # Time each filetype took to render and write, keyed by file extension. Filetypes are rendered at the same time, so these overlap and add up to more than the 'write' stage
+    write_times: dict[str, float] = field(default_factory=dict)
+
+    # Peak resident memory of the whole process when the edit finished
+    peak_memory: int | None = None
+
+    # Whether the outputs were copied from the output cache instead of being edited again, in which case the other statistics are those of the cached edit
+    output_cache_hit: bool = False
+
+    @contextmanager
+    def time_stage(self, stage: str) -> Iterator[None]:
+        """
+        Adds the wall time spent inside the block to the given stage.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + seconds
+
+    def add_write_time(self, extension: str, seconds: float) -> None:
+        self.write_times[extension] = self.write_times.get(extension, 0.0) + seconds
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
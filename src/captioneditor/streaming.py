@@ -0,0 +1,160 @@
+import json
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from .timestamps import parse_timestamp, format_timestamp
+from .writers import encode_vtt_text
+
+STREAMING_FILE_TYPES = {".vtt", ".srt"}
+
+HEADERS = {
+    ".vtt": "WEBVTT\n",
+    ".srt": "",
+}
+
+
+def _parse_block(block: list[str]) -> tuple[int, int, str] | None:
+    """
+    Parses the lines of a single block into a (start, end, text) cue, with times in milliseconds.
+    Blocks without a timing line, such as the WebVTT header or NOTE blocks, return None.
+    """
+
+    for index, line in enumerate(block):
+        if "-->" in line:
+            start, _, rest = line.partition("-->")
+            # Anything after the end timestamp is WebVTT cue settings, which are not carried over
+            end = rest.split()[0]
+            text = "\n".join(text_line.strip() for text_line in block[index + 1 :])
+            return parse_timestamp(start), parse_timestamp(end), text
+
+    return None
+
+
+def read_cues(lines: Iterable[str]) -> Iterator[tuple[int, int, str]]:
+    """
+    Lazily reads (start, end, text) cues from the lines of a WebVTT or SRT file, holding only one block of lines at a time.
+    Cue markup is passed through unchanged.
+    """
+
+    block = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.strip():
+            block.append(line)
+        elif block:
+            cue = _parse_block(block)
+            if cue:
+                yield cue
+            block = []
+
+    if block:
+        cue = _parse_block(block)
+        if cue:
+            yield cue
+
+
+def format_cue(
+    index: int,
+    start: int,
+    end: int,
+    text: str,
+    captions_type: str,
+    source_type: str = ".vtt",
+) -> str:
+    """
+    Formats the cue at the given zero-based index in the same layout as the pycaption writers.
+    WebVTT text is escaped with encode_vtt_text, keeping the markup of text read from WebVTT, so that it is written the same way edit_captions writes it.
+    """
+
+    if captions_type == ".srt":
+        separator = "\n" if index else ""
+        return f"{separator}{index + 1}\n{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n{text}\n"
+
+    text = encode_vtt_text(text, markup=source_type == ".vtt")
+    return f"\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n"
+
+
+def scan_cues(file: BinaryIO) -> Iterator[tuple[int, int]]:
+    """
+    Lazily yields the start time (in milliseconds) and byte offset of each cue block in a WebVTT or SRT file opened in binary mode.
+    Only the timing lines are decoded.
+    """
+
+    offset = 0
+    block_offset = None
+    found_timing = False
+    for line in file:
+        if line.strip():
+            if block_offset is None:
+                block_offset = offset
+            if not found_timing and b"-->" in line:
+                found_timing = True
+                yield parse_timestamp(
+                    line.partition(b"-->")[0].decode("utf8")
+                ), block_offset
+        else:
+            block_offset = None
+            found_timing = False
+        offset += len(line)
+
+
+def find_window(
+    cues: Iterable[tuple[int, int]], first: int, last: int | None
+) -> tuple[int | None, int | None]:
+    """
+    Finds the byte offsets of the first cue starting at or after first, and of the first cue starting after last, in cues sorted by start time.
+    Stops consuming cues as soon as the window is passed. Either offset is None if there is no such cue.
+    """
+
+    begin = None
+    for start, offset in cues:
+        if last is not None and start > last:
+            return begin, offset
+        if begin is None and start >= first:
+            begin = offset
+
+    return begin, None
+
+
+def cue_index_path(captions_file: Path) -> Path:
+    """
+    Returns the path of the sidecar cue index for a captions file.
+    """
+
+    return captions_file.with_name(captions_file.name + ".idx")
+
+
+def load_cue_index(captions_file: Path) -> list[tuple[int, int]]:
+    """
+    Loads the (start, byte offset) of every cue in a WebVTT or SRT file from its sidecar index.
+    The index is built, and saved if possible, when it is missing or the captions file has changed since it was built.
+    """
+
+    stat = captions_file.stat()
+    index_path = cue_index_path(captions_file)
+
+    try:
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        if index["size"] == stat.st_size and index["mtime_ns"] == stat.st_mtime_ns:
+            return list(zip(index["starts"], index["offsets"]))
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with open(captions_file, "rb") as file:
+        cues = list(scan_cues(file))
+
+    index = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "starts": [start for start, _ in cues],
+        "offsets": [offset for _, offset in cues],
+    }
+    try:
+        with open(index_path, "w") as index_file:
+            json.dump(index, index_file)
+    except OSError:
+        # The index is only an optimization, so a read-only directory is not an error
+        pass
+
+    return cues
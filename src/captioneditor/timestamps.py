@@ -0,0 +1,141 @@
+import sys
+from array import array
+
+# NumPy is optional. Without it, offsets and cutoffs are applied with plain integer arithmetic.
+# Importing it takes about as long as offsetting a quarter of a million cues without it, so it is only imported for a column at least IMPORT_NUMPY_MIN_CUES long,
+# and once imported, by this module or any other, it is used for columns at least VECTORISE_MIN_CUES long.
+IMPORT_NUMPY_MIN_CUES = 250_000
+VECTORISE_MIN_CUES = 1000
+
+# NumPy once it has been imported, None if it is not installed, or NOT_IMPORTED before either is known
+NOT_IMPORTED = object()
+numpy = NOT_IMPORTED
+
+# Zero-padded strings for every minute/second and millisecond value so that formatting is a few lookups
+TWO_DIGITS = [f"{value:02d}" for value in range(100)]
+THREE_DIGITS = [f"{value:03d}" for value in range(1000)]
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """
+    Converts a WebVTT or SRT timestamp, with or without hours, to an integer number of milliseconds.
+    """
+
+    clock, _, milliseconds = timestamp.strip().replace(",", ".").rpartition(".")
+    fields = clock.split(":")
+    if len(milliseconds) != 3 or not 2 <= len(fields) <= 3:
+        raise ValueError(f"Invalid timestamp: {timestamp}")
+
+    try:
+        seconds = 0
+        for field in fields:
+            seconds = seconds * 60 + int(field)
+        return seconds * 1000 + int(milliseconds)
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {timestamp}") from None
+
+
+def _join_timestamp(
+    hours: int, minutes: int, seconds: int, milliseconds: int, separator: str
+) -> str:
+    hours_str = TWO_DIGITS[hours] if hours < 100 else str(hours)
+    return f"{hours_str}:{TWO_DIGITS[minutes]}:{TWO_DIGITS[seconds]}{separator}{THREE_DIGITS[milliseconds]}"
+
+
+def format_timestamp(milliseconds: int, separator: str = ".") -> str:
+    """
+    Converts a non-negative integer number of milliseconds to a 'HH:MM:SS.mmm' timestamp. SRT timestamps use ',' as the separator.
+    """
+
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return _join_timestamp(hours, minutes, seconds, milliseconds, separator)
+
+
+def offset_and_cut_one(
+    start: int,
+    end: int,
+    offset: int,
+    cutoff: int | float,
+    window_start: int | float = 0,
+) -> tuple[int, int] | None:
+    """
+    Applies the offset (in milliseconds), cutoff (in seconds), and window start (in seconds) to a single cue's start and end milliseconds.
+    Returns None if the cue starts before zero, before the window start, or after the cutoff, and so should not be included.
+    """
+
+    start += offset
+    if start < 0 or start < window_start * 1000:
+        return None
+    if cutoff >= 0 and start > cutoff * 1000:
+        return None
+
+    return start, end + offset
+
+
+def load_numpy():
+    """
+    Imports NumPy if it has not been imported yet, and returns it, or None if it is not installed.
+    """
+
+    global numpy
+    if numpy is NOT_IMPORTED:
+        try:
+            import numpy as imported
+        except ImportError:
+            imported = None
+        numpy = imported
+    return numpy
+
+
+def _vectoriser(cues: int):
+    """
+    Returns NumPy if a column of this many cues is worth offsetting with it, or None.
+    """
+
+    if cues < VECTORISE_MIN_CUES:
+        return None
+    if (
+        numpy is NOT_IMPORTED
+        and cues < IMPORT_NUMPY_MIN_CUES
+        and "numpy" not in sys.modules
+    ):
+        return None
+    return load_numpy()
+
+
+def offset_and_cut_columns(
+    starts: array,
+    ends: array,
+    offset: int,
+    cutoff: int | float,
+    window_start: int | float = 0,
+) -> tuple[array, array, bytes]:
+    """
+    Applies the offset (in milliseconds), cutoff (in seconds), and window start (in seconds) to arrays of 64-bit start and end milliseconds in one batched operation, without creating an object for each cue.
+    Returns the new starts and ends as arrays, and one byte for each cue that is 1 if it should be included and 0 otherwise, following the same rules as offset_and_cut_one.
+    """
+
+    numpy = _vectoriser(len(starts))
+    if numpy is not None:
+        start_array = numpy.frombuffer(starts, dtype=numpy.int64) + offset
+        end_array = numpy.frombuffer(ends, dtype=numpy.int64) + offset
+        keep = start_array >= max(0, window_start * 1000)
+        if cutoff >= 0:
+            keep &= start_array <= cutoff * 1000
+        return (
+            array("q", start_array.tobytes()),
+            array("q", end_array.tobytes()),
+            keep.tobytes(),
+        )
+
+    new_starts = array("q", [start + offset for start in starts])
+    new_ends = array("q", [end + offset for end in ends])
+    first = max(0, window_start * 1000)
+    cutoff_ms = cutoff * 1000 if cutoff >= 0 else None
+    keep = bytes(
+        start >= first and (cutoff_ms is None or start <= cutoff_ms)
+        for start in new_starts
+    )
+    return new_starts, new_ends, keep
@@ -0,0 +1,260 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from .conversions import CompiledConversions
+from .cues import CueTable
+from .editor import Editor
+from .stats import EditStats
+
+WORD = re.compile(r"\w+")
+
+
+@dataclass
+class EditedCaption:
+    """
+    The conversions applied to one caption: its text, the keys matched in the caption before it, and the resulting text and keys.
+    """
+
+    text: str
+    keys_in: list[str]
+    new_text: str
+    keys_out: list[str]
+
+
+def _words(key: str) -> list[str]:
+    # Keys without any word characters, such as "♪", are looked for whole
+    return WORD.findall(key.lower()) or [key.lower()]
+
+
+def _contains_any(text: str, words: set[str]) -> bool:
+    if not words:
+        return False
+    text = text.lower()
+    return any(word in text for word in words)
+
+
+def _conversion_rules(conversions: CompiledConversions) -> set[tuple[str, ...]]:
+    return (
+        {
+            ("case_sensitive", key, replacement)
+            for key, replacement in conversions.case_sensitive
+        }
+        | {
+            ("case_insensitive", key, replacement)
+            for key, replacement in conversions.case_insensitive
+        }
+        | {
+            ("previous", previous, key, replacement)
+            for previous, previous_conversions in conversions.previous.items()
+            for key, replacement in previous_conversions
+        }
+    )
+
+
+def changed_conversions(
+    old: CompiledConversions, new: CompiledConversions
+) -> tuple[set[str], set[str]]:
+    """
+    Compares two versions of a conversions file and returns the words a caption must contain for its conversions to have changed, along with the direct conversions that changed.
+    The words are those of every key and previous key of a conversion that was added, removed, or changed, and of the keys of any conversion whose replacement
+    could produce one of them, so that a caption that contains none of the words, in any case, is converted the same way by both versions.
+    If the regex conversions changed, the words include the empty word, so that every caption is processed again.
+    """
+
+    changed_rules = _conversion_rules(old) ^ _conversion_rules(new)
+    words = set()
+    for rule in changed_rules:
+        for key in rule[1:-1]:
+            words.update(_words(key))
+
+    # A replacement made by an unchanged conversion can create text that a changed conversion matches
+    replacements = [
+        (rule[-2], rule[-1].lower())
+        for rule in _conversion_rules(old) | _conversion_rules(new)
+    ]
+    while True:
+        new_words = {
+            word
+            for key, replacement in replacements
+            if any(changed_word in replacement for changed_word in words)
+            for word in _words(key)
+        } - words
+        if not new_words:
+            break
+        words |= new_words
+
+    # Regex conversions are applied first and can match any caption. If they changed, or one of their replacements could produce a changed word,
+    # every caption is processed again, which the empty word, found in every caption, stands for.
+    if old.regex != new.regex or (
+        words
+        and any(
+            "\\" in replacement or any(word in replacement.lower() for word in words)
+            for _, replacement, _ in new.regex
+        )
+    ):
+        words.add("")
+
+    direct = {
+        key
+        for key in old.direct.keys() | new.direct.keys()
+        if old.direct.get(key) != new.direct.get(key)
+    }
+    return words, direct
+
+
+class IncrementalEdit:
+    """
+    Edits one captions file again and again as it or its conversions change, keeping the conversions applied to every caption between edits.
+    Only the captions that changed, the captions that contain a word of a changed conversion, and the captions after them whose previous caption now matches
+    different keys are processed again. The files written are always the same as the ones Editor.edit_captions writes.
+    """
+
+    def __init__(self, editor: Editor) -> None:
+        self.editor = editor
+        self._cues = CueTable()
+
+        # The conversions applied to each caption that was written, in order
+        self.edited: list[EditedCaption] = []
+
+    def update(self, editor: Editor | None = None, reread: bool = True) -> int:
+        """
+        Writes the destination files again after the captions file changed, if reread is True, or the conversions changed, if a new editor built with them is given.
+        Returns the number of captions that were processed again. Raises a CaptionReadError if the captions file cannot be read, and keeps the captions from before.
+        """
+
+        changed_words: set[str] = set()
+        changed_direct: set[str] = set()
+        if editor is not None:
+            changed_words, changed_direct = changed_conversions(
+                self.editor._conversions, editor._conversions
+            )
+            self.editor = editor
+        editor = self.editor
+
+        if reread:
+            self._cues = editor._read_captions_cues()
+
+        texts = [text for _, _, text in self._cues]
+        starts, ends, keep = self._cues.offset_and_cut(
+            editor.timing_offset, editor._effective_cutoff(), editor._window_start
+        )
+        kept = [index for index, kept in enumerate(keep) if kept]
+
+        # Each kept caption is matched with the caption it was before the change, if it is unchanged
+        matches = SequenceMatcher(
+            None,
+            [edited.text for edited in self.edited],
+            [texts[index] for index in kept],
+            autojunk=False,
+        )
+        previous_edits = {}
+        for old_start, new_start, size in matches.get_matching_blocks():
+            for offset in range(size):
+                previous_edits[new_start + offset] = self.edited[old_start + offset]
+
+        processed = 0
+        edited_captions = []
+        new_cues = CueTable()
+        keys: list[str] = []
+        for position, index in enumerate(kept):
+            text = texts[index]
+            edited = previous_edits.get(position)
+            if (
+                edited is None
+                or edited.keys_in != keys
+                or text in changed_direct
+                or _contains_any(text, changed_words)
+            ):
+                editor._previous_caption_keys = keys
+                new_text = editor._process_caption_contents(text)
+                edited = EditedCaption(
+                    text, keys, new_text, editor._previous_caption_keys
+                )
+                processed += 1
+
+            edited_captions.append(edited)
+            keys = edited.keys_out
+            new_cues.append_edited(
+                self._cues, index, starts[index], ends[index], edited.new_text
+            )
+
+        self.edited = edited_captions
+        editor._previous_caption_keys = []
+
+        if not len(new_cues):
+            print("Cannot convert an empty captions file")
+        else:
+            editor._write_cues(new_cues, EditStats())
+
+        return processed
+
+
+def _modified(paths: list[Path]) -> list[tuple[int, int] | None]:
+    modified = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            modified.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            modified.append(None)
+    return modified
+
+
+def watch_captions(
+    create_editor: Callable[[], Editor],
+    interval: float = 0.5,
+    stop: threading.Event | None = None,
+) -> None:
+    """
+    Edits a captions file, then watches it and its conversions file and writes the destination files again whenever either changes, until stopped.
+    create_editor is called to build the editor at the start and again whenever the conversions file changes. An editor that cannot be built, such as
+    while the conversions file is saved in an invalid state, is reported and the previous one is kept until the next change.
+    """
+
+    stop = stop or threading.Event()
+    incremental = IncrementalEdit(create_editor())
+    editor = incremental.editor
+
+    paths = [editor._captions_file_path]
+    if editor.conversions_file_path.is_file():
+        paths.append(editor.conversions_file_path)
+
+    modified = _modified(paths)
+    update_start = perf_counter()
+    processed = incremental.update()
+    print(
+        f"Edited {processed} captions in {perf_counter() - update_start:.3f}s, watching {', '.join(map(str, paths))}",
+        flush=True,
+    )
+
+    from pycaption.exceptions import CaptionReadError
+
+    while not stop.wait(interval):
+        new_modified = _modified(paths)
+        if new_modified == modified:
+            continue
+
+        captions_changed = new_modified[0] != modified[0]
+        conversions_changed = new_modified[1:] != modified[1:]
+        modified = new_modified
+
+        update_start = perf_counter()
+        try:
+            processed = incremental.update(
+                create_editor() if conversions_changed else None, captions_changed
+            )
+        except (OSError, ValueError, CaptionReadError) as exc:
+            # Files saved part way through are read again on their next change
+            print(f"Could not update: {exc}", flush=True)
+            continue
+
+        print(
+            f"Processed {processed} of {len(incremental.edited)} captions again in {perf_counter() - update_start:.3f}s",
+            flush=True,
+        )
@@ -0,0 +1,260 @@
+import re
+
+from .cues import CueTable
+from .timestamps import THREE_DIGITS, TWO_DIGITS
+
+
+def _timestamp(microseconds: int, separator: str) -> str:
+    """
+    Formats a caption time in microseconds as 'HH:MM:SS.mmm' the way the pycaption writers do, including their wrapping of hours at one day.
+    """
+
+    seconds, microseconds = divmod(microseconds, 1000000)
+    minutes, seconds = divmod(seconds % 86400, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{TWO_DIGITS[hours]}:{TWO_DIGITS[minutes]}:{TWO_DIGITS[seconds]}{separator}{THREE_DIGITS[microseconds // 1000]}"
+
+
+def _is_plain(caption_set, lang: str) -> bool:
+    """
+    Returns whether the captions of a language are only text and line breaks, with no styling, positioning, regions, or roll-up modes to write.
+    """
+
+    from pycaption import CaptionNode
+
+    if (
+        caption_set.get_styles()
+        or caption_set.get_regions()
+        or caption_set.get_layout_info(lang)
+    ):
+        return False
+
+    return all(
+        not caption.style
+        and caption.layout_info is None
+        and getattr(caption, "caption_mode", None) != "roll_up"
+        and all(
+            node.type_ != CaptionNode.STYLE and node.layout_info is None
+            for node in caption.nodes
+        )
+        for caption in caption_set.get_captions(lang)
+    )
+
+
+# The text WebVTTWriter escapes, in the order it escapes it
+VTT_ESCAPES = {
+    "&": "&amp;",
+    "<": "&lt;",
+    "-->": "--&gt;",
+    "\u00a0": "&nbsp;",
+    "\u200e": "&lrm;",
+    "\u200f": "&rlm;",
+}
+
+# The same text in WebVTT that keeps its markup, other than an '&' that starts a character reference or a '<' that starts a cue tag or timestamp
+VTT_ESCAPED_MARKUP_TEXT = re.compile(
+    "|".join(
+        {
+            "&": r"&(?!(?:[A-Za-z][A-Za-z0-9]*|#[0-9]+|#[xX][0-9A-Fa-f]+);)",
+            "<": r"<(?!/?(?:[cbiuv]|ruby|rt|lang)\b[^>]*>|[0-9][0-9:.]*>)",
+        }.get(text, re.escape(text))
+        for text in VTT_ESCAPES
+    )
+)
+
+
+def encode_vtt_text(text: str, markup: bool = False) -> str:
+    """
+    Escapes caption text the way WebVTTWriter does. With markup, the text is WebVTT cue text read straight from a file, such as a streamed cue,
+    whose character references and cue tags are written as they are, so that it is written the same as the captions pycaption reads from it.
+    """
+
+    if markup:
+        return VTT_ESCAPED_MARKUP_TEXT.sub(
+            lambda match: VTT_ESCAPES[match.group()], text
+        )
+
+    for escaped_text, escape in VTT_ESCAPES.items():
+        text = text.replace(escaped_text, escape)
+    return text
+
+
+class FastWebVTTWriter:
+    """
+    Writes WebVTT captions that are only text and line breaks straight from the captions, collecting each cue into a list that is joined once.
+    Captions with styling, positioning, regions, or roll-up modes are written by pycaption's WebVTTWriter. The output is always the same as WebVTTWriter's.
+    pycaption is only imported to write a caption set, or a cue table with nodes kept from the captions read, so writing plain cue tables does not pay for it.
+    """
+
+    HEADER = "WEBVTT\n\n"
+
+    def __init__(self, *args, **kwargs) -> None:
+        # The arguments WebVTTWriter is created with when it is needed
+        self._args = args
+        self._kwargs = kwargs
+
+    def write(self, caption_set, lang=None, **kwargs) -> str:
+        if caption_set.is_empty():
+            return self.HEADER
+
+        if lang is None:
+            lang = caption_set.get_languages()[0]
+        if not _is_plain(caption_set, lang):
+            from pycaption import WebVTTWriter
+
+            # Writers keep state while they work, so each caption set gets its own
+            return WebVTTWriter(*self._args, **self._kwargs).write(
+                caption_set, lang, **kwargs
+            )
+
+        cues = []
+        for caption in caption_set.get_captions(lang):
+            text = self._nodes_text(caption.nodes)
+            if text is not None:
+                cues.append(
+                    f"{_timestamp(caption.start, '.')} --> {_timestamp(caption.end, '.')}\n{text}\n"
+                )
+
+        return self.HEADER + "\n".join(cues)
+
+    def write_cues(self, cues: CueTable) -> str:
+        """
+        Writes the captions of a cue table, with the same output as writing the caption set it would be turned into.
+        """
+
+        if cues.nodes:
+            from pycaption import CaptionNode
+
+            if any(
+                node.type_ == CaptionNode.STYLE
+                for nodes in cues.nodes.values()
+                for node in nodes
+            ):
+                return self.write(cues.to_caption_set())
+
+        written = []
+        for index, (start, end, text) in enumerate(cues):
+            nodes = cues.nodes.get(index)
+            if nodes is None:
+                # The nodes rebuilt from the text are a text node for each line, so every line is written
+                text = "\n".join(
+                    encode_vtt_text(line).strip() or "&nbsp;"
+                    for line in text.split("\n")
+                )
+            else:
+                text = self._nodes_text(nodes)
+                if text is None:
+                    continue
+            written.append(
+                f"{_timestamp(start * 1000, '.')} --> {_timestamp(end * 1000, '.')}\n{text}\n"
+            )
+
+        return self.HEADER + "\n".join(written)
+
+    @staticmethod
+    def _nodes_text(nodes) -> str | None:
+        """
+        Returns the text of a cue made of text and line break nodes, or None if it has no text nodes and is not written.
+        """
+
+        from pycaption import CaptionNode
+
+        if not any(node.type_ == CaptionNode.TEXT for node in nodes):
+            return None
+
+        # Line breaks that end a cue are dropped, and a line that is otherwise empty is kept with a non-breaking space
+        end = len(nodes)
+        while nodes[end - 1].type_ == CaptionNode.BREAK:
+            end -= 1
+        pieces = []
+        previous_is_text = False
+        for node in nodes[:end]:
+            if node.type_ == CaptionNode.TEXT:
+                pieces.append(encode_vtt_text(node.content) or "&nbsp;")
+                previous_is_text = True
+            else:
+                pieces.append("\n" if previous_is_text else "&nbsp;\n")
+                previous_is_text = False
+
+        return "\n".join(
+            line.strip() or "&nbsp;" for line in "".join(pieces).split("\n")
+        )
+
+
+class FastSRTWriter:
+    """
+    Writes SRT captions straight from the captions, collecting each cue into a list that is joined once, instead of copying the caption set and building strings
+    cue by cue. pycaption's SRTWriter only writes text and line breaks, so every caption set is written this way, with the same output as SRTWriter.
+    pycaption is never imported to write a cue table without nodes kept from the captions read.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        # SRTWriter takes the same arguments as every pycaption writer, none of which change SRT output
+        pass
+
+    def write(self, caption_set, **kwargs) -> str:
+        return "MULTI-LANGUAGE SRT\n".join(
+            self._write_lang(
+                (caption.start, caption.end, self._nodes_text(caption.nodes))
+                for caption in caption_set.get_captions(lang)
+            )
+            for lang in caption_set.get_languages()
+        )
+
+    def write_cues(self, cues: CueTable) -> str:
+        """
+        Writes the captions of a cue table, with the same output as writing the caption set it would be turned into.
+        """
+
+        return self._write_lang(
+            (
+                start * 1000,
+                end * 1000,
+                (
+                    text
+                    if index not in cues.nodes
+                    else self._nodes_text(cues.nodes[index])
+                ),
+            )
+            for index, (start, end, text) in enumerate(cues)
+        )
+
+    @staticmethod
+    def _nodes_text(nodes) -> str:
+        from pycaption import CaptionNode
+
+        text = ""
+        for node in nodes:
+            if node.type_ == CaptionNode.TEXT:
+                # Runs of text are separated by a space unless one of them already supplies it
+                if text and not text[-1].isspace() and not node.content[:1].isspace():
+                    text += " "
+                text += node.content
+            elif node.type_ == CaptionNode.BREAK:
+                text += "\n"
+        return text
+
+    @staticmethod
+    def _write_lang(captions) -> str:
+        """
+        Writes the (start, end, text) of every caption of a language, with times in microseconds.
+        """
+
+        # Consecutive captions with the same times are written as one cue, with their text on separate lines
+        groups = []
+        for start, end, text in captions:
+            if groups and groups[-1][0] == (start, end):
+                groups[-1][1].append(text)
+            else:
+                groups.append(((start, end), [text]))
+
+        cues = []
+        for number, ((start, end), texts) in enumerate(groups, 1):
+            text = "\n".join(
+                line.rstrip() for line in "\n".join(texts).split("\n")
+            ).strip(" \t\r\n")
+            cues.append(
+                f"{number}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n"
+            )
+
+        return "\n".join(cues)
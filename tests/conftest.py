@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    # Compiled conversions and outputs are cached for each test on its own, instead of in the user's cache directory, and outside the test's own tmp_path
+    monkeypatch.setenv("CAPTIONEDITOR_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
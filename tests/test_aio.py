@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from src.captioneditor import Editor
+from pathlib import Path
+
+INITIAL_CAPTIONS_ROOT = "tests/test_data/initial_captions/"
+VTT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_vtt.vtt"
+SRT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_srt.srt"
+DFXP_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_dfxp.dfxp"
+EMPTY_CAPTIONS_FILE = INITIAL_CAPTIONS_ROOT + "empty.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+EXTENSIONS = [".vtt", ".srt", ".dfxp"]
+
+
+def test_edit_captions_async_matches_edit_captions(tmp_path):
+    editor = Editor(
+        DFXP_CAPTIONS,
+        CONVERSIONS_FILE,
+        dest_file_extensions=EXTENSIONS,
+        dest_directory=tmp_path,
+        dest_filename="async",
+    )
+    rendered = asyncio.run(editor.edit_captions_async())
+
+    editor.update_dest_filename("sync")
+    editor.edit_captions()
+
+    assert sorted(rendered) == sorted(EXTENSIONS)
+    for extension in EXTENSIONS:
+        expected = (tmp_path / ("sync" + extension)).read_text(encoding="utf8")
+        assert rendered[extension] == expected
+        assert (tmp_path / ("async" + extension)).read_text(encoding="utf8") == expected
+
+
+def test_edit_captions_async_empty(tmp_path):
+    editor = Editor(EMPTY_CAPTIONS_FILE, CONVERSIONS_FILE, dest_directory=tmp_path)
+    assert asyncio.run(editor.edit_captions_async()) == {}
+    assert not any(tmp_path.iterdir())
+
+
+def test_concurrent_text_edits_share_editor():
+    editor = Editor(
+        conversions_file=CONVERSIONS_FILE, dest_file_extensions=[".vtt", ".srt"]
+    )
+    uploads = [
+        (Path(path).read_text(encoding="utf8"), Path(path).suffix)
+        for path in (VTT_CAPTIONS, SRT_CAPTIONS)
+    ] * 4
+
+    async def edit_all():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return await asyncio.gather(
+                *(
+                    editor.edit_captions_text_async(contents, captions_type, executor)
+                    for contents, captions_type in uploads
+                )
+            )
+
+    expected = [
+        editor.edit_captions_text(contents, captions_type)
+        for contents, captions_type in uploads
+    ]
+    assert asyncio.run(edit_all()) == expected
+
+
+def test_edit_captions_text_async_invalid_type():
+    editor = Editor(conversions_file=CONVERSIONS_FILE)
+    with pytest.raises(ValueError) as exc_info:
+        asyncio.run(editor.edit_captions_text_async("", ".txt"))
+    assert str(exc_info.value) == "Unsupported captions type"
+
+
+@pytest.mark.parametrize("executor_type", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_batch_async(tmp_path, executor_type):
+    async def edit_batch():
+        with executor_type(max_workers=2) as executor:
+            return await Editor.edit_captions_batch_async(
+                [VTT_CAPTIONS, SRT_CAPTIONS, "missing.vtt"],
+                concurrency=2,
+                executor=executor,
+                conversions_file=CONVERSIONS_FILE,
+                dest_directory=tmp_path,
+            )
+
+    summary = asyncio.run(edit_batch())
+
+    assert [result.succeeded for result in summary.results] == [False, True, True]
+    assert [result.captions for result in summary.results] == [0, 841, 841]
+    for result in summary.results[1:]:
+        converted = tmp_path / (result.captions_file.stem + "-converted.vtt")
+        assert result.outputs == {".vtt": converted.read_text(encoding="utf8")}
+
+
+def test_batch_async_cancellation(tmp_path):
+    sources = []
+    for index in range(20):
+        source = tmp_path / f"captions{index:02d}.vtt"
+        source.write_bytes(Path(VTT_CAPTIONS).read_bytes())
+        sources.append(source)
+    dest_directory = tmp_path / "converted"
+    dest_directory.mkdir()
+
+    async def cancel_batch():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batch = asyncio.create_task(
+                Editor.edit_captions_batch_async(
+                    sources,
+                    concurrency=1,
+                    executor=executor,
+                    conversions_file=CONVERSIONS_FILE,
+                    dest_directory=dest_directory,
+                )
+            )
+            await asyncio.sleep(0)
+            batch.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await batch
+
+    asyncio.run(cancel_batch())
+    assert len(list(dest_directory.iterdir())) < len(sources)
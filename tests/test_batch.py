@@ -0,0 +1,99 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.batch import collect_captions_files, edit_captions_batch
+from src.captioneditor.editor import main
+from pathlib import Path
+
+INITIAL_CAPTIONS_ROOT = "tests/test_data/initial_captions/"
+VTT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_vtt.vtt"
+SRT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_srt.srt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+
+def test_collect_directory():
+    captions_files = collect_captions_files([INITIAL_CAPTIONS_ROOT])
+    assert [path.name for path in captions_files] == [
+        "empty.vtt",
+        "test_dfxp.dfxp",
+        "test_srt.srt",
+        "test_ttml.ttml",
+        "test_vtt.vtt",
+    ]
+
+
+def test_collect_glob_and_duplicates():
+    captions_files = collect_captions_files(
+        [INITIAL_CAPTIONS_ROOT + "*.vtt", VTT_CAPTIONS]
+    )
+    assert [path.name for path in captions_files] == ["empty.vtt", "test_vtt.vtt"]
+
+
+def test_batch_matches_single_file(tmp_path):
+    single_dir = tmp_path / "single"
+    single_dir.mkdir()
+    Editor(VTT_CAPTIONS, CONVERSIONS_FILE, dest_directory=single_dir).edit_captions()
+
+    summary = edit_captions_batch(
+        [VTT_CAPTIONS, SRT_CAPTIONS],
+        conversions_file=CONVERSIONS_FILE,
+        dest_directory=tmp_path,
+        workers=1,
+    )
+
+    assert not summary.failures
+    assert [result.captions for result in summary.results] == [841, 841]
+    assert summary.captions_per_second > 0
+    assert (tmp_path / "test_vtt-converted.vtt").read_text(encoding="utf8") == (
+        single_dir / "test_vtt-converted.vtt"
+    ).read_text(encoding="utf8")
+
+
+def test_batch_reports_errors_per_file(tmp_path):
+    summary = Editor.edit_captions_batch(
+        [VTT_CAPTIONS, "missing.vtt", SRT_CAPTIONS],
+        conversions_file=CONVERSIONS_FILE,
+        dest_directory=tmp_path,
+        workers=2,
+    )
+
+    assert [result.succeeded for result in summary.results] == [False, True, True]
+    assert summary.failures[0].error == "FileNotFoundError: Captions file not found"
+    assert (tmp_path / "test_srt-converted.vtt").is_file()
+    assert (tmp_path / "test_vtt-converted.vtt").is_file()
+
+
+def test_batch_cli(tmp_path, capsys):
+    main(
+        [
+            INITIAL_CAPTIONS_ROOT + "test_*",
+            "-c",
+            CONVERSIONS_FILE,
+            "-dd",
+            str(tmp_path),
+            "-w",
+            "1",
+        ]
+    )
+    captured = capsys.readouterr()
+    assert "Converted 4 of 4 files" in captured.out
+    assert len(list(tmp_path.iterdir())) == 4
+
+
+@pytest.mark.parametrize("share_caption_cache", [True, False])
+def test_batch_shares_caption_cache(tmp_path, share_caption_cache):
+    sources = [tmp_path / "first.vtt", tmp_path / "second.vtt"]
+    for source in sources:
+        source.write_bytes(Path(VTT_CAPTIONS).read_bytes())
+
+    summary = edit_captions_batch(
+        sources,
+        conversions_file=CONVERSIONS_FILE,
+        dest_directory=tmp_path,
+        workers=1,
+        share_caption_cache=share_caption_cache,
+    )
+
+    first, second = summary.results
+    assert first.cache_hits + first.cache_misses > 0
+    # Both files hold the same captions, so a shared cache already holds every caption of the second file
+    assert (second.cache_misses == 0) == share_caption_cache
@@ -0,0 +1,110 @@
+import pytest
+import pickle
+from src.captioneditor import Editor, chunks
+from src.captioneditor.chunks import split_chunks
+from src.captioneditor.streaming import read_cues
+from pathlib import Path
+import json
+
+INITIAL_CAPTIONS_ROOT = "tests/test_data/initial_captions/"
+VTT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_vtt.vtt"
+SRT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_srt.srt"
+EMPTY_CAPTIONS_FILE = INITIAL_CAPTIONS_ROOT + "empty.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+EXTENSIONS = [".vtt", ".srt"]
+
+
+@pytest.fixture()
+def many_chunks(monkeypatch):
+    monkeypatch.setattr(chunks, "CHUNKS_PER_WORKER", 50)
+
+
+def edit_both_ways(tmp_path, captions_file, conversions_file, **options):
+    editor = Editor(
+        captions_file,
+        conversions_file,
+        dest_file_extensions=EXTENSIONS,
+        dest_directory=tmp_path,
+        dest_filename="streamed",
+        **options,
+    )
+    streamed_count = editor.edit_captions_stream()
+
+    editor.update_dest_filename("parallel")
+    assert editor.edit_captions_parallel(workers=2) == streamed_count
+
+    for extension in EXTENSIONS:
+        assert (tmp_path / ("parallel" + extension)).read_bytes() == (
+            tmp_path / ("streamed" + extension)
+        ).read_bytes()
+
+
+@pytest.mark.parametrize("captions_file", [VTT_CAPTIONS, SRT_CAPTIONS])
+@pytest.mark.parametrize("cutoff", [-1, 100])
+def test_parallel_matches_stream(tmp_path, many_chunks, captions_file, cutoff):
+    edit_both_ways(tmp_path, captions_file, CONVERSIONS_FILE, cutoff=cutoff)
+
+
+def test_parallel_fixes_chained_previous_keys(tmp_path, many_chunks):
+    # Whether "count" is a key for the next caption depends on the caption before it, so looking back one caption is not always enough
+    conversions_file = tmp_path / "conversions.json"
+    conversions_file.write_text(
+        json.dumps(
+            {
+                "conversions": [
+                    {"key": "count", "replacement": "tally", "previous": "reset"},
+                    {"key": "one", "replacement": "1", "previous": "count"},
+                ]
+            }
+        )
+    )
+    captions_file = tmp_path / "captions.vtt"
+    captions_file.write_text(
+        "WEBVTT\n\n"
+        + "".join(
+            f"00:{index // 60:02d}:{index % 60:02d}.000 --> 00:{index // 60:02d}:{index % 60:02d}.500\n"
+            f"{('reset', 'count', 'one', 'count', 'one')[index % 5]}\n\n"
+            for index in range(1000)
+        ),
+        encoding="utf8",
+    )
+
+    edit_both_ways(tmp_path, captions_file, conversions_file)
+    converted = (tmp_path / "parallel.vtt").read_text(encoding="utf8")
+    assert "tally\n\n" in converted and "\none\n" in converted and "\n1\n" in converted
+
+
+def test_parallel_empty(tmp_path):
+    editor = Editor(EMPTY_CAPTIONS_FILE, CONVERSIONS_FILE, dest_directory=tmp_path)
+    assert editor.edit_captions_parallel(workers=2) == 0
+    assert not any(tmp_path.iterdir())
+
+
+def test_parallel_unsupported_type(tmp_path):
+    editor = Editor(VTT_CAPTIONS, CONVERSIONS_FILE, dest_file_extensions=[".dfxp"])
+    with pytest.raises(ValueError):
+        editor.edit_captions_parallel(workers=2)
+
+
+def test_split_chunks_cover_every_cue():
+    captions_file = Path(VTT_CAPTIONS)
+    contents = captions_file.read_bytes()
+    split = split_chunks(captions_file, 16)
+
+    assert len(split) == 16
+    assert split[0][0] == 0 and split[-1][1] == len(contents)
+    cues = []
+    for (start, end, lookback), previous in zip(split, [None] + split[:-1]):
+        assert lookback is None or lookback[1] == start
+        if previous is not None:
+            assert previous[1] == start
+        cues += read_cues(contents[start:end].decode("utf8").splitlines())
+    assert cues == list(read_cues(contents.decode("utf8").splitlines()))
+
+
+def test_editor_pickles():
+    editor = Editor(conversions_file=CONVERSIONS_FILE, caption_cache_size=8)
+    copy = pickle.loads(pickle.dumps(editor))
+    contents = Path(VTT_CAPTIONS).read_text(encoding="utf8")
+    assert copy.caption_cache.maxsize == 8
+    assert copy.edit_captions_text(contents) == editor.edit_captions_text(contents)
@@ -0,0 +1,123 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.conversions import (
+    CompiledConversions,
+    _write_cache,
+    conversions_cache_path,
+    load_conversions,
+    parse_conversions,
+)
+from src.captioneditor.editor import main
+import json
+
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+
+@pytest.fixture()
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("CAPTIONEDITOR_CACHE_DIR", str(cache_dir))
+    yield cache_dir
+
+
+@pytest.fixture()
+def conversions_file(tmp_path):
+    path = tmp_path / "conversions.json"
+    path.write_text(
+        json.dumps(
+            {
+                "offset": 10,
+                "conversions": [
+                    {"key": "one", "replacement": "1", "previous": "count"},
+                    {"key": "two", "replacement": "2", "previous": "count"},
+                    {"key": "Three", "replacement": "3", "caseSensitive": True},
+                    {"key": "four", "replacement": "4"},
+                    {"key": "five", "replacement": "5", "directConversion": True},
+                    {"key": "missing replacement"},
+                ],
+            }
+        )
+    )
+    yield path
+
+
+def test_parse_conversions(conversions_file):
+    compiled = parse_conversions(json.loads(conversions_file.read_text()))
+    assert compiled == CompiledConversions(
+        offset=10,
+        cutoff=-1,
+        case_sensitive=[("Three", "3")],
+        case_insensitive=[("four", "4")],
+        previous={"count": [("one", "1"), ("two", "2")]},
+        direct={"five": "5"},
+    )
+
+
+def test_conversions_sharing_previous_all_apply(conversions_file, tmp_path):
+    captions_file = tmp_path / "captions.vtt"
+    captions_file.write_text(
+        "WEBVTT\n\n00:01.000 --> 00:02.000\ncount\n\n"
+        "00:03.000 --> 00:04.000\none two\n",
+        encoding="utf8",
+    )
+    Editor(captions_file, conversions_file).edit_captions()
+    assert "1 2" in (tmp_path / "captions-converted.vtt").read_text(encoding="utf8")
+
+
+def test_cache_written_and_used(cache_dir, conversions_file):
+    compiled = load_conversions(conversions_file)
+    cache_path = conversions_cache_path(conversions_file.read_bytes())
+    assert cache_path.parent == cache_dir
+    assert cache_path.is_file()
+
+    # The cached entry is used instead of parsing the conversions file again
+    _write_cache(cache_path, CompiledConversions(offset=99))
+    assert load_conversions(conversions_file).offset == 99
+    assert load_conversions(conversions_file, use_cache=False) == compiled
+
+
+def test_stale_cache_rebuilt(cache_dir, conversions_file):
+    load_conversions(conversions_file)
+    conversions_file.write_text(json.dumps({"conversions": []}))
+
+    assert load_conversions(conversions_file) == CompiledConversions()
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_corrupt_cache_rebuilt(cache_dir, conversions_file):
+    cache_path = conversions_cache_path(conversions_file.read_bytes())
+    cache_dir.mkdir()
+    cache_path.write_bytes(b"not a pickle")
+
+    assert load_conversions(conversions_file).offset == 10
+
+
+def test_invalid_conversions_not_cached(cache_dir, tmp_path):
+    path = tmp_path / "invalid.json"
+    path.write_text(json.dumps({"conversions": {}}))
+
+    with pytest.raises(ValueError) as exc_info:
+        load_conversions(path)
+    assert str(exc_info.value) == "Conversions must be list"
+    assert not cache_dir.exists()
+
+
+def test_editor_uses_cache(cache_dir, conversions_file):
+    editor = Editor(conversions_file=conversions_file)
+    assert editor.timing_offset == 10
+    assert any(cache_dir.iterdir())
+
+    editor = Editor(conversions_file=conversions_file)
+    assert editor._process_caption_contents("count") == "count"
+    assert editor._process_caption_contents("one two Three FOUR") == "1 2 3 4"
+    assert editor._process_caption_contents("five") == "5"
+
+
+def test_compile_conversions_cli(cache_dir, capsys):
+    main(["compile-conversions", CONVERSIONS_FILE])
+    captured = capsys.readouterr()
+
+    with open(CONVERSIONS_FILE, "rb") as f:
+        cache_path = conversions_cache_path(f.read())
+    assert cache_path.is_file()
+    assert captured.out == f"Compiled {CONVERSIONS_FILE} to {cache_path}\n"
@@ -0,0 +1,133 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.conversions import (
+    CompiledConversions,
+    load_conversions,
+    parse_conversions,
+)
+from src.captioneditor.conversions_store import (
+    build_conversions_store,
+    load_conversions_store,
+    write_conversions_store,
+)
+from src.captioneditor.editor import main
+from pathlib import Path
+import json
+import sqlite3
+
+VTT_CAPTIONS = "tests/test_data/initial_captions/test_vtt.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+
+@pytest.fixture()
+def conversions_file(tmp_path):
+    path = tmp_path / "conversions.json"
+    path.write_text(
+        json.dumps(
+            {
+                "offset": 10,
+                "cutoff": 600,
+                "conversions": [
+                    {"key": "one", "replacement": "1", "previous": "count"},
+                    {"key": "Three", "replacement": "3", "caseSensitive": True},
+                    {"key": "two", "replacement": "2", "previous": "count"},
+                    {"key": "four", "replacement": "4"},
+                    {"key": "five", "replacement": "5", "directConversion": True},
+                    {"key": "uno", "replacement": "1", "previous": "cuenta"},
+                    {"key": "four", "replacement": "FOUR"},
+                    {"key": r"(\d+) ?km", "replacement": r"\1 km", "regex": True},
+                    {
+                        "key": "Mr",
+                        "replacement": "Mister",
+                        "regex": True,
+                        "caseSensitive": True,
+                    },
+                    {"key": "missing replacement"},
+                ],
+            }
+        )
+    )
+    yield path
+
+
+def test_store_matches_json(conversions_file, tmp_path):
+    store = build_conversions_store(conversions_file)
+    assert store == tmp_path / "conversions.sqlite"
+
+    compiled = load_conversions_store(store)
+    assert compiled == parse_conversions(json.loads(conversions_file.read_text()))
+    assert list(compiled.previous) == ["count", "cuenta"]
+
+
+def test_previous_keys_are_stored_once(conversions_file, tmp_path):
+    store = build_conversions_store(conversions_file, tmp_path / "rules.db")
+    with sqlite3.connect(store) as connection:
+        assert connection.execute("SELECT key FROM previous_keys").fetchall() == [
+            ("count",),
+            ("cuenta",),
+        ]
+
+    compiled = load_conversions_store(store)
+    assert compiled.previous["count"] == [("one", "1"), ("two", "2")]
+
+
+def test_empty_conversions(tmp_path):
+    store = tmp_path / "empty.sqlite"
+    write_conversions_store(CompiledConversions(), store)
+    assert load_conversions_store(store) == CompiledConversions()
+
+
+def test_invalid_store(tmp_path):
+    store = tmp_path / "invalid.sqlite"
+    store.write_bytes(b"not a database")
+    with pytest.raises(ValueError):
+        load_conversions_store(store)
+
+    store.unlink()
+    with sqlite3.connect(store) as connection:
+        connection.execute("CREATE TABLE conversions (key TEXT)")
+    with pytest.raises(ValueError):
+        load_conversions_store(store)
+
+
+def test_load_conversions_reads_store(conversions_file):
+    store = build_conversions_store(conversions_file)
+    assert load_conversions(store) == load_conversions(
+        conversions_file, use_cache=False
+    )
+
+
+def test_editor_with_store(tmp_path):
+    store = build_conversions_store(CONVERSIONS_FILE, tmp_path / "conversions.sqlite")
+    (tmp_path / "json").mkdir()
+    (tmp_path / "store").mkdir()
+
+    extensions = [".vtt", ".srt"]
+    Editor(
+        VTT_CAPTIONS,
+        CONVERSIONS_FILE,
+        dest_file_extensions=extensions,
+        dest_directory=tmp_path / "json",
+    ).edit_captions()
+    Editor(
+        VTT_CAPTIONS,
+        store,
+        dest_file_extensions=extensions,
+        dest_directory=tmp_path / "store",
+    ).edit_captions()
+
+    for extension in extensions:
+        filename = "test_vtt-converted" + extension
+        assert (tmp_path / "store" / filename).read_text(encoding="utf8") == (
+            tmp_path / "json" / filename
+        ).read_text(encoding="utf8")
+
+
+def test_build_store_cli(conversions_file, tmp_path, capsys):
+    store = tmp_path / "store.sqlite3"
+    main(["build-conversions-store", str(conversions_file), str(store)])
+    assert capsys.readouterr().out == f"Compiled {conversions_file} to {store}\n"
+    assert load_conversions_store(store).cutoff == 600
+
+    with pytest.raises(SystemExit):
+        main(["build-conversions-store", str(conversions_file), "store.txt"])
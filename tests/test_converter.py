@@ -432,3 +432,49 @@ def test_missing_offset_cutoff_in_conversions(no_offset_cutoff_conversions, dest
     assert check_identical_contents(
         Path(dest_file["directory"]) / (dest_file["name"] + ".vtt"), NO_OFFSET_CUTOFF
     )
+
+
+def test_edit_captions_text():
+    with open(SRT_CAPTIONS, "rb") as f:
+        contents = f.read()
+
+    editor = Editor(
+        conversions_file=CONVERSIONS_FILE, dest_file_extensions=[".vtt", ".srt"]
+    )
+    outputs = editor.edit_captions_text(contents, ".srt")
+
+    file_editor = Editor(
+        SRT_CAPTIONS,
+        CONVERSIONS_FILE,
+        dest_file_extensions=[".vtt", ".srt"],
+    )
+    assert outputs == file_editor.edit_captions_text(contents.decode("utf8"), ".srt")
+    assert set(outputs) == {".vtt", ".srt"}
+    assert outputs[".vtt"].startswith("WEBVTT")
+
+
+def test_edit_captions_text_empty():
+    editor = Editor(conversions_file=CONVERSIONS_FILE)
+    assert editor.edit_captions_text("WEBVTT\n") == {}
+
+
+def test_edit_captions_text_invalid_type():
+    editor = Editor(conversions_file=CONVERSIONS_FILE)
+    with pytest.raises(ValueError) as exc_info:
+        editor.edit_captions_text("", ".txt")
+    assert str(exc_info.value) == "Unsupported captions type"
+
+
+def test_no_temp_file_next_to_source(test_files):
+    captions, dest, root, reference, type = test_files.param
+    source_dir = Path(captions).parent
+    before = set(source_dir.iterdir())
+    editor = Editor(
+        captions_file=captions,
+        conversions_file=CONVERSIONS_FILE,
+        dest_filename=dest,
+        dest_directory=root,
+        dest_file_extensions=[type],
+    )
+    editor.edit_captions()
+    assert set(source_dir.iterdir()) == before
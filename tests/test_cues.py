@@ -0,0 +1,133 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.cues import CueTable, render_cues
+from src.captioneditor.writers import FastSRTWriter, FastWebVTTWriter
+from pycaption import Caption, CaptionNode, DFXPWriter
+import pickle
+
+BREAK = CaptionNode.create_break
+STYLE = CaptionNode.create_style
+
+
+def text(content: str) -> CaptionNode:
+    return CaptionNode.create_text(content)
+
+
+CAPTIONS = [
+    Caption(1000000, 2000000, [text("one"), BREAK(), text("two")]),
+    Caption(1000000, 2000000, [text("same times")]),
+    Caption(2500999, 3000000, [text("a & b <c> --> d e")]),
+    Caption(4000000, 5000000, [BREAK(), text(" one "), text("two"), BREAK()]),
+    Caption(6000000, 7000000, [BREAK()]),
+    Caption(8000000, 9000000, [text("  "), BREAK(), text("")]),
+    Caption(9000000, 9500000, [text("Straße ♪")]),
+]
+
+STYLED = Caption(
+    10000000,
+    11000000,
+    [STYLE(True, {"italics": True}), text("styled"), STYLE(False, {"italics": True})],
+)
+
+
+def test_from_captions():
+    cues = CueTable.from_captions(CAPTIONS)
+    assert len(cues) == len(CAPTIONS)
+    assert list(cues)[:3] == [
+        (1000, 2000, "one\ntwo"),
+        (1000, 2000, "same times"),
+        (2500, 3000, "a & b <c> --> d e"),
+    ]
+    assert cues.text(6) == "Straße ♪"
+
+    # Only the captions that cannot be rebuilt from their text keep their nodes
+    assert sorted(cues.nodes) == [3, 4]
+    assert [node.type_ for node in cues.nodes[4]] == [CaptionNode.BREAK]
+
+
+def test_append():
+    cues = CueTable()
+    cues.append(0, 1000, "")
+    cues.append(1000, 2000, "two\nlines", "cue-2")
+    cues.append(2000, 3000, "♪")
+    assert list(cues) == [(0, 1000, ""), (1000, 2000, "two\nlines"), (2000, 3000, "♪")]
+    assert [cues.identifier(index) for index in range(3)] == ["", "cue-2", ""]
+    # Four columns of 64-bit integers, the text, and the identifiers
+    assert cues.nbytes() == 4 * 3 * 8 + len("two\nlines♪".encode("utf8")) + 5
+
+
+def test_append_edited():
+    cues = CueTable()
+    for _ in range(2):
+        cues.append(0, 1000, "styled", "id", STYLED.nodes)
+
+    edited = CueTable()
+    edited.append_edited(cues, 0, 0, 1000, "styled")
+    edited.append_edited(cues, 1, 1000, 2000, "changed")
+    assert list(edited) == [(0, 1000, "styled"), (1000, 2000, "changed")]
+    assert edited.identifier(0) == "id"
+
+    # Styling is kept unless the text was changed
+    assert list(edited.nodes) == [0]
+
+
+def test_append_copy():
+    cues = CueTable()
+    cues.append(0, 1000, "Straße", "id")
+    cues.append(0, 1000, "styled", nodes=STYLED.nodes)
+    cues.append(0, 1000, b"bytes")
+
+    copied = CueTable()
+    for index in (2, 1, 0):
+        copied.append_copy(cues, index, index, index + 1)
+    assert list(copied) == [(2, 3, "bytes"), (1, 2, "styled"), (0, 1, "Straße")]
+    assert [copied.identifier(index) for index in range(3)] == ["", "", "id"]
+    assert list(copied.nodes) == [1]
+
+
+@pytest.mark.parametrize(
+    "captions", [CAPTIONS, CAPTIONS + [STYLED], []], ids=["plain", "styled", "empty"]
+)
+@pytest.mark.parametrize("writer", [FastWebVTTWriter, FastSRTWriter, DFXPWriter])
+def test_writers_match_caption_set(captions, writer):
+    cues = CueTable.from_captions(captions)
+    assert render_cues(writer(), cues) == writer().write(cues.to_caption_set())
+
+
+def test_offset_and_cut():
+    cues = CueTable.from_captions(CAPTIONS)
+    starts, ends, keep = cues.offset_and_cut(-1500, 7, 1)
+    assert list(starts) == [-500, -500, 1000, 2500, 4500, 6500, 7500]
+    assert list(ends)[:2] == [500, 500]
+    assert list(keep) == [0, 0, 1, 1, 1, 1, 0]
+
+    # The table itself is not changed
+    assert cues.starts[0] == 1000
+
+
+def test_pickle():
+    cues = CueTable.from_captions(CAPTIONS + [STYLED])
+    copied = pickle.loads(pickle.dumps(cues))
+    assert list(copied) == list(cues)
+    assert sorted(copied.nodes) == sorted(cues.nodes)
+
+
+def test_editor_keeps_styling_of_unchanged_captions(tmp_path):
+    captions_file = tmp_path / "captions.vtt"
+    captions_file.write_text(
+        "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\n<i>Hello</i> there\n\n"
+        "00:00:03.000 --> 00:00:04.000\n<i>alright</i>\n",
+        encoding="utf8",
+    )
+    conversions_file = tmp_path / "conversions.json"
+    conversions_file.write_text(
+        '{"conversions": [{"key": "alright", "replacement": "all right"}]}'
+    )
+
+    rendered = Editor(captions_file, conversions_file).edit_captions_text(
+        captions_file.read_text(encoding="utf8")
+    )
+    assert rendered[".vtt"] == (
+        "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\n<i>Hello</i> there\n\n"
+        "00:00:03.000 --> 00:00:04.000\nall right\n"
+    )
@@ -0,0 +1,138 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.dfxp import StreamingDFXPReader
+from pycaption import CaptionReadNoCaptions, DFXPReader
+from pathlib import Path
+
+INITIAL_CAPTIONS_ROOT = "tests/test_data/initial_captions/"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+HEAD = '<?xml version="1.0" encoding="utf-8"?>\n<tt xml:lang="en" xmlns="http://www.w3.org/ns/ttml" xmlns:tts="http://www.w3.org/ns/ttml#styling">\n<head><layout><region xml:id="bottom" tts:textAlign="start"/></layout></head>\n'
+
+# Documents inside the subset that is read without DFXPReader
+STREAMED = {
+    "breaks": '<body><div><p begin="00:00:01.5" end="00:00:02.250">\n  one<br/>two <br />\n  three\n</p></div></body></tt>',
+    "offsets": '<body><div><p begin="1.5s" dur="750ms">one</p><p begin="0.01h" end="1m">two</p></div></body></tt>',
+    "languages": '<body><div xml:lang="fr"><p begin="00:00:01.000" end="00:00:02.000">un</p></div><div><p begin="00:00:03.000" end="00:00:04.000">one</p></div>'
+    + '<div xml:lang="fr"><p begin="00:00:05.000" end="00:00:06.000">deux</p></div></body></tt>',
+    "skipped": '<body region="bottom"><div><p begin="bad" end="x"> \n </p><p begin="00:00:01.000" end="00:00:02.000" style="s1" tts:color="red">Tom &amp; Jerry&apos;s</p></div></body></tt>',
+}
+
+# Documents that DFXPReader reads differently from an XML parser, or with features outside the subset
+FALLBACK = {
+    "span": '<body><div><p begin="00:00:01.000" end="00:00:02.000">one <span tts:fontStyle="italic">two</span></p></div></body></tt>',
+    "frames": '<body><div><p begin="00:00:01:12" end="00:00:02.000">one</p></div></body></tt>',
+    "comment": '<body><div><p begin="00:00:01.000" end="00:00:02.000">one<!-- two --></p></div></body></tt>',
+    "nested": '<body><div><div><p begin="00:00:01.000" end="00:00:02.000">one</p></div></div></body></tt>',
+    "positioning": '<body><div><p begin="00:00:01.000" end="00:00:02.000" tts:origin="10% 10%">one</p></div></body></tt>',
+    "html entity": '<body><div><p begin="00:00:01.000" end="00:00:02.000">one&nbsp;two</p></div></body></tt>',
+    "unclosed break": '<body><div><p begin="00:00:01.000" end="00:00:02.000">one<br>two</p></div></body></tt>',
+    "uppercase attribute": '<body><div><p Begin="00:00:01.000" end="00:00:02.000">one</p></div></body></tt>',
+}
+
+
+def read_captions(reader, contents: str) -> list:
+    caption_set = reader.read(contents)
+    return [
+        (
+            lang,
+            [
+                (
+                    caption.start,
+                    caption.end,
+                    [(node.type_, node.content) for node in caption.nodes],
+                )
+                for caption in caption_set.get_captions(lang)
+            ],
+        )
+        for lang in caption_set.get_languages()
+    ]
+
+
+@pytest.fixture()
+def fallbacks(monkeypatch):
+    # Records each document that StreamingDFXPReader hands over to DFXPReader
+    documents = []
+    read = DFXPReader.read
+
+    def recording_read(self, content):
+        documents.append(content)
+        return read(self, content)
+
+    monkeypatch.setattr(DFXPReader, "read", recording_read)
+    return documents
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        Path(INITIAL_CAPTIONS_ROOT + "test_dfxp.dfxp").read_text(encoding="utf8"),
+        Path(INITIAL_CAPTIONS_ROOT + "test_ttml.ttml").read_text(encoding="utf8"),
+        *(HEAD + body for body in STREAMED.values()),
+    ],
+)
+def test_streamed_matches_dfxp_reader(contents, fallbacks):
+    expected = read_captions(DFXPReader(), contents)
+    fallbacks.clear()
+    assert read_captions(StreamingDFXPReader(), contents) == expected
+    assert fallbacks == []
+
+
+@pytest.mark.parametrize("body", FALLBACK.values(), ids=FALLBACK.keys())
+def test_unsupported_documents_fall_back(body, fallbacks):
+    contents = HEAD + body
+    expected = read_captions(DFXPReader(), contents)
+    fallbacks.clear()
+    assert read_captions(StreamingDFXPReader(), contents) == expected
+    assert fallbacks == [contents]
+
+
+def test_no_captions():
+    with pytest.raises(CaptionReadNoCaptions):
+        StreamingDFXPReader().read(HEAD + "<body><div><p> </p></div></body></tt>")
+
+
+def test_large_document(monkeypatch, fallbacks):
+    # Paragraphs split across several feeds of the parser are still read whole
+    monkeypatch.setattr("src.captioneditor.dfxp.FEED_SIZE", 100)
+    paragraphs = "".join(
+        f'<p begin="{index}s" end="{index}.5s">caption {index}<br/>line two</p>\n'
+        for index in range(500)
+    )
+    contents = HEAD + f"<body><div>{paragraphs}</div></body></tt>"
+    expected = read_captions(DFXPReader(), contents)
+    fallbacks.clear()
+    assert read_captions(StreamingDFXPReader(), contents) == expected
+    assert fallbacks == []
+
+
+def test_editor_reads_dfxp_with_streaming_reader():
+    editor = Editor(conversions_file=CONVERSIONS_FILE)
+    assert isinstance(editor.READERS[".dfxp"], StreamingDFXPReader)
+
+    contents = Path(INITIAL_CAPTIONS_ROOT + "test_dfxp.dfxp").read_text(encoding="utf8")
+    soup_editor = Editor(conversions_file=CONVERSIONS_FILE)
+    soup_editor.READERS = {".dfxp": DFXPReader()}
+    assert editor.edit_captions_text(
+        contents, ".dfxp"
+    ) == soup_editor.edit_captions_text(contents, ".dfxp")
+
+
+def test_styles_are_not_read():
+    contents = (
+        HEAD.replace(
+            "<head>",
+            '<head><styling><style xml:id="s1" tts:color="red"/></styling>',
+        )
+        + '<body><div><p begin="00:00:01.000" end="00:00:02.000" style="s1">one</p></div></body></tt>'
+    )
+    assert DFXPReader().read(contents).get_captions("en")[0].style
+    assert not StreamingDFXPReader().read(contents).get_captions("en")[0].style
+
+    # Edited captions do not keep styles, so the editor writes the same captions with either reader
+    editor = Editor(dest_file_extensions=[".dfxp", ".vtt"])
+    soup_editor = Editor(dest_file_extensions=[".dfxp", ".vtt"])
+    soup_editor.READERS = {".dfxp": DFXPReader()}
+    assert editor.edit_captions_text(
+        contents, ".dfxp"
+    ) == soup_editor.edit_captions_text(contents, ".dfxp")
@@ -0,0 +1,115 @@
+import pytest
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from src.captioneditor import Editor
+from src.captioneditor.formats import READER, WRITER, FormatRegistry, writer_groups
+from src.captioneditor.writers import FastWebVTTWriter
+from pycaption import DFXPReader
+from pathlib import Path
+import json
+
+VTT_CAPTIONS = "tests/test_data/initial_captions/test_vtt.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+
+def loaded_modules(code: str) -> list[str]:
+    # Modules imported by the tests themselves would hide what the package imports, so the code runs in a new interpreter
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            code
+            + "\nimport json, sys\nprint(json.dumps([name for name in ('pycaption', 'flashtext2') if name in sys.modules]))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def test_registry_creates_on_lookup():
+    readers = FormatRegistry(READER)
+    assert ".ttml" in readers
+    assert ".txt" not in readers
+    assert list(readers) == [".vtt", ".srt", ".ttml", ".dfxp"]
+    assert readers.loaded() == []
+
+    assert isinstance(readers[".ttml"], DFXPReader)
+    assert readers[".ttml"] is readers[".ttml"]
+    assert readers.loaded() == [".ttml"]
+
+    assert isinstance(FormatRegistry(WRITER)[".vtt"], FastWebVTTWriter)
+
+
+def test_import_is_lazy():
+    assert loaded_modules("import src.captioneditor.editor") == []
+
+
+def test_offset_only_stream_skips_pycaption_and_flashtext2(tmp_path):
+    dest = tmp_path / "streamed.vtt"
+    code = f"""
+from src.captioneditor import Editor
+editor = Editor({VTT_CAPTIONS!r}, offset=1000)
+with open({str(dest)!r}, "w", encoding="utf8") as dest:
+    editor.edit_captions_stream(dest=dest)
+"""
+    assert loaded_modules(code) == []
+    assert dest.read_text(encoding="utf8").startswith("WEBVTT")
+
+
+def test_offset_only_plain_captions_skip_pycaption(tmp_path):
+    # Captions that are only text are read from a memory map and written from the cue table, without pycaption
+    captions_file = tmp_path / "plain.vtt"
+    captions_file.write_text(
+        "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nPlain text\n", encoding="utf8"
+    )
+    code = f"""
+from src.captioneditor import Editor
+Editor({str(captions_file)!r}, offset=1000, dest_file_extensions=[".vtt", ".srt"]).edit_captions()
+"""
+    assert loaded_modules(code) == []
+    assert (tmp_path / "plain-converted.srt").read_text(
+        encoding="utf8"
+    ) == "1\n00:00:02,000 --> 00:00:03,000\nPlain text\n"
+
+
+def test_conversions_import_flashtext2():
+    code = f"""
+from src.captioneditor import Editor
+Editor(conversions_file={CONVERSIONS_FILE!r})
+"""
+    assert loaded_modules(code) == ["flashtext2"]
+
+
+def test_writer_groups():
+    assert writer_groups([".vtt", ".ttml", ".srt", ".dfxp"]) == [
+        [".vtt"],
+        [".ttml", ".dfxp"],
+        [".srt"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "executor_type", [None, ThreadPoolExecutor, ProcessPoolExecutor]
+)
+def test_concurrent_rendering_matches_text(tmp_path, executor_type):
+    editor = Editor(
+        VTT_CAPTIONS,
+        CONVERSIONS_FILE,
+        dest_file_extensions=[".vtt", ".srt", ".dfxp", ".ttml"],
+        dest_directory=tmp_path,
+    )
+    with ExitStack() as stack:
+        executor = executor_type and stack.enter_context(executor_type(max_workers=2))
+        stats = editor.edit_captions(executor)
+
+    expected = editor.edit_captions_text(Path(VTT_CAPTIONS).read_text(encoding="utf8"))
+    assert expected[".ttml"] == expected[".dfxp"]
+    for extension, contents in expected.items():
+        written = tmp_path / ("test_vtt-converted" + extension)
+        assert written.read_text(encoding="utf8") == contents
+        assert stats.bytes_out[extension] == len(contents.encode("utf8"))
+        assert extension in stats.write_times
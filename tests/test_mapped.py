@@ -0,0 +1,159 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.cues import CueTable
+from src.captioneditor.mapped import UnsupportedCaptions, read_mapped_cues
+from pathlib import Path
+
+TEST_FILES = [
+    "tests/test_data/initial_captions/test_vtt.vtt",
+    "tests/test_data/initial_captions/test_srt.srt",
+    "tests/test_data/test_captions.vtt",
+]
+
+
+def table(cues: CueTable) -> tuple[list, dict]:
+    return list(cues), {
+        row: [(node.type_, node.content) for node in nodes]
+        for row, nodes in cues.nodes.items()
+    }
+
+
+def assert_same_as_pycaption(captions_file: Path) -> CueTable:
+    cues, bytes_read = read_mapped_cues(captions_file, captions_file.suffix)
+    assert bytes_read == captions_file.stat().st_size
+    expected = Editor()._read_cues(
+        captions_file.read_text(encoding="utf8"), captions_file.suffix
+    )
+    assert table(cues) == table(expected)
+    return cues
+
+
+@pytest.mark.parametrize("captions_file", TEST_FILES)
+def test_test_files_match_pycaption(captions_file):
+    assert len(assert_same_as_pycaption(Path(captions_file))) == 841
+
+
+@pytest.mark.parametrize(
+    "captions_type, contents",
+    [
+        (".vtt", "WEBVTT\r\n\r\n00:01.000 --> 00:02.000\r\none\r\ntwo\r\n"),
+        (".vtt", "\ufeffWEBVTT - header\n\n1:00:01.000 --> 1:00:02.500 \nStraße ♪\n"),
+        (
+            ".vtt",
+            "WEBVTT\n\nNOTE a --> b\nstill a note\n\nid\n00:01.000 --> 00:02.000\n  spaced  \n\n\n"
+            "00:03.000 --> 00:04.000\n\xa0nbsp\xa0\n00:05.000 --> 00:06.000\nno blank line\n",
+        ),
+        (
+            ".vtt",
+            "WEBVTT\n\n00:01.000 --> 00:02.000\n   \nfirst line blank\n\n"
+            "00:03.000 --> 00:04.000\na &amp; b&#10;c\n   \n\n00:05.000 --> 00:06.000\n\n",
+        ),
+        (
+            ".srt",
+            "1\r\n00:00:01,000 --> 00:00:02,000\r\none\r\n\r\n2\r\n00:00:03,5 --> 00:00:04\r\ntwo\r\n",
+        ),
+        (
+            ".srt",
+            "1\n00:00:01,000 --> 00:00:02,000\n\n  \ntext\n\n\n2\n00:00:03,000 --> 00:00:04,000\n\n\n",
+        ),
+        (
+            ".srt",
+            "1\n00:00:01,000 --> 00:00:02,000\nfirst\n\n2\n00:00:03,000 --> 00:00:04,000\n\nnot a number\n",
+        ),
+        (".srt", "\n1\n00:00:01,000 --> 00:00:02,000\nafter a blank line\n"),
+        (".srt", "\u0661\n00:00:01,000 --> 00:00:02,000\n\u3000\nStraße\n"),
+    ],
+)
+def test_edge_cases_match_pycaption(tmp_path, captions_type, contents):
+    captions_file = tmp_path / f"captions{captions_type}"
+    captions_file.write_bytes(contents.encode("utf8"))
+    assert_same_as_pycaption(captions_file)
+
+
+@pytest.mark.parametrize(
+    "captions_type, contents",
+    [
+        (".vtt", "WEBVTT\n\n00:01.000 --> 00:02.000\n<i>styled</i>\n"),
+        (".vtt", "WEBVTT\n\n00:01.000 --> 00:02.000 align:start\ntext\n"),
+        (
+            ".vtt",
+            "WEBVTT\n\nSTYLE\n::cue { color: red }\n\n00:01.000 --> 00:02.000\ntext\n",
+        ),
+        (".vtt", "WEBVTT\n00:01.000 --> 00:02.000\nno blank line after the header\n"),
+        (".vtt", "WEBVTT\r\r00:01.000 --> 00:02.000\rold Mac line breaks\r"),
+        (".srt", "1\n00:00:01.000 --> 00:00:02.000\nperiod before milliseconds\n"),
+        (".srt", "1\n00:00:01,000 --> 00:00:02,000\nline\u2028separator\n"),
+        (".srt", "1\n00:00:01,000 --> 00:00:02,000\nencoded twice: Ã©\n"),
+        (".srt", ""),
+        (".dfxp", "<tt></tt>"),
+    ],
+    ids=[
+        "tags",
+        "cue settings",
+        "style block",
+        "invalid header",
+        "carriage returns",
+        "invalid timing",
+        "line separator",
+        "double encoding",
+        "empty",
+        "dfxp",
+    ],
+)
+def test_unsupported_captions(tmp_path, captions_type, contents):
+    captions_file = tmp_path / f"captions{captions_type}"
+    captions_file.write_bytes(contents.encode("utf8"))
+    with pytest.raises(UnsupportedCaptions):
+        read_mapped_cues(captions_file, captions_type)
+
+
+def test_invalid_utf8(tmp_path):
+    captions_file = tmp_path / "captions.srt"
+    captions_file.write_bytes(b"1\n00:00:01,000 --> 00:00:02,000\n\xff\xfe\n")
+    with pytest.raises(UnicodeDecodeError):
+        read_mapped_cues(captions_file, ".srt")
+
+
+def test_ranges(tmp_path):
+    captions_file = tmp_path / "captions.vtt"
+    contents = "WEBVTT\n\n00:01.000 --> 00:02.000\none\n\n00:03.000 --> 00:04.000\ntwo\n\n00:05.000 --> 00:06.000\nthree\n"
+    captions_file.write_text(contents, encoding="utf8")
+    second = contents.index("00:03")
+    third = contents.index("00:05")
+
+    cues, bytes_read = read_mapped_cues(
+        captions_file, ".vtt", [(0, 8), (second, third)]
+    )
+    assert list(cues) == [(3000, 4000, "two")]
+    assert bytes_read == 8 + third - second
+
+    cues, _ = read_mapped_cues(captions_file, ".vtt", [(0, 8), (third, None)])
+    assert list(cues) == [(5000, 6000, "three")]
+
+
+@pytest.mark.parametrize("captions_file", TEST_FILES[:2])
+def test_windowed_edit_matches_whole_file(tmp_path, captions_file):
+    outputs = []
+    bytes_read = []
+    for assume_sorted in (True, False):
+        directory = tmp_path / str(assume_sorted)
+        directory.mkdir()
+        editor = Editor(
+            captions_file,
+            offset=-2000,
+            window_start=60,
+            window_end=600,
+            assume_sorted=assume_sorted,
+            dest_directory=directory,
+            dest_file_extensions=[".vtt", ".srt"],
+        )
+        stats = editor.edit_captions()
+        outputs.append(
+            [path.read_text(encoding="utf8") for path in sorted(directory.iterdir())]
+        )
+        bytes_read.append(stats.bytes_in[Path(captions_file).suffix])
+
+    assert outputs[0] == outputs[1]
+
+    # The sorted captions were read from the window alone
+    assert bytes_read[0] < bytes_read[1] == Path(captions_file).stat().st_size
@@ -0,0 +1,206 @@
+import random
+import pytest
+from flashtext2 import KeywordProcessor
+from src.captioneditor.conversions import parse_conversions
+from src.captioneditor import Editor
+from src.captioneditor.matching import CaptionCache, ConversionMatcher
+
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+# Keys that start with other keys, such as 'a b c', are only partly matched by many captions
+WORDS = [
+    "a",
+    "b",
+    "c",
+    "A",
+    "B",
+    "C",
+    "a b",
+    "B c",
+    "a b c",
+    "ab",
+    "x",
+    "one",
+    "One",
+    "ONE",
+]
+
+
+def sequential_process(conversions, caption_text, previous_caption_keys):
+    # Every pass run separately over the whole caption, as the editor originally did
+    if caption_text in conversions.direct:
+        return conversions.direct[caption_text], previous_caption_keys
+
+    case_insensitive = KeywordProcessor(case_sensitive=False)
+    for key, replacement in conversions.case_insensitive:
+        case_insensitive.add_keyword(key, replacement)
+    case_sensitive = KeywordProcessor(case_sensitive=True)
+    for key, replacement in conversions.case_sensitive:
+        case_sensitive.add_keyword(key, replacement)
+    previous_keys = KeywordProcessor(case_sensitive=True)
+    for previous in conversions.previous:
+        previous_keys.add_keyword(previous)
+
+    caption_text = case_insensitive.replace_keywords(caption_text)
+    caption_text = case_sensitive.replace_keywords(caption_text)
+    for previous in previous_caption_keys:
+        processor = KeywordProcessor(case_sensitive=True)
+        for key, replacement in conversions.previous[previous]:
+            processor.add_keyword(key, replacement)
+        caption_text = processor.replace_keywords(caption_text)
+
+    return caption_text, previous_keys.extract_keywords(caption_text)
+
+
+def random_conversions(rng):
+    conversions = []
+    for _ in range(rng.randint(1, 8)):
+        conversion = {"key": rng.choice(WORDS), "replacement": rng.choice(WORDS)}
+        kind = rng.choice(["caseSensitive", "previous", "directConversion", None])
+        if kind == "previous":
+            conversion["previous"] = rng.choice(WORDS)
+        elif kind:
+            conversion[kind] = True
+        conversions.append(conversion)
+    return parse_conversions({"conversions": conversions})
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_sequential_passes(seed):
+    rng = random.Random(seed)
+    conversions = random_conversions(rng)
+    matcher = ConversionMatcher(conversions)
+
+    expected_keys = actual_keys = []
+    for _ in range(50):
+        caption_text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+        expected_text, expected_keys = sequential_process(
+            conversions, caption_text, expected_keys
+        )
+        actual_text, actual_keys = matcher.process(caption_text, actual_keys)
+        assert (actual_text, actual_keys) == (expected_text, expected_keys)
+
+
+@pytest.mark.parametrize(
+    "conversions, caption_text, expected",
+    [
+        (
+            [
+                {"key": "alright", "replacement": "all right"},
+                {
+                    "key": "see you alright then",
+                    "replacement": "bye",
+                    "caseSensitive": True,
+                },
+            ],
+            "see you alright",
+            "see you all right",
+        ),
+        (
+            [
+                {"key": "b", "replacement": "B", "caseSensitive": True},
+                {"key": "a b c", "replacement": "abc"},
+            ],
+            "a b",
+            "a B",
+        ),
+        (
+            [
+                {"key": "b", "replacement": "B"},
+                {"key": "c", "replacement": "C", "previous": "a b c"},
+            ],
+            "a b",
+            "a B",
+        ),
+    ],
+)
+def test_key_inside_partly_matched_key_of_another_pass(
+    conversions, caption_text, expected
+):
+    matcher = ConversionMatcher(parse_conversions({"conversions": conversions}))
+    assert matcher.process(caption_text, [])[0] == expected
+
+
+@pytest.mark.parametrize(
+    "caption_text, expected",
+    [
+        ("a b a", ("x B x", {"case_insensitive": 2, "case_sensitive": 1})),
+        ("b", ("B", {"case_sensitive": 1})),
+        ("same", ("same", {"case_insensitive": 1})),
+        ("a\uffffb a", ("x\uffffB x", {"case_insensitive": 2, "case_sensitive": 1})),
+        ("none", ("none", {})),
+    ],
+    ids=["both passes", "one pass", "unchanged text", "mark in caption", "no match"],
+)
+def test_replacements_counted(caption_text, expected):
+    # Replacements are counted from the replaced text, including ones that leave the text as it was
+    matcher = ConversionMatcher(
+        parse_conversions(
+            {
+                "conversions": [
+                    {"key": "a", "replacement": "x"},
+                    {"key": "same", "replacement": "same"},
+                    {"key": "b", "replacement": "B", "caseSensitive": True},
+                ]
+            }
+        )
+    )
+    replacements = {}
+    text, _ = matcher.process(caption_text, [], replacements)
+    assert (text, replacements) == expected
+
+
+def test_previous_processors_built_on_first_use():
+    conversions = parse_conversions(
+        {
+            "conversions": [
+                {"key": "one", "replacement": "1", "previous": "count"},
+                {"key": "two", "replacement": "2", "previous": "count"},
+                {"key": "three", "replacement": "3", "previous": "unused"},
+            ]
+        }
+    )
+    matcher = ConversionMatcher(conversions)
+    assert matcher.process("count", []) == ("count", ["count"])
+    assert matcher.process("one two", ["count"]) == ("1 2", [])
+    assert list(matcher._previous_captions_processors) == ["count"]
+
+
+def test_unmatched_caption_keeps_text():
+    matcher = ConversionMatcher(
+        parse_conversions(
+            {"conversions": [{"key": "alright", "replacement": "all right"}]}
+        )
+    )
+    assert matcher.process("nothing to see here", ["stale"]) == (
+        "nothing to see here",
+        [],
+    )
+
+
+def test_caption_cache_evicts_least_recently_used():
+    cache = CaptionCache(2)
+    cache.put("a", [], ("A", []))
+    cache.put("b", ["key"], ("B", []))
+    assert cache.get("b", []) is None
+    assert cache.get("a", []) == ("A", [])
+    cache.put("c", [], ("C", []))
+
+    assert cache.get("b", ["key"]) is None
+    assert cache.get("a", []) == ("A", [])
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 2)
+
+    cache.clear()
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+
+
+def test_editor_caches_repeated_captions():
+    editor = Editor(conversions_file=CONVERSIONS_FILE)
+    uncached_editor = Editor(conversions_file=CONVERSIONS_FILE, caption_cache_size=0)
+    captions = ["[MUSIC]", "everyone", "Marcela alright", "[MUSIC]"] * 3
+
+    assert [editor._process_caption_contents(text) for text in captions] == [
+        uncached_editor._process_caption_contents(text) for text in captions
+    ]
+    # Only the first '[MUSIC]', 'everyone', and 'Marcela alright' following 'everyone' are processed
+    assert (editor.caption_cache.hits, editor.caption_cache.misses) == (9, 3)
+    assert len(uncached_editor.caption_cache) == 0
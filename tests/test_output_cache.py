@@ -0,0 +1,180 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.batch import edit_captions_batch
+from src.captioneditor.editor import main
+from src.captioneditor.output_cache import OutputCache, output_cache_key
+from pathlib import Path
+import json
+import os
+
+VTT_CAPTIONS = "tests/test_data/initial_captions/test_vtt.vtt"
+EMPTY_CAPTIONS_FILE = "tests/test_data/initial_captions/empty.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+EXTENSIONS = [".vtt", ".srt", ".dfxp"]
+
+
+@pytest.fixture()
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("CAPTIONEDITOR_CACHE_DIR", str(cache_dir))
+    yield cache_dir / "outputs"
+
+
+@pytest.fixture()
+def captions_file(tmp_path):
+    path = tmp_path / "captions.vtt"
+    path.write_text(Path(VTT_CAPTIONS).read_text(encoding="utf8"), encoding="utf8")
+    yield path
+
+
+def cached_editor(captions_file: Path, **options) -> Editor:
+    return Editor(
+        captions_file,
+        CONVERSIONS_FILE,
+        dest_file_extensions=EXTENSIONS,
+        use_output_cache=True,
+        **options,
+    )
+
+
+def read_outputs(captions_file: Path) -> dict[str, str]:
+    return {
+        extension: captions_file.with_name("captions-converted" + extension).read_text(
+            encoding="utf8"
+        )
+        for extension in EXTENSIONS
+    }
+
+
+def test_cached_outputs_match_edit(cache_dir, captions_file):
+    stats = cached_editor(captions_file).edit_captions()
+    assert not stats.output_cache_hit
+    outputs = read_outputs(captions_file)
+    assert len(list(cache_dir.iterdir())) == len(EXTENSIONS) + 1
+
+    for extension in EXTENSIONS:
+        captions_file.with_name("captions-converted" + extension).unlink()
+
+    cached_stats = cached_editor(captions_file).edit_captions()
+    assert cached_stats.output_cache_hit
+    assert read_outputs(captions_file) == outputs
+    assert cached_stats.captions_written == stats.captions_written
+    assert cached_stats.replacements == stats.replacements
+    assert cached_stats.bytes_out == stats.bytes_out
+    assert set(cached_stats.stage_times) == {"output cache"}
+
+
+def test_key_changes_with_inputs(cache_dir, captions_file):
+    key = output_cache_key(cached_editor(captions_file))
+    assert output_cache_key(cached_editor(captions_file)) == key
+
+    assert output_cache_key(cached_editor(captions_file, cutoff=30)) != key
+    assert output_cache_key(cached_editor(captions_file, window_start=5)) != key
+    assert output_cache_key(cached_editor(captions_file, offset=500)) != key
+
+    editor = cached_editor(captions_file)
+    editor._dest_filetypes = [".vtt"]
+    assert output_cache_key(editor) != key
+
+    editor = cached_editor(captions_file)
+    editor._conversions.case_insensitive.append(("fitness", "FITNESS"))
+    assert output_cache_key(editor) != key
+
+    with open(captions_file, "a", encoding="utf8") as f:
+        f.write("\n00:10:00.000 --> 00:10:01.000\nadded\n")
+    assert output_cache_key(cached_editor(captions_file)) != key
+
+
+def test_changed_captions_are_edited_again(cache_dir, captions_file):
+    cached_editor(captions_file).edit_captions()
+
+    contents = captions_file.read_text(encoding="utf8")
+    captions_file.write_text(
+        contents.replace("Virtual Boxing Fitness.", "Virtual boxing, and more."),
+        encoding="utf8",
+    )
+    stats = cached_editor(captions_file).edit_captions()
+    assert not stats.output_cache_hit
+    assert "Virtual boxing, and more." in read_outputs(captions_file)[".vtt"]
+
+
+def test_cache_is_opt_in(cache_dir, captions_file):
+    Editor(captions_file, CONVERSIONS_FILE).edit_captions()
+    assert not cache_dir.exists()
+
+    main([str(captions_file), "-c", CONVERSIONS_FILE])
+    assert not cache_dir.exists()
+
+    main([str(captions_file), "-c", CONVERSIONS_FILE, "--cache"])
+    assert cache_dir.is_dir()
+
+
+def test_empty_captions_are_not_cached(cache_dir, tmp_path):
+    stats = Editor(
+        EMPTY_CAPTIONS_FILE,
+        CONVERSIONS_FILE,
+        dest_directory=tmp_path,
+        use_output_cache=True,
+    ).edit_captions()
+    assert stats.captions_written == 0
+    assert not cache_dir.exists()
+
+
+def test_incomplete_entry_is_ignored(cache_dir, captions_file):
+    editor = cached_editor(captions_file)
+    editor.edit_captions()
+    (cache_dir / (output_cache_key(editor) + ".srt")).unlink()
+
+    assert not cached_editor(captions_file).edit_captions().output_cache_hit
+    assert cached_editor(captions_file).edit_captions().output_cache_hit
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = OutputCache(tmp_path / "outputs", max_size=1000)
+    output = tmp_path / "output.vtt"
+    output.write_text("x" * 300)
+
+    for number, key in enumerate(["a", "b", "c"]):
+        cache.store(key, {".vtt": output}, {})
+        os.utime(tmp_path / "outputs" / f"{key}.json", (number, number))
+
+    # Using the oldest entry makes the second one the least recently used
+    assert cache.load("a", {".vtt": tmp_path / "copy.vtt"}) == {}
+    assert cache.evict(700) <= 700
+    assert sorted(path.stem for path in (tmp_path / "outputs").iterdir()) == [
+        "a",
+        "a",
+        "c",
+        "c",
+    ]
+    assert cache.load("b", {".vtt": tmp_path / "copy.vtt"}) is None
+
+    # Storing past the limit evicts down to three quarters of it
+    cache.store("d", {".vtt": output}, {})
+    cache.store("e", {".vtt": output}, {})
+    assert sum(path.stat().st_size for path in (tmp_path / "outputs").iterdir()) <= 750
+
+
+def test_batch_uses_cache(cache_dir, tmp_path):
+    options = {
+        "conversions_file": CONVERSIONS_FILE,
+        "dest_directory": tmp_path,
+        "use_output_cache": True,
+        "workers": 1,
+    }
+    first = edit_captions_batch([VTT_CAPTIONS], **options)
+    second = edit_captions_batch([VTT_CAPTIONS], **options)
+
+    assert first.output_cache_hits == 0
+    assert second.output_cache_hits == 1
+    assert second.captions == first.captions
+
+
+def test_cli_stats_report_hit(cache_dir, captions_file, capsys):
+    main([str(captions_file), "-c", CONVERSIONS_FILE, "--stats", "--cache"])
+    assert not json.loads(capsys.readouterr().out)["output_cache_hit"]
+
+    main([str(captions_file), "-c", CONVERSIONS_FILE, "--stats", "--cache"])
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["output_cache_hit"]
+    assert stats["captions_written"] > 0
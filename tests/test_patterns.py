@@ -0,0 +1,281 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.conversions import CompiledConversions, parse_conversions
+from src.captioneditor.matching import ConversionMatcher
+from src.captioneditor.patterns import (
+    RegexConversions,
+    compile_regex_conversions,
+    required_literal,
+)
+from src.captioneditor.watch import changed_conversions
+import itertools
+import json
+import re
+
+RULES = (
+    (r"\bMr\.?(?=\s)", "Mister", False),
+    (r"(\d+)\s*km\b", r"\1 kilometres", False),
+    (r"\b(?P<hour>\d{1,2}):(?P<minute>\d\d) ?pm\b", r"\g<hour>.\g<minute> p.m.", True),
+    (r"\bgonna\b", "going to", False),
+    (r"colou?r", "COLOR", True),
+    (r"\d+", "#", False),
+)
+
+TEXTS = [
+    "Mr Smith ran 5km at 3:30 pm, mr. Jones ran 10 KM at 4:00 PM.",
+    "We're gonna paint it colour, not Colour or color.",
+    "No numbers or titles here",
+    "Mr. 5 km",
+    "Straße ſtraße 12 km",
+    "",
+]
+
+
+def test_parse_regex_conversions():
+    compiled = parse_conversions(
+        {
+            "conversions": [
+                {"key": r"\d+", "replacement": "#", "regex": True},
+                {
+                    "key": "Mr",
+                    "replacement": "Mister",
+                    "regex": True,
+                    "caseSensitive": True,
+                },
+                {"key": "plain", "replacement": "PLAIN"},
+            ]
+        }
+    )
+    assert compiled.regex == [(r"\d+", "#", False), ("Mr", "Mister", True)]
+    assert compiled.case_insensitive == [("plain", "PLAIN")]
+
+
+@pytest.mark.parametrize(
+    "conversions",
+    [
+        [{"key": "(", "replacement": "", "regex": True}],
+        [{"key": "a", "replacement": r"\1", "regex": True}],
+        [{"key": "(?P<word>a)", "replacement": r"\g<other>", "regex": True}],
+    ],
+    ids=["invalid pattern", "missing group", "missing group name"],
+)
+def test_invalid_regex_conversions(conversions):
+    with pytest.raises(ValueError):
+        parse_conversions({"conversions": conversions})
+
+
+def test_replace():
+    conversions = RegexConversions(RULES)
+    assert conversions.replace(TEXTS[0]) == (
+        "Mister Smith ran 5 kilometres at 3.30 p.m., Mister Jones ran 10 kilometres at #:# PM.",
+        7,
+    )
+
+    # The text a conversion is replaced with is not searched again, and the first conversion that matches at a position wins
+    assert RegexConversions(
+        (("a", "ab", False), ("b", "c", False), ("ab", "x", False))
+    ).replace("abab") == ("abcabc", 4)
+
+
+def test_matches():
+    conversions = RegexConversions(RULES)
+    assert conversions.matches(TEXTS[0]) == [0, 1, 2, 0, 1, 5, 5]
+    assert conversions.matches("only 12 here") == [5]
+    assert RegexConversions(
+        (("a", "ab", False), ("b", "c", False), ("ab", "x", False))
+    ).matches("abab") == [0, 1, 0, 1]
+
+    for text in TEXTS:
+        assert len(conversions.matches(text)) == conversions.replace(text)[1]
+
+
+def test_candidates_give_the_same_result_as_every_conversion():
+    conversions = RegexConversions(RULES)
+    pattern, groups = conversions._combined(tuple(range(len(RULES))))
+
+    def replacement(match):
+        rule_pattern, rule_replacement = conversions._rules[groups[match.lastindex]][:2]
+        return rule_pattern.match(match.string, match.start()).expand(rule_replacement)
+
+    for text in TEXTS:
+        assert conversions.replace(text) == pattern.subn(replacement, text)
+
+
+@pytest.mark.parametrize(
+    "rules, text, expected",
+    [
+        ([(r"(\w)\1", "X", True)], "aab", ("Xb", 1)),
+        ([("zz", "", True), (r"(\d)-\1", "D", True)], "zz 5-5 5-6", (" D 5-6", 2)),
+        (
+            [("zz", "", True), (r"(\d)-\1", "D", True), ("k", "K", True)],
+            "zz 5-5 k",
+            (" D K", 3),
+        ),
+        (
+            [
+                (r"(<)?(a)(?(1)>)", r"[\2]", False),
+                (r"(\d)\101", "octal", True),
+                (r"(x)[\1]\1", "y", True),
+                (r"(?P<quote>['\"])(\w+)(?P=quote)", r"<\2>", True),
+            ],
+            "<A> a<a 1A xx x\x01x 'hi' 'no\"",
+            ("[A] [a]<[a] octal xx y <hi> 'no\"", 6),
+        ),
+    ],
+    ids=["one conversion", "after another conversion", "subset", "references"],
+)
+def test_group_references(rules, text, expected):
+    conversions = RegexConversions(tuple(rules))
+    assert conversions.replace(text) == expected
+
+    # Every set of the conversions can be combined, and each matches the same text in it as on its own
+    for indexes in itertools.combinations(range(len(rules)), 2):
+        pattern, groups = conversions._combined(indexes)
+        for match in pattern.finditer(text):
+            rule_pattern = conversions._rules[groups[match.lastindex]][0]
+            assert rule_pattern.match(text, match.start()).group() == match.group()
+
+
+@pytest.mark.parametrize(
+    "rules, text, expected",
+    [
+        (
+            [(r"(?i)mr\.?", "Mister", True), ("smith", "SMITH", True)],
+            "MR. smith mr Smith",
+            ("Mister SMITH Mister Smith", 3),
+        ),
+        (
+            [
+                (r"(?x) (\d+) \s* km  # distance", r"\1 kilometres", True),
+                ("a", "b", True),
+            ],
+            "5 km a",
+            ("5 kilometres b", 2),
+        ),
+        (
+            [
+                (r"(?P<word>\w+)-(?P=word)", r"\g<word>", True),
+                (r"(?P<word>\d+)%", r"\g<word> percent", True),
+            ],
+            "bye-bye 5% no-yes",
+            ("bye 5 percent no-yes", 2),
+        ),
+        (
+            [("a(?i)b", "x", True), ("c", "y", True)],
+            None,
+            None,
+        ),
+    ],
+    ids=["global flag", "verbose", "same group name", "flags not at the start"],
+)
+def test_patterns_combined_in_isolation(rules, text, expected):
+    if text is None:
+        # A pattern that re rejects on its own is still reported when the conversions are loaded
+        with pytest.raises(ValueError):
+            RegexConversions(tuple(rules))
+        return
+
+    conversions = RegexConversions(tuple(rules))
+    assert conversions._separate == []
+    assert conversions.replace(text) == expected
+    assert len(conversions.matches(text)) == expected[1]
+
+
+def test_pattern_applied_on_its_own(monkeypatch):
+    # A conversion whose pattern cannot be combined is applied after the others, rather than rejecting the file
+    conversions = RegexConversions(
+        (("a", "b", True), (r"(?i)b", "c", True), ("c", "d", True))
+    )
+    monkeypatch.setattr(conversions, "_separate", [1])
+    monkeypatch.setattr(conversions, "_literals", [(0, "a", True), (2, "c", True)])
+    assert conversions.replace("a B c") == ("c c d", 4)
+    assert conversions.matches("a B c") == [0, 2, 1, 1]
+
+
+@pytest.mark.parametrize(
+    "pattern, flags, literal",
+    [
+        (r"\bMr\.?(?=\s)", re.IGNORECASE, "mr"),
+        (r"\b(alright)+\b", 0, "alright"),
+        (r"x(?:abc)?yz", 0, "yz"),
+        (r"(?i:ABC)d", 0, "d"),
+        (r"a|b", 0, None),
+        (r"ſ", re.IGNORECASE, None),
+        (r"ſ", 0, "ſ"),
+    ],
+)
+def test_required_literal(pattern, flags, literal):
+    assert required_literal(re.compile(pattern, flags)) == literal
+
+
+def test_compiled_patterns_are_cached():
+    assert compile_regex_conversions(RULES) is compile_regex_conversions(RULES)
+
+
+def test_regex_conversions_come_before_keys():
+    matcher = ConversionMatcher(
+        CompiledConversions(
+            case_insensitive=[("kilometres", "kilometers")],
+            previous={"Mister": [("Smith", "SMITH")]},
+            regex=list(RULES),
+        )
+    )
+    replacements = {}
+    text, keys = matcher.process("Mr Smith ran 5km", [], replacements)
+    assert text == "Mister Smith ran 5 kilometers"
+    assert keys == ["Mister"]
+    assert replacements == {"regex": 2, "case_insensitive": 1}
+
+    assert matcher.process("Smith", keys)[0] == "SMITH"
+
+    # Captions without any key are still searched with the regex conversions
+    assert ConversionMatcher(CompiledConversions(regex=list(RULES))).process(
+        "3 km", []
+    ) == ("3 kilometres", [])
+
+
+def test_editor_with_regex_conversions(tmp_path):
+    conversions_file = tmp_path / "conversions.json"
+    conversions_file.write_text(
+        json.dumps(
+            {
+                "conversions": [
+                    {
+                        "key": r"\b(\d+)-(\d+)\b",
+                        "replacement": r"\1 to \2",
+                        "regex": True,
+                    }
+                ]
+            }
+        )
+    )
+    captions_file = tmp_path / "captions.vtt"
+    captions_file.write_text(
+        "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nPages 10-20\n", encoding="utf8"
+    )
+
+    stats = Editor(captions_file, conversions_file).edit_captions()
+    assert stats.replacements == {"regex": 1}
+    assert "Pages 10 to 20" in (tmp_path / "captions-converted.vtt").read_text(
+        encoding="utf8"
+    )
+
+
+def test_changed_regex_conversions_change_every_caption():
+    old = CompiledConversions(regex=[(r"\d+", "#", False)])
+    words, _ = changed_conversions(
+        old, CompiledConversions(regex=[(r"\d+", "0", False)])
+    )
+    assert "" in words
+
+    # A regex replacement that could produce a changed key also changes every caption
+    new = CompiledConversions(
+        regex=[(r"\d+", "#", False)], case_insensitive=[("#", "number")]
+    )
+    assert "" in changed_conversions(old, new)[0]
+    assert changed_conversions(
+        old,
+        CompiledConversions(
+            regex=[(r"\d+", "#", False)], case_insensitive=[("a", "b")]
+        ),
+    )[0] == {"a"}
@@ -0,0 +1,204 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.conversions import parse_conversions
+from src.captioneditor.conversions_store import build_conversions_store
+from src.captioneditor.editor import main
+from src.captioneditor.profiling import (
+    ProfilingMatcher,
+    find_conflicts,
+    profile_conversions,
+)
+import json
+
+CONVERSIONS = {
+    "conversions": [
+        {"key": "[MUSIC]", "replacement": "♪", "directConversion": True},
+        {"key": "[NEVER]", "replacement": "", "directConversion": True},
+        {"key": r"(\d+) ?km", "replacement": r"\1 kilometres", "regex": True},
+        {"key": r"\d+ ?miles", "replacement": "far", "regex": True},
+        {"key": "alright", "replacement": "all right"},
+        {"key": "Alright", "replacement": "ALL RIGHT"},
+        {"key": "okay", "replacement": "OK"},
+        {"key": "okay", "replacement": "OK", "caseSensitive": True},
+        {"key": "gonna", "replacement": "going to", "caseSensitive": True},
+        {"key": "Marcela", "replacement": "Marcella", "previous": "everyone"},
+        {"key": "Jon", "replacement": "John", "previous": "everyone"},
+        {"key": "Jon", "replacement": "Jonathan", "previous": "Jon"},
+    ]
+}
+
+CAPTIONS = [
+    "[MUSIC]",
+    "hello everyone, we're gonna run 5km",
+    "Marcela, ALRIGHT?",
+    "okay, okay",
+    "[MUSIC]",
+]
+
+
+def captions_file(tmp_path):
+    path = tmp_path / "captions.vtt"
+    path.write_text(
+        "WEBVTT\n\n"
+        + "\n".join(
+            f"00:0{index}.000 --> 00:0{index}.500\n{text}\n"
+            for index, text in enumerate(CAPTIONS)
+        ),
+        encoding="utf8",
+    )
+    return path
+
+
+@pytest.fixture()
+def conversions_file(tmp_path):
+    path = tmp_path / "conversions.json"
+    path.write_text(json.dumps(CONVERSIONS), encoding="utf8")
+    return path
+
+
+def test_profiling_matcher_matches_conversion_matcher(conversions_file):
+    editor = Editor(conversions_file=conversions_file, caption_cache_size=0)
+    profiled_editor = Editor(conversions_file=conversions_file, caption_cache_size=0)
+    profiled_editor._matcher = ProfilingMatcher(profiled_editor._conversions)
+
+    for text in CAPTIONS * 2:
+        replacements = {}
+        profiled_replacements = {}
+        assert profiled_editor._process_caption_contents(
+            text, profiled_replacements
+        ) == editor._process_caption_contents(text, replacements)
+        assert profiled_editor._previous_caption_keys == editor._previous_caption_keys
+        assert profiled_replacements == replacements
+
+
+def test_profile_conversions(tmp_path, conversions_file):
+    profile = profile_conversions([captions_file(tmp_path)], conversions_file)
+    assert (profile.files, profile.captions) == (1, len(CAPTIONS))
+
+    hits = {
+        (rule.kind, rule.key, rule.replacement, rule.previous): rule.hits
+        for rule in profile.rules
+    }
+    assert hits == {
+        ("direct", "[MUSIC]", "♪", ""): 2,
+        ("direct", "[NEVER]", "", ""): 0,
+        ("regex", r"(\d+) ?km", r"\1 kilometres", ""): 1,
+        ("regex", r"\d+ ?miles", "far", ""): 0,
+        ("case_insensitive", "alright", "all right", ""): 0,
+        ("case_insensitive", "Alright", "ALL RIGHT", ""): 1,
+        ("case_insensitive", "okay", "OK", ""): 2,
+        ("case_sensitive", "okay", "OK", ""): 0,
+        ("case_sensitive", "gonna", "going to", ""): 1,
+        ("previous", "Marcela", "Marcella", "everyone"): 1,
+        ("previous", "Jon", "John", "everyone"): 0,
+        ("previous", "Jon", "Jonathan", "Jon"): 0,
+    }
+    assert [str(rule) for rule in profile.dead_rules][:2] == [
+        "direct '[NEVER]' -> ''",
+        r"regex '\\d+ ?miles' -> 'far'",
+    ]
+
+    # The 'Jon' processor is never run, since no caption contains 'Jon'
+    assert [
+        (previous.previous, previous.rules, previous.runs, previous.hits)
+        for previous in profile.previous
+    ] == [("everyone", 2, 1, 1), ("Jon", 1, 0, 0)]
+
+    # Every bit of the time spent processing captions is attributed somewhere
+    attributed = sum(rule.time for rule in profile.rules)
+    assert attributed + sum(profile.unattributed.values()) == pytest.approx(
+        profile.time
+    )
+    assert all(rule.time > 0 for rule in profile.rules if rule.hits)
+
+
+@pytest.mark.parametrize(
+    "captions_file",
+    [
+        "tests/test_data/initial_captions/test_vtt.vtt",
+        "tests/test_data/initial_captions/test_dfxp.dfxp",
+    ],
+)
+def test_profile_conversions_ignores_cutoff(tmp_path, captions_file):
+    conversions_file = tmp_path / "conversions.json"
+    conversions_file.write_text(
+        json.dumps(dict(CONVERSIONS, cutoff=10)), encoding="utf8"
+    )
+    profile = profile_conversions([captions_file], conversions_file)
+    assert profile.captions == 841
+
+
+def test_find_conflicts():
+    matcher = ProfilingMatcher(
+        parse_conversions(
+            {
+                "conversions": CONVERSIONS["conversions"]
+                + [
+                    {"key": "(\\d+) ?km", "replacement": "KM", "regex": True},
+                    {"key": "gonna", "replacement": "gon'", "previous": "Jon"},
+                ]
+            }
+        )
+    )
+    conflicts = [
+        (
+            conflict.reason,
+            [
+                (matcher.rules[index].kind, matcher.rules[index].replacement)
+                for index in conflict.rules
+            ],
+        )
+        for conflict in find_conflicts(matcher.rules)
+    ]
+    assert conflicts == [
+        (
+            "same key, only the first is replaced",
+            [("regex", r"\1 kilometres"), ("regex", "KM")],
+        ),
+        (
+            "same key, only the last is replaced",
+            [("case_insensitive", "all right"), ("case_insensitive", "ALL RIGHT")],
+        ),
+        (
+            "same key with and without case sensitivity",
+            [("case_insensitive", "OK"), ("case_sensitive", "OK")],
+        ),
+    ]
+
+
+def test_profile_conversions_store(tmp_path, conversions_file):
+    store = build_conversions_store(conversions_file)
+    expected = profile_conversions([captions_file(tmp_path)], conversions_file)
+    profile = profile_conversions([tmp_path / "*.vtt"], store)
+    assert sorted((rule.kind, rule.key, rule.hits) for rule in profile.rules) == sorted(
+        (rule.kind, rule.key, rule.hits) for rule in expected.rules
+    )
+
+
+def test_profile_conversions_cli(tmp_path, conversions_file, capsys):
+    output = tmp_path / "profile.json"
+    main(
+        [
+            "profile-conversions",
+            str(captions_file(tmp_path)),
+            "-c",
+            str(conversions_file),
+            "-o",
+            str(output),
+        ]
+    )
+    printed = capsys.readouterr().out
+    assert printed.startswith("Processed 5 captions from 1 files with 12 rules")
+    assert "Rules that never fired: 6" in printed
+    assert "Conflicting rules: 2" in printed
+
+    profile = json.loads(output.read_text(encoding="utf8"))
+    assert len(profile["rules"]) == 12
+    assert [profile["rules"][index]["key"] for index in profile["dead_rules"]] == [
+        "[NEVER]",
+        r"\d+ ?miles",
+        "alright",
+        "okay",
+        "Jon",
+        "Jon",
+    ]
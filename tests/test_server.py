@@ -0,0 +1,247 @@
+import pytest
+import socket
+import threading
+from src.captioneditor import client, conversions
+from src.captioneditor.client import (
+    TOKEN_HEADER,
+    UnixHTTPConnection,
+    request,
+    submit_job,
+)
+from src.captioneditor.conversions import loaded_conversions_files
+from src.captioneditor.editor import main
+from src.captioneditor.server import create_server
+from http.client import HTTPConnection
+from pathlib import Path
+import json
+
+VTT_CAPTIONS = "tests/test_data/initial_captions/test_vtt.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+CAPTIONS = """WEBVTT
+
+00:00:01.000 --> 00:00:02.000
+alright alright
+"""
+
+
+@pytest.fixture()
+def conversions_file(tmp_path):
+    path = tmp_path / "conversions.json"
+    path.write_text(
+        json.dumps({"conversions": [{"key": "alright", "replacement": "all right"}]})
+    )
+    yield path
+
+
+@pytest.fixture()
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAPTIONEDITOR_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(conversions, "keep_loaded_conversions", True)
+    monkeypatch.setattr(
+        conversions, "_loaded_conversions", type(conversions._loaded_conversions)()
+    )
+
+    path = tmp_path / "s.sock"
+    monkeypatch.setenv("CAPTIONEDITOR_SOCKET", str(path))
+    server = create_server(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    path.unlink(missing_ok=True)
+
+
+@pytest.fixture()
+def captions_file(tmp_path):
+    path = tmp_path / "captions.vtt"
+    path.write_text(CAPTIONS, encoding="utf8")
+    yield path
+
+
+def test_job_matches_local_edit(server, tmp_path):
+    (tmp_path / "served").mkdir()
+    (tmp_path / "local").mkdir()
+    # Relative paths in a job are resolved against the client's working directory
+    result = submit_job(
+        [
+            str(Path(VTT_CAPTIONS).resolve()),
+            "-c",
+            str(Path(CONVERSIONS_FILE).resolve()),
+            "-dd",
+            "served",
+            "-dt",
+            ".vtt",
+            ".srt",
+        ],
+        cwd=tmp_path,
+    )
+    assert result["exit_code"] == 0
+
+    main(
+        [
+            VTT_CAPTIONS,
+            "-c",
+            CONVERSIONS_FILE,
+            "-dd",
+            str(tmp_path / "local"),
+            "-dt",
+            ".vtt",
+            ".srt",
+        ]
+    )
+    for extension in (".vtt", ".srt"):
+        name = "test_vtt-converted" + extension
+        assert (tmp_path / "served" / name).read_bytes() == (
+            tmp_path / "local" / name
+        ).read_bytes()
+
+
+def test_conversions_stay_loaded_and_reload(server, captions_file, conversions_file):
+    args = [str(captions_file), "-c", str(conversions_file)]
+    converted = captions_file.with_name("captions-converted.vtt")
+
+    assert submit_job(args)["exit_code"] == 0
+    assert "all right all right" in converted.read_text(encoding="utf8")
+    assert loaded_conversions_files() == [conversions_file.resolve()]
+
+    conversions_file.write_text(
+        json.dumps({"conversions": [{"key": "alright", "replacement": "okay"}]})
+    )
+    server.runner.reload_changed()
+    assert submit_job(args)["exit_code"] == 0
+    assert "okay okay" in converted.read_text(encoding="utf8")
+
+    status = request("GET", "/status")
+    assert status["jobs"] == 2
+    assert status["conversions"] == [str(conversions_file.resolve())]
+
+
+def test_job_errors(server, tmp_path):
+    result = submit_job(["missing.vtt"], cwd=tmp_path)
+    assert result["exit_code"] == 1
+    assert "Captions file not found" in result["errors"]
+
+    result = submit_job(["-unknown"], cwd=tmp_path)
+    assert result["exit_code"] == 2
+    assert result["errors"].startswith("usage:")
+
+    assert submit_job(["serve"])["exit_code"] == 2
+    assert submit_job([])["exit_code"] == 2
+
+
+@pytest.mark.parametrize(
+    "args, error",
+    [
+        (["captions.vtt", "--watch"], "A job cannot watch files\n"),
+        (["captions.vtt", "--wat"], "A job cannot watch files\n"),
+        (["-"], "A job cannot read captions from stdin\n"),
+        (["captions.vtt", "-"], "A job cannot read captions from stdin\n"),
+    ],
+)
+def test_unsupported_jobs(server, tmp_path, args, error):
+    result = submit_job(args, cwd=tmp_path)
+    assert (result["exit_code"], result["errors"]) == (2, error)
+    assert not any(tmp_path.glob("*.vtt"))
+
+
+@pytest.fixture()
+def tcp_server(tmp_path, monkeypatch):
+    monkeypatch.setenv("CAPTIONEDITOR_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("CAPTIONEDITOR_SOCKET", str(tmp_path / "s.sock"))
+    server = create_server(port=0)
+    monkeypatch.setenv("CAPTIONEDITOR_PORT", str(server.server_address[1]))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_tcp_server_requires_token(tcp_server, captions_file, conversions_file):
+    port = tcp_server.server_address[1]
+    token_file = client.token_path(port)
+    assert token_file.parent == captions_file.parent
+    assert token_file.stat().st_mode & 0o777 == 0o600
+
+    assert request("GET", "/status")["jobs"] == 0
+    assert (
+        submit_job([str(captions_file), "-c", str(conversions_file)])["exit_code"] == 0
+    )
+
+    def send(headers, body=json.dumps({"args": [str(captions_file)]})):
+        connection = HTTPConnection("127.0.0.1", port)
+        try:
+            connection.request("POST", "/jobs", body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    token = token_file.read_text()
+    assert send({"Content-Type": "application/json"})[0] == 403
+    assert send({"Content-Type": "application/json", TOKEN_HEADER: "guess"})[0] == 403
+    # Sent the way a form on a web page would be
+    assert send({"Content-Type": "text/plain", TOKEN_HEADER: token}, body="args=x") == (
+        415,
+        {"error": "Jobs must be sent as JSON"},
+    )
+    assert request("GET", "/status")["jobs"] == 1
+
+    tcp_server.server_close()
+    assert not token_file.exists()
+
+
+def test_refuses_running_server(server):
+    with pytest.raises(OSError) as exc_info:
+        create_server(server.server_address)
+    assert str(exc_info.value).startswith("A server is already listening")
+
+
+def test_socket_is_private(server):
+    assert Path(server.server_address).stat().st_mode & 0o777 == 0o600
+
+
+def test_client_falls_back_without_server(tmp_path, monkeypatch, captions_file, capsys):
+    monkeypatch.setenv("CAPTIONEDITOR_SOCKET", str(tmp_path / "missing.sock"))
+    assert client.main([str(captions_file)]) == 0
+    assert captions_file.with_name("captions-converted.vtt").is_file()
+
+
+def test_client_does_not_rerun_sent_job(tmp_path, monkeypatch, captions_file, capsys):
+    # A server that drops the connection once it has read the job may have run it, so the client reports the error instead of running the job again
+    path = tmp_path / "dropping.sock"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.listen(1)
+
+    def drop():
+        connection, _ = listener.accept()
+        connection.recv(65536)
+        connection.close()
+
+    thread = threading.Thread(target=drop, daemon=True)
+    thread.start()
+    monkeypatch.setenv("CAPTIONEDITOR_SOCKET", str(path))
+    try:
+        assert client.main([str(captions_file)]) == 1
+    finally:
+        thread.join()
+        listener.close()
+
+    assert not captions_file.with_name("captions-converted.vtt").exists()
+    assert "may or may not have run" in capsys.readouterr().err
+
+
+def test_client_uses_server(server, captions_file, conversions_file, capsys):
+    assert (
+        client.main([str(captions_file), "-c", str(conversions_file), "--stats"]) == 0
+    )
+    assert json.loads(capsys.readouterr().out)["captions_written"] == 1
+    assert (
+        request("GET", "/status", connection=UnixHTTPConnection(server.server_address))[
+            "jobs"
+        ]
+        == 1
+    )
@@ -0,0 +1,126 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.editor import main
+from src.captioneditor.stats import EditStats
+import json
+import time
+
+INITIAL_CAPTIONS_ROOT = "tests/test_data/initial_captions/"
+VTT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_vtt.vtt"
+EMPTY_CAPTIONS_FILE = INITIAL_CAPTIONS_ROOT + "empty.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+CAPTIONS = """WEBVTT
+
+00:00:01.000 --> 00:00:02.000
+alright alright
+
+00:00:03.000 --> 00:00:04.000
+everyone
+
+00:00:05.000 --> 00:00:06.000
+Marcela
+
+00:00:07.000 --> 00:00:08.000
+5,
+
+00:01:00.000 --> 00:01:01.000
+too late
+"""
+
+
+@pytest.fixture()
+def captions_file(tmp_path):
+    path = tmp_path / "captions.vtt"
+    path.write_text(CAPTIONS, encoding="utf8")
+    yield path
+
+
+def test_stats_counts(captions_file):
+    editor = Editor(
+        captions_file,
+        CONVERSIONS_FILE,
+        dest_file_extensions=[".vtt", ".srt"],
+        cutoff=60,
+        assume_sorted=False,
+    )
+    start = time.perf_counter()
+    stats = editor.edit_captions()
+    elapsed = time.perf_counter() - start
+
+    # The stages run one after another, so together they take no longer than the edit
+    assert sum(stats.stage_times.values()) <= elapsed
+
+    # The conversions offset every caption by 10 seconds, which moves the last caption past the cutoff
+    assert stats.captions_read == 5
+    assert stats.captions_written == 4
+    assert (
+        stats.dropped_by_offset,
+        stats.dropped_by_window,
+        stats.dropped_by_cutoff,
+    ) == (0, 0, 1)
+    assert stats.replacements == {"case_sensitive": 2, "previous": 1, "direct": 1}
+
+    assert stats.bytes_in == {".vtt": len(CAPTIONS)}
+    for extension in (".vtt", ".srt"):
+        written = captions_file.with_name("captions-converted" + extension)
+        assert stats.bytes_out[extension] == len(written.read_bytes())
+
+    assert set(stats.stage_times) == {
+        "read",
+        "parse",
+        "offset",
+        "keywords",
+        "bridge",
+        "write",
+    }
+    assert all(seconds >= 0 for seconds in stats.stage_times.values())
+    assert set(stats.write_times) == {".vtt", ".srt"}
+    assert all(seconds >= 0 for seconds in stats.write_times.values())
+    assert stats.peak_memory is None or stats.peak_memory > 0
+
+
+def test_stats_dropped_by_offset_and_window(tmp_path):
+    editor = Editor(
+        VTT_CAPTIONS,
+        dest_directory=tmp_path,
+        offset=-60000,
+        window_start=600,
+        window_end=700,
+        assume_sorted=False,
+    )
+    stats = editor.edit_captions()
+
+    assert stats.dropped_by_offset > 0
+    assert stats.dropped_by_window > 0
+    assert stats.dropped_by_cutoff > 0
+    assert stats.captions_read == (
+        stats.captions_written
+        + stats.dropped_by_offset
+        + stats.dropped_by_window
+        + stats.dropped_by_cutoff
+    )
+
+
+def test_stats_empty_captions(tmp_path):
+    editor = Editor(EMPTY_CAPTIONS_FILE, CONVERSIONS_FILE, dest_directory=tmp_path)
+    stats = editor.edit_captions()
+    assert stats.captions_written == 0
+    assert stats.bytes_out == {}
+
+
+def test_stats_cached_captions_count_replacements(captions_file):
+    editor = Editor(captions_file, CONVERSIONS_FILE)
+    first = editor.edit_captions()
+    second = editor.edit_captions()
+    assert editor.caption_cache.hits > 0
+    assert first.replacements == second.replacements
+
+
+def test_cli_stats(captions_file, capsys):
+    main([str(captions_file), "-c", CONVERSIONS_FILE, "--stats"])
+    stats = json.loads(capsys.readouterr().out)
+
+    assert stats["captions_written"] == 5
+    assert stats["replacements"]["case_sensitive"] == 2
+    assert list(stats) == list(vars(EditStats()))
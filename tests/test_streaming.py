@@ -0,0 +1,328 @@
+import pytest
+from src.captioneditor import Editor
+from src.captioneditor.streaming import (
+    read_cues,
+    scan_cues,
+    load_cue_index,
+    cue_index_path,
+)
+from itertools import count, islice
+from io import StringIO
+from pathlib import Path
+import json
+
+INITIAL_CAPTIONS_ROOT = "tests/test_data/initial_captions/"
+VTT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_vtt.vtt"
+SRT_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_srt.srt"
+DFXP_CAPTIONS = INITIAL_CAPTIONS_ROOT + "test_dfxp.dfxp"
+EMPTY_CAPTIONS_FILE = INITIAL_CAPTIONS_ROOT + "empty.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+
+
+@pytest.mark.parametrize("captions_file", [VTT_CAPTIONS, SRT_CAPTIONS])
+@pytest.mark.parametrize("cutoff", [-1, 100])
+def test_stream_matches_edit_captions(tmp_path, captions_file, cutoff):
+    extensions = [".vtt", ".srt"]
+    editor = Editor(
+        captions_file,
+        CONVERSIONS_FILE,
+        dest_file_extensions=extensions,
+        dest_directory=tmp_path,
+        dest_filename="streamed",
+        cutoff=cutoff,
+    )
+    streamed_count = editor.edit_captions_stream()
+
+    editor.update_dest_filename("parsed")
+    parsed_count = editor.edit_captions().captions_written
+
+    assert streamed_count == parsed_count
+    for extension in extensions:
+        assert (tmp_path / ("streamed" + extension)).read_text(encoding="utf8") == (
+            tmp_path / ("parsed" + extension)
+        ).read_text(encoding="utf8")
+
+
+@pytest.mark.parametrize(
+    "captions_type, contents",
+    [
+        (
+            ".vtt",
+            "WEBVTT\n\n00:01.000 --> 00:02.000\nAnd Tom &amp; Jerry\n\n"
+            "00:03.000 --> 00:04.000\nAnd 1 &lt; 2, 3 > 1\n",
+        ),
+        (
+            ".srt",
+            "1\n00:00:01,000 --> 00:00:02,000\nAnd Tom & Jerry\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\nAnd 1 < 2, 3 > 1\n",
+        ),
+    ],
+)
+def test_stream_escapes_vtt_text(tmp_path, captions_type, contents):
+    captions_file = tmp_path / f"captions{captions_type}"
+    captions_file.write_text(contents, encoding="utf8")
+    conversions_file = tmp_path / "conversions.json"
+    conversions_file.write_text(
+        json.dumps(
+            {
+                "conversions": [
+                    {"key": "And", "replacement": "&", "caseSensitive": True},
+                    {"key": "Jerry", "replacement": "Jerry\u00a0-->"},
+                ]
+            }
+        ),
+        encoding="utf8",
+    )
+    editor = Editor(captions_file, conversions_file, dest_directory=tmp_path)
+
+    editor.update_dest_filename("parsed")
+    editor.edit_captions()
+    parsed = (tmp_path / "parsed.vtt").read_text(encoding="utf8")
+    assert "&amp; Tom &amp; Jerry&nbsp;--&gt;" in parsed
+
+    editor.update_dest_filename("streamed")
+    editor.edit_captions_stream()
+    editor.update_dest_filename("chunked")
+    editor.edit_captions_parallel(2)
+    for name in ("streamed", "chunked"):
+        assert (tmp_path / f"{name}.vtt").read_text(encoding="utf8") == parsed
+
+
+@pytest.mark.parametrize(
+    "captions_type, contents",
+    [
+        (
+            ".vtt",
+            "WEBVTT\n\n00:01.000 --> 00:02.000\nTom &amp; Jerry <b>bold</b>\n\n"
+            "00:03.000 --> 00:04.000\n<i>1</i> &lt; 2 & 3\u00a0<4\n",
+        ),
+        (
+            ".srt",
+            "1\n00:00:01,000 --> 00:00:02,000\nTom &amp; Jerry <b>bold</b>\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\n<i>1</i> &lt; 2 & 3\u00a0<4\n",
+        ),
+    ],
+)
+def test_stream_entities_and_tags_match_edit_captions(
+    tmp_path, captions_type, contents
+):
+    # Text read from WebVTT keeps its character references and cue tags, while text from SRT has every '&' and '<' escaped, as pycaption writes them
+    captions_file = tmp_path / f"captions{captions_type}"
+    captions_file.write_text(contents, encoding="utf8")
+    editor = Editor(captions_file, dest_directory=tmp_path, offset=1000)
+
+    editor.update_dest_filename("parsed")
+    editor.edit_captions()
+    parsed = (tmp_path / "parsed.vtt").read_bytes()
+    editor.update_dest_filename("streamed")
+    editor.edit_captions_stream()
+    editor.update_dest_filename("chunked")
+    editor.edit_captions_parallel(2)
+    for name in ("streamed", "chunked"):
+        assert (tmp_path / f"{name}.vtt").read_bytes() == parsed
+
+
+def test_stream_file_objects():
+    with open(SRT_CAPTIONS, encoding="utf8") as f:
+        contents = f.read()
+
+    editor = Editor(conversions_file=CONVERSIONS_FILE)
+    dest = StringIO()
+    editor.edit_captions_stream(StringIO(contents), dest, ".srt")
+
+    assert dest.getvalue() == editor.edit_captions_text(contents, ".srt")[".vtt"]
+
+
+def test_stream_is_lazy():
+    def endless_captions():
+        yield "WEBVTT\n"
+        for index in count():
+            yield "\n"
+            yield f"00:00:{index % 60:02d}.000 --> 00:00:{index % 60:02d}.500\n"
+            yield "everyone Marcela\n"
+
+    editor = Editor(conversions_file=CONVERSIONS_FILE)
+    cues = list(islice(editor.iter_edited_cues(endless_captions()), 3))
+
+    assert cues == [
+        (10000, 10500, "everyone Marcela"),
+        (11000, 11500, "everyone Marcella"),
+        (12000, 12500, "everyone Marcella"),
+    ]
+
+
+def test_read_cues_skips_non_cue_blocks():
+    lines = StringIO(
+        "WEBVTT\n\nNOTE a comment\n\nintro\n01:02.003 --> 1:01:02.003 align:start\n<i>Hi</i> \n"
+    )
+    assert list(read_cues(lines)) == [(62003, 3662003, "<i>Hi</i>")]
+
+
+def test_stream_unsupported_type():
+    editor = Editor(DFXP_CAPTIONS, CONVERSIONS_FILE)
+    with pytest.raises(ValueError) as exc_info:
+        editor.edit_captions_stream()
+    assert (
+        str(exc_info.value) == "Streaming is only supported for .srt and .vtt captions"
+    )
+
+
+def test_stream_empty_captions(tmp_path):
+    editor = Editor(EMPTY_CAPTIONS_FILE, CONVERSIONS_FILE, dest_directory=tmp_path)
+    assert editor.edit_captions_stream() == 0
+    assert not any(Path(tmp_path).iterdir())
+
+
+@pytest.mark.parametrize("use_cue_index", [False, True])
+@pytest.mark.parametrize("window_start, cutoff", [(0, 10), (5, -1)])
+def test_window_of_empty_captions(
+    tmp_path, capsys, use_cue_index, window_start, cutoff
+):
+    captions_file = tmp_path / "empty.vtt"
+    captions_file.write_bytes(Path(EMPTY_CAPTIONS_FILE).read_bytes())
+    output_directory = tmp_path / "output"
+    output_directory.mkdir()
+    editor = Editor(
+        captions_file,
+        CONVERSIONS_FILE,
+        dest_directory=output_directory,
+        window_start=window_start,
+        cutoff=cutoff,
+        use_cue_index=use_cue_index,
+    )
+
+    assert editor._window_ranges() is None
+    assert editor.edit_captions().captions_read == 0
+    assert capsys.readouterr().out == "Cannot convert an empty captions file\n"
+    assert not any(output_directory.iterdir())
+
+
+@pytest.fixture(params=[VTT_CAPTIONS, SRT_CAPTIONS])
+def captions_copy(request, tmp_path):
+    # Work on a copy so that sidecar indexes are not written into the test data
+    path = tmp_path / Path(request.param).name
+    path.write_bytes(Path(request.param).read_bytes())
+    yield path
+
+
+@pytest.mark.parametrize(
+    "window_start, window_end, cutoff",
+    [(0, -1, 100), (600, 700, -1), (600, -1, 650), (1000, 1200, 1100), (9000, -1, -1)],
+)
+def test_window_early_exit_matches_full_read(
+    captions_copy, window_start, window_end, cutoff
+):
+    outputs = []
+    for assume_sorted, use_cue_index in [(False, False), (True, False), (True, True)]:
+        editor = Editor(
+            conversions_file=CONVERSIONS_FILE,
+            window_start=window_start,
+            window_end=window_end,
+            cutoff=cutoff,
+            assume_sorted=assume_sorted,
+            use_cue_index=use_cue_index,
+        )
+        editor.update_captions_path(captions_copy)
+        contents = editor._read_captions_contents()
+        outputs.append(editor.edit_captions_text(contents, captions_copy.suffix))
+
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+@pytest.mark.parametrize("captions_type", [".srt", ".vtt"])
+def test_unsorted_captions_before_cutoff_are_kept(tmp_path, captions_type):
+    captions_file = tmp_path / f"unsorted{captions_type}"
+    contents = (
+        "1\n00:00:01,000 --> 00:00:02,000\nFirst\n\n"
+        "2\n00:00:08,000 --> 00:00:09,000\nAfter the cutoff\n\n"
+        "3\n00:00:03,000 --> 00:00:04,000\nOut of order\n"
+    )
+    if captions_type == ".vtt":
+        contents = "WEBVTT\n\n" + contents.replace(",", ".")
+    captions_file.write_text(contents, encoding="utf8")
+
+    def edited_texts(assume_sorted):
+        Editor(
+            captions_file,
+            CONVERSIONS_FILE,
+            dest_directory=tmp_path,
+            cutoff=15,
+            assume_sorted=assume_sorted,
+        ).edit_captions()
+        with open(tmp_path / "unsorted-converted.vtt", encoding="utf8") as f:
+            return [text for _, _, text in read_cues(f)]
+
+    # The conversions file offsets the captions by 10 seconds
+    assert edited_texts(False) == ["First", "Out of order"]
+
+    # Sorted captions are only read up to the first caption after the cutoff
+    assert edited_texts(True) == ["First"]
+
+
+def test_window_excludes_captions(captions_copy):
+    editor = Editor(
+        captions_copy,
+        CONVERSIONS_FILE,
+        dest_directory=captions_copy.parent,
+        window_start=600,
+        window_end=700,
+        use_cue_index=True,
+    )
+    count = editor.edit_captions().captions_written
+    cues = list(
+        read_cues(open(captions_copy.with_name(captions_copy.stem + "-converted.vtt")))
+    )
+
+    assert count == len(cues) > 0
+    assert all(600000 <= start <= 700000 for start, _, _ in cues)
+
+
+def test_cue_index_reused_and_rebuilt(captions_copy):
+    index = cue_index_path(captions_copy)
+    cues = load_cue_index(captions_copy)
+    assert index.is_file()
+
+    with open(captions_copy, "rb") as f:
+        assert cues == list(scan_cues(f))
+
+    index.write_text(index.read_text().replace("[", "[123456789, ", 1))
+    assert load_cue_index(captions_copy)[0][0] == 123456789
+
+    # Changing the captions file makes the index stale
+    with open(captions_copy, "ab") as f:
+        f.write(b"\n\n99:00:00.000 --> 99:00:01.000\nlast\n")
+    rebuilt_cues = load_cue_index(captions_copy)
+    assert rebuilt_cues[:-1] == cues
+    assert rebuilt_cues[-1][0] == 356400000
+
+
+@pytest.mark.parametrize("captions_type", [".vtt", ".srt"])
+def test_stream_window_with_index(captions_copy, captions_type, tmp_path):
+    editor = Editor(
+        captions_copy,
+        CONVERSIONS_FILE,
+        dest_directory=tmp_path,
+        dest_filename="indexed",
+        window_start=600,
+        window_end=700,
+        use_cue_index=True,
+    )
+    editor.edit_captions_stream()
+    editor.update_dest_filename("parsed")
+    editor.edit_captions()
+
+    assert (tmp_path / "indexed.vtt").read_text() == (
+        tmp_path / "parsed.vtt"
+    ).read_text()
+
+
+def test_stream_stops_after_cutoff():
+    def endless_captions():
+        yield "WEBVTT\n"
+        for index in count():
+            yield "\n"
+            yield f"{index // 60:02d}:{index % 60:02d}.000 --> {index // 60:02d}:{index % 60:02d}.500\n"
+            yield "text\n"
+
+    editor = Editor(conversions_file=CONVERSIONS_FILE, cutoff=100, assume_sorted=True)
+    assert len(list(editor.iter_edited_cues(endless_captions()))) == 91
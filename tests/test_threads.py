@@ -0,0 +1,100 @@
+import json
+import random
+import sys
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from src.captioneditor import Editor
+
+CONVERSIONS = {
+    "conversions": [
+        {"key": "everyone", "replacement": "everybody"},
+        {"key": "alright", "replacement": "all right", "previous": "Hello"},
+        {"key": "okay", "replacement": "OK", "previous": "Hello"},
+        {"key": "gonna", "replacement": "going to", "previous": "everybody"},
+        {"key": "[MUSIC]", "replacement": "♪", "directConversion": True},
+        {"key": r"\b(\d+) ?%", "replacement": r"\1 percent", "regex": True},
+    ]
+}
+
+WORDS = ["Hello", "everyone", "alright", "okay", "gonna", "[MUSIC]", "50 %", "so"]
+
+
+def captions(seed: int, captions_type: str) -> str:
+    """
+    Returns captions of randomly chosen words, so that which conversions keyed to the previous caption apply differs from one file to the next.
+    """
+
+    rng = random.Random(seed)
+    cues = []
+    for index in range(200):
+        text = " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+        if rng.random() < 0.1:
+            text = "[MUSIC]"
+        start = f"00:{index // 60:02}:{index % 60:02}"
+        if captions_type == ".srt":
+            cues.append(f"{index + 1}\n{start},000 --> {start},900\n{text}\n")
+        else:
+            cues.append(f"{start}.000 --> {start}.900\n{text}\n")
+    header = "WEBVTT\n\n" if captions_type == ".vtt" else ""
+    return header + "\n".join(cues)
+
+
+@pytest.fixture
+def conversions_file(tmp_path):
+    conversions_file = tmp_path / "conversions.json"
+    conversions_file.write_text(json.dumps(CONVERSIONS), encoding="utf8")
+    return conversions_file
+
+
+@pytest.fixture
+def contention():
+    # Threads are switched far more often than usual, so that they interleave inside every edit
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("caption_cache_size", [0, 8, 1024])
+def test_shared_editor_matches_editor_per_job(
+    conversions_file, contention, caption_cache_size
+):
+    jobs = [
+        (captions(seed, captions_type), captions_type)
+        for seed in range(16)
+        for captions_type in (".vtt", ".srt")
+    ]
+    options = dict(
+        conversions_file=conversions_file,
+        dest_file_extensions=[".vtt", ".srt"],
+        caption_cache_size=caption_cache_size,
+    )
+    expected = [
+        Editor(**options).edit_captions_text(contents, captions_type)
+        for contents, captions_type in jobs
+    ]
+
+    editor = Editor(**options)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(3):
+            outputs = list(
+                executor.map(lambda job: editor.edit_captions_text(*job), jobs)
+            )
+            assert outputs == expected
+
+
+def test_previous_caption_keys_are_kept_for_each_thread(conversions_file):
+    editor = Editor(conversions_file=conversions_file)
+    assert editor._process_caption_contents("Hello") == "Hello"
+
+    # The keys matched in this thread are not seen by captions processed in another one
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(editor._process_caption_contents("alright"))
+    )
+    thread.start()
+    thread.join()
+    assert results == ["alright"]
+
+    assert editor._process_caption_contents("alright") == "all right"
@@ -0,0 +1,84 @@
+import pytest
+import subprocess
+import sys
+from array import array
+from src.captioneditor import timestamps
+from src.captioneditor.timestamps import (
+    format_timestamp,
+    offset_and_cut_columns,
+    offset_and_cut_one,
+    parse_timestamp,
+)
+
+STARTS = [0, 999, 52880, 59999, 100000, 3599999, 360000000]
+ENDS = [start + 1500 for start in STARTS]
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "no-numpy"])
+def numpy_enabled(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(timestamps, "numpy", None)
+    elif timestamps.load_numpy() is None:
+        pytest.skip("numpy is not installed")
+    else:
+        # Columns of any length are offset with NumPy
+        monkeypatch.setattr(timestamps, "VECTORISE_MIN_CUES", 0)
+
+
+@pytest.mark.parametrize(
+    "timestamp, milliseconds",
+    [
+        ("00:52.880", 52880),
+        ("01:00:52.880", 3652880),
+        ("00:00:52,880", 52880),
+        ("123:00:00.001", 442800001),
+    ],
+)
+def test_parse_timestamp(timestamp, milliseconds):
+    assert parse_timestamp(timestamp) == milliseconds
+
+
+@pytest.mark.parametrize("timestamp", ["52.880", "00:52.88", "aa:52.880", ""])
+def test_parse_invalid_timestamp(timestamp):
+    with pytest.raises(ValueError):
+        parse_timestamp(timestamp)
+
+
+def test_format_timestamp():
+    assert format_timestamp(3652880) == "01:00:52.880"
+    assert format_timestamp(52880, ",") == "00:00:52,880"
+    assert format_timestamp(442800001) == "123:00:00.001"
+
+
+@pytest.mark.parametrize("offset", [0, 10, -1000, 3_600_000, -3_600_000])
+@pytest.mark.parametrize("cutoff", [-1, 0, 60, 99.5])
+@pytest.mark.parametrize("window_start", [0, 30])
+def test_offset_and_cut_columns_matches_single(
+    numpy_enabled, offset, cutoff, window_start
+):
+    new_starts, new_ends, keep = offset_and_cut_columns(
+        array("q", STARTS), array("q", ENDS), offset, cutoff, window_start
+    )
+    assert isinstance(new_starts, array) and isinstance(keep, bytes)
+
+    for start, end, new_start, new_end, kept in zip(
+        STARTS, ENDS, new_starts, new_ends, keep
+    ):
+        single = offset_and_cut_one(start, end, offset, cutoff, window_start)
+        assert kept == (single is not None)
+        assert (new_start, new_end) == (start + offset, end + offset)
+
+
+def test_short_columns_do_not_import_numpy():
+    # Modules imported by the tests themselves would hide what the package imports, so the code runs in a new interpreter
+    code = """
+import sys
+from array import array
+from src.captioneditor.timestamps import offset_and_cut_columns
+offset_and_cut_columns(array("q", range(5000)), array("q", range(5000)), 10, -1)
+print("numpy" in sys.modules)
+"""
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert completed.stdout.strip() == "False"
@@ -0,0 +1,143 @@
+import pytest
+import threading
+import time
+from src.captioneditor import Editor
+from src.captioneditor.conversions import CompiledConversions
+from src.captioneditor.watch import IncrementalEdit, changed_conversions, watch_captions
+from pathlib import Path
+import json
+
+VTT_CAPTIONS = "tests/test_data/initial_captions/test_vtt.vtt"
+CONVERSIONS_FILE = "tests/test_data/conversions/conversions.json"
+EXTENSIONS = [".vtt", ".srt", ".dfxp"]
+
+
+@pytest.fixture()
+def watched(tmp_path):
+    captions_file = tmp_path / "captions.vtt"
+    captions_file.write_text(
+        Path(VTT_CAPTIONS).read_text(encoding="utf8"), encoding="utf8"
+    )
+    conversions_file = tmp_path / "conversions.json"
+    conversions_file.write_text(
+        Path(CONVERSIONS_FILE).read_text(encoding="utf8"), encoding="utf8"
+    )
+    (tmp_path / "incremental").mkdir()
+    (tmp_path / "full").mkdir()
+    return tmp_path
+
+
+def create_editor(directory: Path, dest: str) -> Editor:
+    return Editor(
+        directory / "captions.vtt",
+        directory / "conversions.json",
+        dest_file_extensions=EXTENSIONS,
+        dest_directory=directory / dest,
+        use_conversions_cache=False,
+    )
+
+
+def assert_same_as_full_edit(directory: Path) -> None:
+    create_editor(directory, "full").edit_captions()
+    for extension in EXTENSIONS:
+        filename = "captions-converted" + extension
+        assert (directory / "incremental" / filename).read_text(encoding="utf8") == (
+            directory / "full" / filename
+        ).read_text(encoding="utf8")
+
+
+def add_conversions(directory: Path, *conversions: dict) -> None:
+    conversions_file = directory / "conversions.json"
+    data = json.loads(conversions_file.read_text(encoding="utf8"))
+    data["conversions"] += conversions
+    conversions_file.write_text(json.dumps(data), encoding="utf8")
+
+
+def test_first_update_edits_everything(watched):
+    incremental = IncrementalEdit(create_editor(watched, "incremental"))
+    assert incremental.update() == len(incremental.edited) > 0
+    assert_same_as_full_edit(watched)
+
+    assert incremental.update(reread=False) == 0
+    assert_same_as_full_edit(watched)
+
+
+def test_changed_conversions_reprocess_matching_captions(watched):
+    incremental = IncrementalEdit(create_editor(watched, "incremental"))
+    incremental.update()
+    matching = sum("fitness" in edited.text.lower() for edited in incremental.edited)
+
+    add_conversions(watched, {"key": "fitness", "replacement": "FITNESS"})
+    processed = incremental.update(create_editor(watched, "incremental"), reread=False)
+    assert 0 < matching <= processed < len(incremental.edited)
+    assert_same_as_full_edit(watched)
+
+
+def test_previous_conversions_reprocess_following_captions(watched):
+    incremental = IncrementalEdit(create_editor(watched, "incremental"))
+    incremental.update()
+
+    # The caption after each one containing "club" is processed again, since it now follows a matched previous key
+    add_conversions(
+        watched, {"key": "Virtual", "replacement": "VIRTUAL", "previous": "Club"}
+    )
+    incremental.update(create_editor(watched, "incremental"), reread=False)
+    assert "VIRTUAL" in (watched / "incremental" / "captions-converted.vtt").read_text(
+        encoding="utf8"
+    )
+    assert_same_as_full_edit(watched)
+
+
+def test_changed_captions_reprocess_changed_cues(watched):
+    incremental = IncrementalEdit(create_editor(watched, "incremental"))
+    incremental.update()
+
+    captions_file = watched / "captions.vtt"
+    contents = captions_file.read_text(encoding="utf8")
+    captions_file.write_text(
+        contents.replace("Virtual Boxing Fitness.", "Virtual boxing, and more."),
+        encoding="utf8",
+    )
+    assert incremental.update() == 1
+    assert_same_as_full_edit(watched)
+
+
+def test_changed_conversions_follow_replacements():
+    old = CompiledConversions(case_insensitive=[("colour", "color")])
+    new = CompiledConversions(
+        case_insensitive=[("colour", "color")], case_sensitive=[("color", "Color")]
+    )
+    words, direct = changed_conversions(old, new)
+    assert words == {"color", "colour"}
+    assert direct == set()
+
+    words, direct = changed_conversions(
+        CompiledConversions(direct={"[MUSIC]": "♪"}),
+        CompiledConversions(direct={"[MUSIC]": "♪♪"}),
+    )
+    assert words == set() and direct == {"[MUSIC]"}
+
+
+def test_watch_captions(watched):
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=watch_captions,
+        args=(lambda: create_editor(watched, "incremental"), 0.05, stop),
+    )
+    watcher.start()
+    try:
+        converted = watched / "incremental" / "captions-converted.vtt"
+        deadline = time.monotonic() + 30
+        while not converted.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        # File times can be too coarse to tell two quick saves apart, so the edit also changes the size
+        add_conversions(watched, {"key": "fitness", "replacement": "FITNESS!"})
+        while "FITNESS!" not in converted.read_text(encoding="utf8"):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        watcher.join()
+
+    assert_same_as_full_edit(watched)
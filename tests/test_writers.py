@@ -0,0 +1,91 @@
+import pytest
+from src.captioneditor.writers import FastSRTWriter, FastWebVTTWriter
+from pycaption import (
+    Caption,
+    CaptionList,
+    CaptionNode,
+    CaptionSet,
+    DFXPReader,
+    SRTReader,
+    SRTWriter,
+    WebVTTReader,
+    WebVTTWriter,
+)
+from pathlib import Path
+
+CONVERTED_CAPTIONS_ROOT = Path("tests/test_data/converted_captions/")
+READERS = {
+    ".vtt": WebVTTReader,
+    ".srt": SRTReader,
+    ".dfxp": DFXPReader,
+    ".ttml": DFXPReader,
+}
+WRITERS = [(WebVTTWriter, FastWebVTTWriter), (SRTWriter, FastSRTWriter)]
+
+
+def text(content: str) -> CaptionNode:
+    return CaptionNode.create_text(content)
+
+
+def caption_set(*captions: Caption, **languages: list[Caption]) -> CaptionSet:
+    return CaptionSet(
+        {"en-US": CaptionList(list(captions))}
+        | {lang: CaptionList(caption_list) for lang, caption_list in languages.items()}
+    )
+
+
+BREAK = CaptionNode.create_break
+
+EDGE_CASES = {
+    "merged times": caption_set(
+        Caption(1000000, 2000000, [text("one")]),
+        Caption(1000000, 2000000, [text("two")]),
+        Caption(3000000, 4000000, [text("three")]),
+    ),
+    "breaks and spaces": caption_set(
+        Caption(0, 1500, [BREAK(), text(" one "), text("two"), BREAK(), BREAK()]),
+        Caption(2000, 3000, [text(""), BREAK(), text("  ")]),
+        Caption(4000, 5000, [BREAK()]),
+    ),
+    "escaping": caption_set(
+        Caption(0, 1000, [text("a & b <c> --> d e‎f‏g")]),
+    ),
+    "long times": caption_set(
+        Caption(90000000000, 90061001000, [text("after a day")]),
+        Caption(360000000000, 360000999999, [text("after a hundred hours")]),
+    ),
+    "languages": caption_set(
+        Caption(0, 1000, [text("one")]), fr=[Caption(0, 1000, [text("un")])]
+    ),
+    "styled": caption_set(
+        Caption(
+            0,
+            1000,
+            [
+                CaptionNode.create_style(True, {"italics": True}),
+                text("one"),
+                CaptionNode.create_style(False, {"italics": True}),
+            ],
+        ),
+    ),
+    "empty": CaptionSet({"en-US": CaptionList()}),
+}
+
+
+@pytest.mark.parametrize(
+    "captions_file",
+    sorted(CONVERTED_CAPTIONS_ROOT.iterdir()),
+    ids=lambda path: path.name,
+)
+@pytest.mark.parametrize("writer, fast_writer", WRITERS)
+def test_reference_captions(captions_file, writer, fast_writer):
+    captions = READERS[captions_file.suffix]().read(
+        captions_file.read_text(encoding="utf8")
+    )
+    assert fast_writer().write(captions) == writer().write(captions)
+
+
+@pytest.mark.parametrize("captions", EDGE_CASES.values(), ids=EDGE_CASES.keys())
+@pytest.mark.parametrize("writer, fast_writer", WRITERS)
+def test_edge_cases(captions, writer, fast_writer):
+    assert fast_writer().write(captions) == writer().write(captions)